@@ -14,15 +14,36 @@ bl_info = {
 import sys
 
 import bpy
+from bpy.app.handlers import persistent
 from math import radians
 import mathutils
+from mathutils.bvhtree import BVHTree
+import numpy as np
 import random
 
+import argparse
+import base64
+import csv
+import json
+import multiprocessing
+from multiprocessing import shared_memory
+import os
+import queue
+import shutil
+import struct
+import subprocess
+import tempfile
+import threading
+import tracemalloc
+import zlib
 import time  # only imported for testing purposes
 
 class Replicant():
     """Represents attributes and controls for a single replicated object.
     """
+    # True if replicants spawning into the same cell merge into one
+    merges = False
+
     def __init__(self, location_start,
                  location_end, obj=False, parent=False,
                  scale_start=mathutils.Vector((0, 0, 0)),
@@ -46,105 +67,40 @@ class Replicant():
     def addStart(self):
         pass
 
-    def setAttributesStart(self, frame_current, frames_to_spawn=False):
-        """Sets start attributes, before replicant moves to final position"""
-        self.setScaleStart()
-
-        bpy.data.objects[self.obj.name].select_set(True)
-        self.setKeyframesStart(frame_current)
-
-        # Make sure replicants aren't visible before their spawn animation 
-        self.setViewportVisAnimation(
-            frame_visible=frame_current - 1, frames_to_spawn=frames_to_spawn)
-
-    def setScaleStart(self):
-        """Sets size of replicant before it moves to its final position"""
-        self.obj.scale[0] = self.scale_start[0]
-        self.obj.scale[1] = self.scale_start[1]
-        self.obj.scale[2] = self.scale_start[2]
-
     def assignMotionPath(self, location_start, location_end):
         self.location_start = location_start
         self.location_end = location_end
 
-    def setKeyframesStart(self, current_frame):
-        """Insert any keyframes for start of animation"""
-        self.obj.keyframe_insert(
-            data_path="scale", frame=current_frame)
-        self.obj.keyframe_insert(
-            data_path="location", frame=current_frame)
-
-    def setKeyframesEnd(self, current_frame):
-        """Insert any keyframes for end of animation"""
-        self.obj.keyframe_insert(
-            data_path="scale", frame=current_frame)
-        self.obj.keyframe_insert(
-            data_path="location", frame=current_frame)
-
-    def setViewportVisAnimation(
-            self, frame_visible, frame_hidden=False, frames_to_spawn=False):
-        """Add viewport visibility keyframes.
-        Only run this after all other replicant properties are set
-        Object is hidden when fcurve y-value is greater than or equal to 1.
-
-        :param frame_visible: Int, frame at which the obj will become visible
-        :param frame_hidden: Int, frame to hide object again
-                             NOT CURRENTLY IMPLEMENTED
-        :return: None"""
-        frame_visible = (frame_visible - 1) if frame_visible >= 0 else 0
-
-        if self.obj.animation_data is None:
-            self.obj.animation_data_create()
-        ac = self.obj.animation_data.action
-        frame_visible = frame_visible
-
-        coordinate_list = [0, 1, frame_visible, 1, frame_visible + 1, 0]
-        num_keyframes = int(len(coordinate_list) / 2)
-        assert ((len(coordinate_list) % 2) is 0
-                ), "coordinate_list must contain even number of items."
+    @classmethod
+    def templateScaleStart(cls, parent):
+        """Scale at start of spawn animation, used by SpawnKeyframeTemplate
+        :param parent: Replicator spawning this type of replicant
+        :return: list of 3 numbers"""
+        return parent.scale_start
 
-        fc_hide_vp = ac.fcurves.find(data_path='hide_viewport')
+    @classmethod
+    def templateFrameVisible(cls, frame_spawn, frames_to_spawn):
+        """Frame replicant becomes visible, used by SpawnKeyframeTemplate
+        :param frame_spawn: int, first frame of spawn animation
+        :param frames_to_spawn: int, duration of spawn animation
+        :return: int"""
+        return frame_spawn - 1
 
-        if fc_hide_vp is None:
-            fc_hide_vp = ac.fcurves.new(data_path='hide_viewport')
-            final_cordinates = coordinate_list
-        else:
-            current_keyframes = []
-            for a, b in fc_hide_vp.keyframe_points.items():
-                current_keyframes += [b.co[0], b.co[1]]
-            final_cordinates = current_keyframes + coordinate_list
-        fc_hide_vp.keyframe_points.add(num_keyframes)
-        fc_hide_vp.keyframe_points.foreach_set('co', final_cordinates)
-
-        fc_hide_vp.update()
-        # Without fc.update(), left keyframe tangents/"Bézier handles"
-        # will extend to zero,  warping the shape of the curves
-        # enough to lead to seemingly unpredictable changes in visibility
-
-        fc_hide_render = ac.fcurves.find(data_path='hide_render')
-        if fc_hide_render is None:
-            fc_hide_render = ac.fcurves.new(data_path='hide_render')
-            final_cordinates = coordinate_list
-        else:
-            current_keyframes = []
-            for a, b in fc_hide_render.keyframe_points.items():
-                current_keyframes += [b.co[0], b.co[1]]
-            final_cordinates = current_keyframes + coordinate_list
-
-        fc_hide_render.keyframe_points.add(num_keyframes)
-        fc_hide_render.keyframe_points.foreach_set('co', final_cordinates)
-
-        fc_hide_render.update()
-
-    def setBehaviorMods(self, behaviors, frame_current):
-        """Adds post replication animation behaviors to replicant"""
-        for behavior in behaviors:
-            BehaviorModifiers.setBehavior(
-                blender_obj=self.obj, keyframe_start=frame_current,
-                data_path=behavior['data_path'], duration=behavior['duration'],
-                delay=behavior['delay'], value=behavior['value'],
-                index=behavior['index'])
-        pass
+    @classmethod
+    def templateLocationStart(cls, locations_start, locations_end):
+        """Locations at start of spawn animation, see assignMotionPath
+        :param locations_start: numpy array, shape (replicants, 3)
+        :param locations_end: numpy array, shape (replicants, 3)
+        :return: numpy array, shape (replicants, 3)"""
+        return locations_start
+
+    def setBehaviorMods(self, timeline, frame_current, amplitude=1.0):
+        """Adds post replication animation behaviors to replicant
+        :param timeline: BehaviorModTimeline, compiled behavior mods
+        :param frame_current: int, frame the behavior mod delays count from
+        :param amplitude: number, factor of each mod's change in value
+        :return: None"""
+        timeline.applyTo(self.obj, frame_current, amplitude)
 
 
 class Replicator():
@@ -157,7 +113,10 @@ class Replicator():
     def __init__(self, offset=4.0, frame_start=0, frames_to_spawn=15,
                  scale_start=[0, 0, 0], scale_end=[1, 1, 1],
                  start_x=0, start_y=0, start_z=0,
-                 use_x=True, use_y=True, use_z=True, linked=True):
+                 use_x=True, use_y=True, use_z=True, linked=True,
+                 unlink_on_demand=False, detached=False, collection=False,
+                 memory_log=False, domain=None, frame_window=None,
+                 variation=None):
         def scaleTypeCheck(scale_list):
             if ((isinstance(scale_list, list) or (
                     isinstance(scale_list, bpy.types.bpy_prop_array) or (
@@ -176,28 +135,59 @@ class Replicator():
                                 "lists with 3 numbers")
         self.offset = offset
         self.linked = linked
+        # With linked False, defers copying data until replicants are made
+        # single user via OBJECT_OT_MitosisUnlinkReplicants
+        self.unlink_on_demand = unlink_on_demand
 
         self.replicants = []
-        self._replicants_new = []  # stores newly replicated objects
+        self._spawn_template = None
+        # Records memory use after each generation when given a MemoryLog
+        self.memory_log = memory_log
         self.num_replicants = 0
         self.end_replicants_created = None
 
         # Create Collection / Folder for Replicants
-        collection_name = self.obj_to_copy.name + ' Replicants'
-        self.collection = bpy.context.blend_data.collections.new(
-            name=collection_name)
-        bpy.context.scene.collection.children.link(self.collection)
+        # When detached, the collection is only linked to the scene after
+        # generate() so adding replicants doesn't trigger view layer and
+        # depsgraph updates for every object
+        self.detached = detached
+        self._created_collection = not collection
+        if collection:  # Update animation previously written to collection
+            self.collection = collection
+        else:
+            collection_name = self.obj_to_copy.name + ' Replicants'
+            self.collection = bpy.context.blend_data.collections.new(
+                name=collection_name)
+            if not self.detached:
+                bpy.context.scene.collection.children.link(self.collection)
         print("COLLECTION: {0}".format(self.collection))
 
+        # Plan stored by a previous run, only changed replicants are rebuilt
+        self.stored_plan = load_plan(self.collection)
+        self.stored_parameters = self.collection.get(PARAMETERS_PROP)
+        self._parameters_unchanged = None
+        self._unchanged = (None, set())  # Generation, its unchanged indices
+        self._existing_objects = {}  # Plan index: object from previous run
+        for obj in self.collection.objects:
+            if obj.get(PLAN_INDEX_PROP) is not None:
+                self._existing_objects[obj[PLAN_INDEX_PROP]] = obj
+
         self.frame_start = frame_start
         self.frames_to_spawn = frames_to_spawn
         self.frame_current = frame_start
+        # (first, last) frame of a shot, replicants are only built for it
+        self.frame_window = None
+        if frame_window is not None:
+            self.frame_window = (int(frame_window[0]), int(frame_window[1]))
+        # Variation of each replicant's scale, rotation and timing
+        self.variation = variation
 
         self.use_x = use_x
         self.use_y = use_y
         self.use_z = use_z
 
         self.behavior_mods = []
+        self.behavior_timeline = None
 
         self.scale_start = scaleTypeCheck(scale_start)
         self.scale_end = scaleTypeCheck(scale_end)
@@ -215,104 +205,250 @@ class Replicator():
             self._addReplicant(
                 location_start=location_start, location_end=location_start)
 
+        # A mesh object domain is voxelized once, at the lattice spacing
+        self.domain_name = getattr(domain, 'name', None)
+        if isinstance(domain, bpy.types.Object):
+            domain = voxelize_mesh(domain, location_start, offset)
+
+        # Where and when replicants spawn is planned without touching bpy
+        self.plan = ReplicationPlan(
+            origin=location_start, offset=offset, frame_start=frame_start,
+            frames_to_spawn=frames_to_spawn,
+            use_x=use_x, use_y=use_y, use_z=use_z, domain=domain,
+            merge=self.obj_type.merges)
+
     def newGeneration(self):
         """Replicates any objects with nearby empty space"""
-        #bpy.context.scene.tool_settings.use_keyframe_insert_auto = True
-        #bpy.context.scene.frame_current = self.frame_current
-
-        num_replicants = len(self.replicants)
-        i = 0
-        # while loop used instead of for loop, since spawn() adds a member to
-        # self.replicants which would cause a for loop to repeat forever
-        while i < num_replicants:
-            replicant = self.replicants[i]
-            spawn_location = self.spawn(replicant)
-            i += 1
-        self.frame_current += self.frames_to_spawn
+        self.applyGeneration(self.plan.planGeneration())
+
+    def iterGenerations(self, generations=5, sink=None):
+        """Plans and commits generations one at a time
+        Unlike generate(), no Replicant is kept once its generation is
+        committed, so Python memory holds little more than the plan.
+        Stopping early with close() still finishes the bake with what was
+        committed, but a failing generation only links a detached collection,
+        like generate(). With a sink, nothing is added to Blender, and the
+        collection made for replicants is removed, leaving it None.
+        :param generations: int, n of times any existing replicators will spawn
+        :param sink: PlanFileSink or other object with write(generation) and
+                     close() methods, which generations are committed to
+                     instead of bpy.data
+        :return: generator of committed PlanGenerations
+        """
+        self.behavior_timeline = None  # Compile behavior mods once per bake
+        self.getBehaviorTimeline()
+        try:
+            for i in range(generations):
+                generation = self.plan.planGeneration()
+                if sink is None:
+                    self.applyGeneration(generation)
+                    del self.replicants[1:]  # Only the original is kept
+                else:
+                    sink.write(generation)
+                yield generation
+        except GeneratorExit:
+            pass  # Stopped early, finish with what was committed
+        except BaseException:
+            if sink is not None:
+                self._closeSink(sink)
+            elif self.detached:
+                self.attachCollection()
+            raise
+        if sink is None:
+            self.finishGenerate()
+        else:
+            self._closeSink(sink)
 
-        for replicant in self._replicants_new:
-            replicant.obj.scale = self.scale_end
-            replicant.obj.location = replicant.location_end
-            replicant.setKeyframesEnd(self.frame_current)
-            replicant.setBehaviorMods(self.behavior_mods, self.frame_current)
-        self._replicants_new.clear()
+    def _closeSink(self, sink):
+        """Closes sink, and removes the unused collection made for replicants
+        """
+        sink.close()
+        if self._created_collection and not self.collection.objects:
+            bpy.data.collections.remove(self.collection)
+            self.collection = None
 
     def generate(self, generations=5):
         """Runs Replicator for given number of generations
         :param generations: int, n of times any existing replicators will spawn
         :return: None
         """
+        self.behavior_timeline = None  # Compile behavior mods once per bake
+        self.getBehaviorTimeline()
         i = 0
-        while i < generations:
-            self.newGeneration()
-            i += 1
+        try:
+            while i < generations:
+                self.newGeneration()
+                i += 1
+        except BaseException:
+            # Replicants made before the failure aren't left in a detached
+            # collection outside the scene
+            if self.detached:
+                self.attachCollection()
+            raise
+        self.finishGenerate()
+
+    def finishGenerate(self):
+        """Cleans up after the last generation, and stores the plan
+        :return: None
+        """
+        # Anything left from a previous run is past the end of this plan
+        for obj in self._existing_objects.values():
+            remove_replicant(obj)
+        self._existing_objects.clear()
+        self.storePlan()
+        if self.detached:
+            self.attachCollection()
+        if self.memory_log:
+            # Sharded bakes apply generations in other processes
+            if (self.memory_log.records[-1]['generation']
+                    != self.plan.num_generations):
+                self.memory_log.record(self.plan.num_generations)
+            self.memory_log.finish()
+
+    def getParameters(self):
+        """Returns settings affecting how replicants are animated
+        :return: dict, can be converted to JSON"""
+        obj_to_copy = getattr(self, 'obj_to_copy', None)
+        return {
+            'source': obj_to_copy.name if obj_to_copy else None,
+            'replicant_type': self.obj_type.__name__,
+            'offset': self.offset, 'frame_start': self.frame_start,
+            'frames_to_spawn': self.frames_to_spawn,
+            'scale_start': list(self.scale_start),
+            'scale_end': list(self.scale_end),
+            'use_x': self.use_x, 'use_y': self.use_y, 'use_z': self.use_z,
+            'linked': self.linked, 'unlink_on_demand': self.unlink_on_demand,
+            'domain': self.domain_name,
+            'frame_window': self.frame_window and list(self.frame_window),
+            'variation': self.variation and self.variation.getParameters(),
+            'behavior_mods': self.behavior_mods}
+
+    def storePlan(self):
+        """Saves plan and parameters with the collection in the .blend
+        :return: None
+        """
+        store_plan(self.collection, self.plan, self.getParameters())
+
+    def _unchangedIndices(self, generation):
+        """Plan indices of generation whose objects from a previous run
+        can be kept as they are
+        :param generation: PlanGeneration
+        :return: set of ints"""
+        if self.stored_plan is None:
+            return set()
+        if self._parameters_unchanged is None:
+            self._parameters_unchanged = self.stored_parameters == json.dumps(
+                self.getParameters(), sort_keys=True)
+        if not self._parameters_unchanged:
+            return set()
+        # Found once for the whole generation, however many slices it's
+        # applied in
+        if self._unchanged[0] != generation.generation:
+            starts = self.plan.generation_starts
+            stop = starts[generation.generation + 1] \
+                if generation.generation + 1 < len(starts) else len(self.plan)
+            unchanged = self.stored_plan.unchangedIndices(
+                self.plan, starts[generation.generation], stop)
+            self._unchanged = (generation.generation,
+                               unchanged.intersection(self._existing_objects))
+        return self._unchanged[1]
+
+    def applyGeneration(self, generation, start=0, stop=None):
+        """Creates and animates the replicants of a planned generation
+        A generation can be applied over several calls, in slices
+        :param generation: PlanGeneration, from ReplicationPlan
+        :param start: int, first replicant of the generation to apply
+        :param stop: int, replicant of the generation to stop before
+        :return: list of Replicants created"""
+        stop = len(generation) if stop is None else stop
+        # Spawn keyframes are computed once for the whole generation
+        template = self._getSpawnTemplate(generation.frame_spawn)
+        if template.after_window:
+            start = stop  # Not visible in the frame window, nothing to add
+        unchanged = self._unchangedIndices(generation)
+        replicants = []
+        indices = []
+        for i in range(start, stop):
+            index = int(generation.indices[i])
+            existing_obj = self._existing_objects.pop(index, None)
+            if index in unchanged:
+                continue
+            if existing_obj is not None:
+                remove_replicant(existing_obj)
+            replicants.append(self._addReplicant(
+                mathutils.Vector(generation.locations_start[i]),
+                mathutils.Vector(generation.locations_end[i]), index=index))
+            indices.append(index)
+
+        variation = None
+        if self.variation is not None:
+            variation = self.variation.sample(
+                generation.generation,
+                np.array(indices, dtype=np.int64) - generation.index_start)
+        if not template.static:
+            template.applyTo(replicants, variation)
+        timeline = self.getBehaviorTimeline()
+        if variation is None:
+            for replicant in replicants:
+                replicant.obj.scale = self.scale_end
+                replicant.obj.location = replicant.location_end
+                replicant.setBehaviorMods(timeline, template.frame_end)
+        else:
+            for i, replicant in enumerate(replicants):
+                replicant.obj.scale = self.scale_end * variation['scale'][i]
+                replicant.obj.location = replicant.location_end
+                replicant.obj.delta_rotation_euler = variation['rotation'][i]
+                replicant.setBehaviorMods(
+                    timeline, template.frame_end + variation['delay'][i],
+                    amplitude=variation['mod_amplitude'][i])
+
+        if stop >= len(generation):
+            self.frame_current = template.frame_end
+            if self.memory_log:
+                self.memory_log.record(generation.generation)
+        return replicants
+
+    def _getSpawnTemplate(self, frame_spawn):
+        """Returns SpawnKeyframeTemplate for generation spawning on frame"""
+        if (self._spawn_template is None) or (
+                self._spawn_template.frame_start != frame_spawn):
+            self._spawn_template = SpawnKeyframeTemplate(
+                self.obj_type, self, frame_spawn)
+        return self._spawn_template
+
+    def attachCollection(self):
+        """Links a detached replicant collection to the scene in one step
+        :return: None
+        """
+        scene_children = bpy.context.scene.collection.children
+        if scene_children.get(self.collection.name) is None:
+            scene_children.link(self.collection)
+        for obj in self.collection.objects:
+            obj.select_set(True)
 
-    def _addReplicant(self, location_start, location_end=False):
+    def _addReplicant(self, location_start, location_end=False, index=None):
         """Adds a new object
         :param location_start: mathutils.Vector, start point of added replicant
         :param location_end: mathutils.Vector, end point of added replicant
+        :param index: int, plan index of replicant, next index if None
         :return: Replicant"""
-        self.num_replicants += 1
+        if index is None:
+            self.num_replicants += 1
+        else:
+            self.num_replicants = index
         replicant = self.obj_type(location_start=location_start,
                                   location_end=location_end, parent=self,
                                   scale_start=self.scale_start,
                                   scale_end=self.scale_end,
                                   linked=self.linked)
-        replicant.setAttributesStart(self.frame_current, self.frames_to_spawn)
+        replicant.obj[PLAN_INDEX_PROP] = self.num_replicants
+        if not self.detached:
+            replicant.obj.select_set(True)
 
         self.replicants.append(replicant)
-        self._replicants_new.append(replicant)
 
         return replicant
 
-    def spawn(self, replicant, direction=0):
-        """Multiplies given replicant in the first available empty space
-        Empty means spot is free from other replicants owned by this Replicator
-        This doesn't check if space is empty from any other objects
-        :param replicant: Replicant Object
-        :param direction: Int, representing a direction around given replicant
-        :return: mathutils.Vector, location of spawned replicant"""
-        direction += 1
-        # \/ Change order of these to alter replication behavior
-        if (direction is 1) and (self.use_x is True):
-            spawn_location = replicant.obj.location + mathutils.Vector((
-                self.offset, 0.0, 0.0))
-        elif (direction is 2) and (self.use_x is True):
-            spawn_location = replicant.obj.location + mathutils.Vector((
-                -self.offset, 0.0, 0.0))
-        elif (direction is 3) and (self.use_y is True):
-            spawn_location = replicant.obj.location + mathutils.Vector((
-                0.0, self.offset, 0.0))
-        elif (direction is 4) and (self.use_y is True):
-            spawn_location = replicant.obj.location + mathutils.Vector((
-                0.0, -self.offset, 0.0))
-        elif (direction is 5) and (self.use_z is True):
-            spawn_location = replicant.obj.location + mathutils.Vector((
-                0.0, 0.0, self.offset))
-        elif (direction is 6) and (self.use_z is True):
-            spawn_location = replicant.obj.location + mathutils.Vector((
-                0.0, 0.0, -self.offset))
-        elif direction < 6:
-            spawn_location = False
-        elif direction >= 6:
-            return False
-
-        if spawn_location and self.locationIsEmpty(spawn_location):
-            self._addReplicant(replicant.obj.location, spawn_location)
-            return spawn_location
-        else:
-            self.spawn(replicant, direction)
-
-    def locationIsEmpty(self, location_vector):
-        """ Checks if spawn location is already occupied by another replicant
-        :param location_vector: mathutils.Vector, location to check
-        :return: Bool, True if location empty"""
-        for replicant in self.replicants:
-            if (replicant.obj.location == location_vector) or (
-                    replicant.location_end == location_vector):
-                return False
-        return True
-
     def addBehaviorMod(
             self, new_behavior):
         """Creates a behavior each replicant will perform after replicating
@@ -324,6 +460,7 @@ class Replicator():
 
         self.behavior_mods.append(
             new_behavior)
+        self.behavior_timeline = None
 
     def addBehaviorMods(self, new_behaviors):
         """Adds new behavior modifying instructions, from given dicts
@@ -339,6 +476,7 @@ class Replicator():
         # self.behavior_mods is cleared, Behavior Mod settings are stored in
         # Blender PropertyCollection (See UI section of code)
         self.behavior_mods = []
+        self.behavior_timeline = None
 
         for behavior in new_behaviors:
             try:
@@ -353,6 +491,17 @@ class Replicator():
                                      new_behaviors.index(behavior), E)
                                  )
 
+    def getBehaviorTimeline(self):
+        """Returns behavior mods compiled into a BehaviorModTimeline
+        Compiled once, and again only after behavior mods are changed
+        :return: BehaviorModTimeline"""
+        if self.behavior_timeline is None:
+            self.behavior_timeline = BehaviorModTimeline(
+                self.behavior_mods,
+                base_obj=getattr(self, 'obj_to_copy', None),
+                frame_window=self.frame_window)
+        return self.behavior_timeline
+
     def _behaviorModInputCheck(self, behavior_dict):
         """Checks inputs of addBehaviorMod and addBehaviorMods methods"""
         # Eventually check all keys/values of behavior dict here
@@ -389,67 +538,788 @@ class Replicator():
         with open('behaviormods.pkl', 'wb') as o:
             pickle.dump(behavior_mods, o)
 
+############
+# Planning #
+############
+# Blender independent, safe to run outside Blender's main thread
+
+class PlanGeneration():
+    """Replicants planned for a single generation of a ReplicationPlan
+    Arguments:
+    generation -- int, generation number, the original object is 0
+    frame_spawn -- int, first frame of the generation's spawn animation
+    index_start -- int, plan index of the generation's first replicant
+    parents -- list of ints, plan index of each replicant's parent
+    cells -- list of int tuples, lattice cell of each replicant
+    locations_start -- numpy array, (replicants, 3) start locations
+    locations_end -- numpy array, (replicants, 3) end locations
+    indices -- numpy array, plan index of each replicant. Only needed if
+               they aren't consecutive from index_start
+    """
+    def __init__(self, generation, frame_spawn, index_start, parents, cells,
+                 locations_start, locations_end, indices=None):
+        self.generation = generation
+        self.frame_spawn = frame_spawn
+        self.index_start = index_start
+        self.parents = parents
+        self.cells = cells
+        self.locations_start = locations_start
+        self.locations_end = locations_end
+        if indices is None:
+            indices = np.arange(index_start, index_start + len(cells))
+        self.indices = indices
+
+    def __len__(self):
+        return len(self.cells)
+
+
+class DomainMask():
+    """Lattice cells replicants may spawn into, as a dense grid of Bools
+    The grid has a border of disallowed cells, so every neighbor of an
+    allowed cell can be looked up without checking bounds.
+    Arguments:
+    allowed -- numpy array of Bools, shape (x, y, z), True for cells inside
+    cell_min -- 3 ints, lattice cell of allowed[0, 0, 0]
+    """
+    def __init__(self, allowed, cell_min=(0, 0, 0)):
+        allowed = np.asarray(allowed, dtype=bool)
+        cell_min = np.asarray(cell_min, dtype=np.int64)
+        # Bounds also take in the origin cell, so its neighbors are included
+        low = np.minimum(cell_min, 0) - 1
+        high = np.maximum(cell_min + allowed.shape - 1, 0) + 1
+        self.allowed = np.zeros(tuple(high - low + 1), dtype=bool)
+        x, y, z = cell_min - low
+        self.allowed[x:x + allowed.shape[0], y:y + allowed.shape[1],
+                     z:z + allowed.shape[2]] = allowed
+        self.cell_min = tuple(int(c) for c in low)
+
+    def __len__(self):
+        """Number of allowed cells"""
+        return int(np.count_nonzero(self.allowed))
+
+    def contains(self, cells):
+        """Checks which cells are allowed
+        :param cells: sequence of int tuples
+        :return: numpy array of Bools"""
+        indices = np.asarray(cells, dtype=np.int64).reshape(-1, 3) \
+            - self.cell_min
+        inside = np.all((indices >= 0) & (indices < self.allowed.shape),
+                        axis=1)
+        result = np.zeros(len(indices), dtype=bool)
+        result[inside] = self.allowed[tuple(indices[inside].T)]
+        return result
+
+
+class ReplicationPlan():
+    """Plans where and when replicants spawn, without touching bpy
+    Replicants sit on a lattice of cells spaced offset apart around origin,
+    so checking if a spot is empty is a set lookup. Plan index 0 is the
+    original object, and replicants are indexed in the order they spawn.
+    Arguments:
+    origin -- 3 numbers, location of the original object
+    offset -- number, distance between neighboring replicants
+    frame_start -- int, frame the first generation begins spawning
+    frames_to_spawn -- int, duration of each generation's spawn animation
+    use_x, use_y, use_z -- Bools, axes replicants can spawn along
+    domain -- DomainMask, replicants only spawn into its allowed cells
+    merge -- Bool, replicants spawning into the same cell are merged
+    """
+    # \/ Change order of these to alter replication behavior
+    DIRECTIONS = (('x', (1, 0, 0)), ('x', (-1, 0, 0)),
+                  ('y', (0, 1, 0)), ('y', (0, -1, 0)),
+                  ('z', (0, 0, 1)), ('z', (0, 0, -1)))
+
+    def __init__(self, origin=(0, 0, 0), offset=4.0, frame_start=0,
+                 frames_to_spawn=15, use_x=True, use_y=True, use_z=True,
+                 domain=None, merge=False):
+        self.origin = np.array(
+            (origin[0], origin[1], origin[2]), dtype=np.float64)
+        self.offset = offset
+        self.frame_start = frame_start
+        self.frames_to_spawn = frames_to_spawn
+        self.axes = (bool(use_x), bool(use_y), bool(use_z))
+        self.merge = bool(merge)
+        axes = {'x': use_x, 'y': use_y, 'z': use_z}
+        self.directions = [d for axis, d in self.DIRECTIONS if axes[axis]]
+
+        self.cells = [(0, 0, 0)]
+        self.parents = [-1]
+        self.generation_starts = [0]  # Plan index of each generation's first
+        self.occupied = {(0, 0, 0)}
+        # Plan indices that may still have an empty neighbor, in order
+        self.frontier = [0]
+        # Cells of the domain still free, so a spawn test is one lookup
+        self.domain = domain
+        self.free = None
+        if domain is not None:
+            self.free = domain.allowed.copy()
+            self.free[tuple(-np.asarray(domain.cell_min))] = False
+
+    @property
+    def num_generations(self):
+        """Number of generations planned, not counting the original object"""
+        return len(self.generation_starts) - 1
+
+    def __len__(self):
+        return len(self.cells)
+
+    def frameSpawn(self, generation):
+        """Returns first frame of given generation's spawn animation"""
+        return self.frame_start + (generation - 1) * self.frames_to_spawn
+
+    def locations(self, cells):
+        """Converts lattice cells to locations
+        :param cells: sequence of int tuples
+        :return: numpy array, shape (len(cells), 3)"""
+        cells = np.asarray(cells, dtype=np.float64).reshape(-1, 3)
+        return self.origin + cells * self.offset
+
+    def planGeneration(self):
+        """Plans the next generation
+        Each replicant spawns once into the first empty neighboring cell.
+        Only the frontier is checked, since a replicant found surrounded
+        stays surrounded.
+        :return: PlanGeneration"""
+        index_start = len(self.cells)
+        cells_new = []
+        parents_new = []
+        frontier = []  # Replicants surrounded on every side are dropped
+        if self.merge:
+            self._planMerging(cells_new, parents_new, frontier)
+        elif self.free is None:
+            for parent in self.frontier:
+                x, y, z = self.cells[parent]
+                for dx, dy, dz in self.directions:
+                    cell = (x + dx, y + dy, z + dz)
+                    if cell not in self.occupied:
+                        self.occupied.add(cell)
+                        cells_new.append(cell)
+                        parents_new.append(parent)
+                        frontier.append(parent)
+                        break
+        else:
+            free = self.free
+            min_x, min_y, min_z = self.domain.cell_min
+            for parent in self.frontier:
+                x, y, z = self.cells[parent]
+                for dx, dy, dz in self.directions:
+                    index = (x + dx - min_x, y + dy - min_y, z + dz - min_z)
+                    if free[index]:
+                        free[index] = False
+                        cell = (x + dx, y + dy, z + dz)
+                        self.occupied.add(cell)
+                        cells_new.append(cell)
+                        parents_new.append(parent)
+                        frontier.append(parent)
+                        break
+        frontier.extend(range(index_start, index_start + len(cells_new)))
+        self.frontier = frontier
+
+        self.cells.extend(cells_new)
+        self.parents.extend(parents_new)
+        self.generation_starts.append(index_start)
+        generation = self.num_generations
+        return PlanGeneration(
+            generation=generation,
+            frame_spawn=self.frameSpawn(generation),
+            index_start=index_start, parents=parents_new, cells=cells_new,
+            locations_start=self.locations(
+                [self.cells[p] for p in parents_new]),
+            locations_end=self.locations(cells_new))
+
+    def _planMerging(self, cells_new, parents_new, frontier):
+        """Plans the next generation's cells, merging replicants that
+        spawn into the same cell
+        Occupancy is double buffered. Cells are only checked against what
+        was occupied before this generation, so neighbors can pick the same
+        cell. Cells picked this generation are kept apart until it ends, and
+        a replicant picking one already picked is merged into the first.
+        :param cells_new: list, this generation's cells are appended to it
+        :param parents_new: list, parent of each cell is appended to it
+        :param frontier: list, replicants that spawned are appended to it
+        :return: None"""
+        occupied = self.occupied
+        free = self.free
+        min_x, min_y, min_z = (0, 0, 0) if free is None \
+            else self.domain.cell_min
+        picked = set()
+        for parent in self.frontier:
+            x, y, z = self.cells[parent]
+            for dx, dy, dz in self.directions:
+                cell = (x + dx, y + dy, z + dz)
+                if free is None:
+                    if cell in occupied:
+                        continue
+                elif not free[cell[0] - min_x, cell[1] - min_y,
+                              cell[2] - min_z]:
+                    continue
+                if cell not in picked:
+                    picked.add(cell)
+                    cells_new.append(cell)
+                    parents_new.append(parent)
+                frontier.append(parent)
+                break
+        occupied.update(picked)
+        if free is not None:
+            for x, y, z in picked:
+                free[x - min_x, y - min_y, z - min_z] = False
+
+    def getGeneration(self, generation, indices=None):
+        """Returns an already planned generation
+        :param generation: int, generation number, 1 or greater
+        :param indices: numpy array, only include these plan indices if given
+        :return: PlanGeneration"""
+        index_start = self.generation_starts[generation]
+        if generation + 1 < len(self.generation_starts):
+            index_stop = self.generation_starts[generation + 1]
+        else:
+            index_stop = len(self.cells)
+        generation_indices = np.arange(index_start, index_stop)
+        if indices is not None:
+            generation_indices = generation_indices[
+                np.isin(generation_indices, indices)]
+
+        cells = [self.cells[i] for i in generation_indices]
+        parents = [self.parents[i] for i in generation_indices]
+        return PlanGeneration(
+            generation=generation, frame_spawn=self.frameSpawn(generation),
+            index_start=index_start, parents=parents, cells=cells,
+            locations_start=self.locations([self.cells[p] for p in parents]),
+            locations_end=self.locations(cells), indices=generation_indices)
+
+    def generationsOf(self, indices):
+        """Returns generation number of each given plan index
+        :param indices: numpy array of ints
+        :return: numpy array of ints"""
+        return np.searchsorted(
+            np.asarray(self.generation_starts), indices, side='right') - 1
+
+    def lineage(self):
+        """Returns LineageIndex of the planned replicants"""
+        return LineageIndex(self.parents, self.generation_starts)
+
+    def hasSameSettings(self, other):
+        """True if other plan uses same lattice and spawn timing"""
+        return (np.array_equal(self.origin, other.origin)
+                and self.offset == other.offset
+                and self.frame_start == other.frame_start
+                and self.frames_to_spawn == other.frames_to_spawn
+                and self.merge == other.merge)
+
+    def unchangedIndices(self, other, start=0, stop=None):
+        """Finds replicants other plan spawns the same as this plan
+        Same means same cell, parent cell, and generation.
+        :param other: ReplicationPlan to compare with
+        :param start: int, first plan index to compare
+        :param stop: int, plan index to stop comparing before
+        :return: set of plan indices"""
+        stop = min(len(self), len(other), len(other) if stop is None else stop)
+        if start >= stop or not self.hasSameSettings(other):
+            return set()
+        indices = np.arange(start, stop)
+        # Only the compared replicants and their parents are converted
+        parents_self = self.parents[start:stop]
+        parents_other = other.parents[start:stop]
+        cells = [np.asarray(c, dtype=np.int64).reshape(-1, 3) for c in (
+            self.cells[start:stop], other.cells[start:stop],
+            [self.cells[p] for p in parents_self],
+            [other.cells[p] for p in parents_other])]
+
+        same = (cells[0] == cells[1]).all(axis=1)
+        same &= np.asarray(parents_self) == np.asarray(parents_other)
+        same &= (cells[2] == cells[3]).all(axis=1)
+        same &= self.generationsOf(indices) == other.generationsOf(indices)
+        return set(indices[same].tolist())
+
+    # Serialized plan: header, then int32 cells, parents and generation starts
+    _HEADER = struct.Struct("<4sI3ddii3?xIII")
+    _MAGIC = b"MTPL"
+    _VERSION = 1
+    _MERGE_FLAG = 1  # Bit of the header's flags set for merging plans
+
+    def toBytes(self):
+        """Packs the plan into compressed bytes, see fromBytes()
+        :return: bytes"""
+        header = self._HEADER.pack(
+            self._MAGIC, self._VERSION, *self.origin.tolist(),
+            float(self.offset), int(self.frame_start),
+            int(self.frames_to_spawn), *self.axes,
+            len(self.cells), len(self.generation_starts),
+            self._MERGE_FLAG if self.merge else 0)
+        arrays = (np.asarray(self.cells, dtype='<i4').tobytes()
+                  + np.asarray(self.parents, dtype='<i4').tobytes()
+                  + np.asarray(self.generation_starts, dtype='<i4').tobytes())
+        return zlib.compress(header + arrays)
+
+    @classmethod
+    def fromBytes(cls, data):
+        """Unpacks a plan packed by toBytes()
+        :param data: bytes
+        :return: ReplicationPlan"""
+        data = zlib.decompress(data)
+        (magic, version, origin_x, origin_y, origin_z, offset, frame_start,
+         frames_to_spawn, use_x, use_y, use_z, num_replicants,
+         num_generation_starts, flags) = cls._HEADER.unpack_from(data)
+        if magic != cls._MAGIC or version != cls._VERSION:
+            raise ValueError("Data is not a Mitosis plan this version of "
+                             "Mitosis can read.")
+        plan = cls(origin=(origin_x, origin_y, origin_z), offset=offset,
+                   frame_start=frame_start, frames_to_spawn=frames_to_spawn,
+                   use_x=use_x, use_y=use_y, use_z=use_z,
+                   merge=bool(flags & cls._MERGE_FLAG))
+
+        arrays = np.frombuffer(
+            data, dtype='<i4', offset=cls._HEADER.size).astype(np.int64)
+        cells_end = num_replicants * 3
+        parents_end = cells_end + num_replicants
+        plan.cells = [tuple(c) for c in
+                      arrays[:cells_end].reshape(-1, 3).tolist()]
+        plan.parents = arrays[cells_end:parents_end].tolist()
+        plan.generation_starts = arrays[
+            parents_end:parents_end + num_generation_starts].tolist()
+        plan.occupied = set(plan.cells)
+        plan.frontier = [
+            i for i, (x, y, z) in enumerate(plan.cells)
+            if any((x + dx, y + dy, z + dz) not in plan.occupied
+                   for dx, dy, dz in plan.directions)]
+        return plan
+
+
+class LineageIndex():
+    """Looks up generations and family trees of a plan's replicants
+    Children are grouped by parent in one array, so every lookup takes time
+    in proportion to the replicants it returns, not to the whole plan.
+    Arguments:
+    parents -- sequence of ints, plan index of each replicant's parent, -1
+               for the original object
+    generation_starts -- sequence of ints, plan index of each generation's
+                         first replicant
+    """
+    def __init__(self, parents, generation_starts):
+        self.parents = np.asarray(parents, dtype=np.int64)
+        self.generation_starts = np.append(
+            np.asarray(generation_starts, dtype=np.int64), len(self.parents))
+        # Children of i are children[child_starts[i]:child_starts[i + 1]].
+        # Replicants always spawn after their parent, so a stable sort
+        # keeps each parent's children in spawn order
+        self.children = np.argsort(self.parents[1:], kind='stable') + 1
+        self.child_starts = np.zeros(len(self.parents) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.parents[1:], minlength=len(self.parents)),
+                  out=self.child_starts[1:])
+
+    def __len__(self):
+        return len(self.parents)
+
+    @property
+    def num_generations(self):
+        """Number of generations, not counting the original object"""
+        return len(self.generation_starts) - 2
+
+    def generation(self, generation):
+        """Returns plan indices of a generation's replicants
+        :param generation: int, generation number, the original object is 0
+        :return: numpy array of ints"""
+        return np.arange(self.generation_starts[generation],
+                         self.generation_starts[generation + 1])
+
+    def generationsOf(self, indices):
+        """Returns generation number of each given plan index
+        :param indices: numpy array of ints
+        :return: numpy array of ints"""
+        return np.searchsorted(
+            self.generation_starts[:-1], indices, side='right') - 1
+
+    def childrenOf(self, indices):
+        """Returns plan indices of given replicants' children
+        :param indices: numpy array of ints
+        :return: numpy array of ints"""
+        indices = np.asarray(indices, dtype=np.int64)
+        starts = self.child_starts[indices]
+        counts = self.child_starts[indices + 1] - starts
+        # Position of each child within its parent's group, then its group
+        positions = np.arange(counts.sum()) - np.repeat(
+            np.cumsum(counts) - counts, counts)
+        return self.children[np.repeat(starts, counts) + positions]
+
+    def ancestors(self, indices):
+        """Returns plan indices of given replicants' ancestors
+        :param indices: numpy array of ints
+        :return: sorted numpy array of ints"""
+        found = []
+        indices = np.unique(np.asarray(indices, dtype=np.int64))
+        while len(indices):
+            indices = np.unique(self.parents[indices])
+            indices = indices[indices >= 0]
+            found.append(indices)
+        return np.unique(np.concatenate(found)) if found \
+            else np.zeros(0, dtype=np.int64)
+
+    def descendants(self, indices):
+        """Returns plan indices of given replicants' descendants
+        :param indices: numpy array of ints
+        :return: sorted numpy array of ints"""
+        found = []
+        indices = np.unique(np.asarray(indices, dtype=np.int64))
+        while len(indices):
+            indices = self.childrenOf(indices)
+            found.append(indices)
+        return np.unique(np.concatenate(found)) if found \
+            else np.zeros(0, dtype=np.int64)
+
+
+class Variation():
+    """Seeded random differences between the replicants of a bake
+    Each amount is drawn for a generation at once, from its own random
+    stream seeded by seed and generation number, so a replicant's values
+    only depend on its plan index, however its generation is split up.
+    Arguments:
+    seed -- int, 0 or greater, bakes with the same seed vary the same way
+    scale -- number, fraction end scale can differ by, ex: 0.2 for 80-120%
+    rotation -- number, radians replicants can be turned by on each axis
+    delay -- int, most frames a replicant's spawn can start late by
+    mod_amplitude -- number, fraction behavior mod changes can differ by
+    """
+    # Random stream of each amount
+    STREAMS = {'scale': 0, 'rotation': 1, 'delay': 2, 'mod_amplitude': 3}
+
+    def __init__(self, seed=0, scale=0.0, rotation=0.0, delay=0,
+                 mod_amplitude=0.0):
+        self.seed = int(seed)
+        self.scale = float(scale)
+        self.rotation = float(rotation)
+        self.delay = int(delay)
+        self.mod_amplitude = float(mod_amplitude)
+
+    def getParameters(self):
+        """Returns settings, which can be passed back as keyword arguments
+        :return: dict, can be converted to JSON"""
+        return {'seed': self.seed, 'scale': self.scale,
+                'rotation': self.rotation, 'delay': self.delay,
+                'mod_amplitude': self.mod_amplitude}
+
+    def _draw(self, amount, generation, positions, columns=1):
+        """Draws uniform values from -1 to 1 for replicants of a generation
+        Values are drawn in order of position, so a position's values don't
+        depend on which other positions are drawn with it. Each value uses
+        one step of the stream, so positions before the first drawn are
+        skipped by advancing the stream instead of drawing them.
+        :return: numpy array, shape (len(positions), columns)"""
+        if not len(positions):
+            return np.zeros((0, columns))
+        rng = np.random.default_rng(
+            [self.seed, generation, self.STREAMS[amount]])
+        first = int(positions.min())
+        rng.bit_generator.advance(first * columns)
+        count = int(positions.max()) + 1 - first
+        return rng.uniform(-1.0, 1.0, (count, columns))[positions - first]
+
+    def sample(self, generation, positions):
+        """Draws variation of replicants of a generation
+        :param generation: int, generation number
+        :param positions: numpy array of ints, position of each replicant
+                          within its generation, see PlanGeneration
+        :return: dict of numpy arrays, 'scale' and 'mod_amplitude' factors,
+                 'rotation' radians, shape (replicants, 3), and int
+                 'delay' frames"""
+        positions = np.asarray(positions, dtype=np.int64)
+        delay = (self._draw('delay', generation, positions)[:, 0] + 1) / 2
+        return {
+            'scale': 1 + self.scale * self._draw(
+                'scale', generation, positions)[:, 0],
+            'rotation': self.rotation * self._draw(
+                'rotation', generation, positions, columns=3),
+            'delay': np.minimum(np.floor(delay * (self.delay + 1)),
+                                self.delay).astype(np.int64),
+            'mod_amplitude': 1 + self.mod_amplitude * self._draw(
+                'mod_amplitude', generation, positions)[:, 0]}
+
+
+class PlanFileSink():
+    """Streams planned generations to a file instead of to Blender
+    Each generation is appended as soon as it's written, so a bake of any
+    size is never held in memory at once. Read back with iter_plan_file.
+    Arguments:
+    filepath -- str, path of file to write
+    plan -- ReplicationPlan, the generations' plan
+    """
+    _MAGIC = b"MTGS"
+    _VERSION = 1
+    # magic, version, origin, offset, frame_start, frames_to_spawn
+    _HEADER = struct.Struct("<4sI3ddii")
+    # generation, frame_spawn, index_start, number of replicants
+    _GENERATION = struct.Struct("<iiiI")
+
+    def __init__(self, filepath, plan):
+        self.filepath = filepath
+        self.file = open(filepath, 'wb')
+        self.file.write(self._HEADER.pack(
+            self._MAGIC, self._VERSION, *plan.origin.tolist(),
+            float(plan.offset), int(plan.frame_start),
+            int(plan.frames_to_spawn)))
+
+    def write(self, generation):
+        """Appends a generation to the file
+        :param generation: PlanGeneration
+        :return: None"""
+        self.file.write(self._GENERATION.pack(
+            generation.generation, generation.frame_spawn,
+            generation.index_start, len(generation)))
+        self.file.write(
+            np.asarray(generation.parents, dtype='<i4').tobytes()
+            + np.asarray(generation.cells, dtype='<i4').tobytes()
+            + np.asarray(generation.locations_start, dtype='<f4').tobytes()
+            + np.asarray(generation.locations_end, dtype='<f4').tobytes())
+
+    def close(self):
+        self.file.close()
+
+
+def iter_plan_file(filepath):
+    """Reads generations written by a PlanFileSink one at a time
+    :param filepath: str, path of file written by PlanFileSink
+    :return: generator of PlanGenerations"""
+    with open(filepath, 'rb') as f:
+        header = f.read(PlanFileSink._HEADER.size)
+        if (len(header) < PlanFileSink._HEADER.size
+                or PlanFileSink._HEADER.unpack(header)[:2]
+                != (PlanFileSink._MAGIC, PlanFileSink._VERSION)):
+            raise ValueError("{0} is not a Mitosis generation file this "
+                             "version of Mitosis can read.".format(filepath))
+        while True:
+            record = f.read(PlanFileSink._GENERATION.size)
+            if not record:
+                return
+            generation, frame_spawn, index_start, count = \
+                PlanFileSink._GENERATION.unpack(record)
+            ints = np.frombuffer(f.read(count * 16), dtype='<i4')
+            floats = np.frombuffer(f.read(count * 24), dtype='<f4')
+            yield PlanGeneration(
+                generation=generation, frame_spawn=frame_spawn,
+                index_start=index_start, parents=ints[:count].tolist(),
+                cells=[tuple(c) for c in ints[count:].reshape(-1, 3).tolist()],
+                locations_start=floats[:count * 3].reshape(-1, 3),
+                locations_end=floats[count * 3:].reshape(-1, 3))
+
+
+# Custom properties Mitosis stores its output's plan and settings in
+PLAN_PROP = "mitosis_plan"
+PARAMETERS_PROP = "mitosis_parameters"
+PLAN_INDEX_PROP = "mitosis_index"
+# Name of the collection of an object's latest animation, kept on the object
+OUTPUT_COLLECTION_PROP = "mitosis_output_collection"
+
+
+def store_plan(collection, plan, parameters):
+    """Saves a plan and its parameters in a collection's custom properties
+    Saved with the .blend, so the plan is available without rebaking
+    :param collection: blender collection holding the plan's replicants
+    :param plan: ReplicationPlan
+    :param parameters: dict, replicator settings, see getParameters()
+    :return: None"""
+    # Stored as text, byte string ID properties lose trailing null bytes
+    collection[PLAN_PROP] = base64.b64encode(plan.toBytes()).decode('ascii')
+    collection[PARAMETERS_PROP] = json.dumps(parameters, sort_keys=True)
+    source = bpy.data.objects.get(parameters.get('source') or "")
+    if source is not None:
+        source[OUTPUT_COLLECTION_PROP] = collection.name
+
+
+def load_plan(collection):
+    """Returns plan stored in collection by store_plan(), or None"""
+    data = collection.get(PLAN_PROP)
+    if data is None:
+        return None
+    return ReplicationPlan.fromBytes(base64.b64decode(data))
+
+
+def load_parameters(collection):
+    """Returns parameters stored in collection by store_plan(), or None"""
+    parameters = collection.get(PARAMETERS_PROP)
+    if parameters is None:
+        return None
+    return json.loads(parameters)
+
+
+def remove_replicant(obj):
+    """Deletes a replicant object, and its action and data if unused after
+    :param obj: blender object
+    :return: None"""
+    ids = [obj]
+    if obj.animation_data is not None and obj.animation_data.action:
+        if obj.animation_data.action.users == 1:
+            ids.append(obj.animation_data.action)
+    if obj.data is not None and obj.data.users == 1:
+        ids.append(obj.data)
+    bpy.data.batch_remove(ids=ids)
+
+
+def find_output_collection(obj):
+    """Finds collection holding a stored Mitosis animation of obj
+    :param obj: blender object that was replicated, one of its replicants,
+                or an instance of the animation
+    :return: blender collection, or None if there isn't one"""
+    if obj.instance_type == 'COLLECTION' and obj.instance_collection:
+        collection = obj.instance_collection
+        collection = bpy.data.collections.get(
+            collection.get(VARIANT_OF_PROP, ""), collection)
+        if collection.get(PLAN_PROP) is not None:
+            return collection
+    if obj.get(PLAN_INDEX_PROP) is not None:
+        for collection in obj.users_collection:
+            if collection.get(PLAN_PROP) is not None:
+                return collection
+    collection = bpy.data.collections.get(obj.get(OUTPUT_COLLECTION_PROP, ""))
+    if collection is not None:
+        parameters = load_parameters(collection)
+        if parameters and parameters.get('source') == obj.name:
+            return collection
+    # Animations from before the collection was recorded on the object, or
+    # whose collection was renamed. Later bakes get higher name suffixes
+    found = None
+    for collection in bpy.data.collections:
+        parameters = load_parameters(collection)
+        if parameters and parameters.get('source') == obj.name:
+            found = collection
+    return found
+
+
+# Collection name: (stored plan, number of objects, LineageIndex, object of
+# each plan index), so selecting by lineage doesn't search every object
+_lineage_cache = {}
+
+
+@persistent
+def clear_lineage_cache(*args):
+    """Forgets cached objects, which undo and loading files replace"""
+    _lineage_cache.clear()
+
+
+def get_lineage(collection):
+    """Returns lineage and objects of an animation stored by store_plan()
+    Cached until the collection's plan or objects change
+    :param collection: blender collection holding a stored animation
+    :return: tuple of LineageIndex, and list of the object of each plan index,
+             None where it has none"""
+    data = collection.get(PLAN_PROP)
+    cached = _lineage_cache.get(collection.name_full)
+    if cached is not None and cached[0] == data \
+            and cached[1] == len(collection.objects):
+        return cached[2], cached[3]
+
+    lineage = load_plan(collection).lineage()
+    objects = [None] * len(lineage)
+    parameters = load_parameters(collection) or {}
+    objects[0] = bpy.data.objects.get(parameters.get('source') or "")
+    for obj in collection.objects:
+        index = obj.get(PLAN_INDEX_PROP)
+        if index is not None and index < len(objects):
+            objects[index] = obj
+    _lineage_cache[collection.name_full] = (
+        data, len(collection.objects), lineage, objects)
+    return lineage, objects
+
+
+def select_replicants(objects, indices):
+    """Selects objects of given plan indices
+    :param objects: list of objects by plan index, see get_lineage()
+    :param indices: numpy array of ints
+    :return: int, number of objects selected"""
+    num_selected = 0
+    for index in indices.tolist():
+        obj = objects[index]
+        if obj is None:  # Not built, or outside the frame window
+            continue
+        try:
+            obj.select_set(True)
+        except RuntimeError:  # Not in the view layer
+            continue
+        num_selected += 1
+    return num_selected
+
+
+def voxelize_mesh(obj, origin, offset):
+    """Finds lattice cells inside a closed mesh, for a DomainMask
+    Casts a ray up each column of lattice cells, and counts the surfaces it
+    crosses, so a cell is inside when an odd number are below it.
+    :param obj: blender mesh object, must be closed
+    :param origin: 3 numbers, location of lattice cell (0, 0, 0)
+    :param offset: number, distance between lattice cells
+    :return: DomainMask"""
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    obj_eval = obj.evaluated_get(depsgraph)
+    mesh = obj_eval.to_mesh()
+    try:
+        vertices = [obj.matrix_world @ v.co for v in mesh.vertices]
+        polygons = [tuple(p.vertices) for p in mesh.polygons]
+    finally:
+        obj_eval.to_mesh_clear()
+    if not polygons:
+        raise ValueError("Domain {0} has no faces to fill.".format(obj.name))
+    tree = BVHTree.FromPolygons(vertices, polygons)
+
+    origin = np.array((origin[0], origin[1], origin[2]), dtype=np.float64)
+    corners = np.array([tuple(v) for v in vertices])
+    cell_min = np.floor((corners.min(axis=0) - origin) / offset).astype(int)
+    cell_max = np.ceil((corners.max(axis=0) - origin) / offset).astype(int)
+    allowed = np.zeros(tuple(cell_max - cell_min + 1), dtype=bool)
+    z_cells = origin[2] + np.arange(cell_min[2], cell_max[2] + 1) * offset
+    z_start = z_cells[0] - offset
+    direction = mathutils.Vector((0, 0, 1))
+
+    for i in range(allowed.shape[0]):
+        x = origin[0] + (cell_min[0] + i) * offset
+        for j in range(allowed.shape[1]):
+            y = origin[1] + (cell_min[1] + j) * offset
+            crossings = []
+            ray_start = mathutils.Vector((x, y, z_start))
+            while True:
+                hit = tree.ray_cast(ray_start, direction)[0]
+                if hit is None:
+                    break
+                crossings.append(hit.z)
+                ray_start = hit + direction * (offset * 1e-4)
+            # Cells between each entering and leaving crossing are inside
+            if len(crossings) > 1:
+                allowed[i, j] = np.searchsorted(crossings, z_cells) % 2 == 1
+    return DomainMask(allowed, cell_min)
+
+
 ##########################
 # Behavior Mixin Methods #
 ##########################
 # For Replicant Objects
 
-class DivideMixin():
-    """Replicant Methods for divide behavior
-    """
-    def setAttributesStart(self, frame_current):
-        Replicant.setAttributesStart(self, frame_current)
-
-
 class AppearMixin():
     """Replicant Methods for Appear behavior
     """
-    def setScaleStart(self):
-        pass
+    @classmethod
+    def templateScaleStart(cls, parent):
+        return parent.obj_to_copy.scale
+
+    @classmethod
+    def templateFrameVisible(cls, frame_spawn, frames_to_spawn):
+        """Visible frame is last frame of spawn"""
+        return frame_spawn - 1 + frames_to_spawn
+
+    @classmethod
+    def templateLocationStart(cls, locations_start, locations_end):
+        return locations_end
 
     def assignMotionPath(self, location_start, location_end):
         self.location_start = location_end
         self.location_end = location_end
 
-    def setViewportVisAnimation(self, frame_visible, frame_hidden=False,
-        frames_to_spawn=False):
-        """Modified original func to make visible frame last frame of spawn"""
-        frame_visible = frame_visible + self.parent.frames_to_spawn
-        Replicant.setViewportVisAnimation(self, frame_visible,
-            frame_hidden=False, frames_to_spawn=False)
-
-    def animateViewportVisiblity(self, frame_visible, frame_hidden=False):
-        """DOESNT DO ANYTIHNG YET Deciding whether to replace above method to not repeat code w/ BehaviorModifiers"""
-        BehaviorModifiers.setBehavior(
-            blender_obj=self.obj, keyframe_start=frame_visible,
-            data_path='hide_viewport', duration=1)
-
-
-class AppearMixin_MBall(AppearMixin):
-    """Replicant Methods for Appear behavior of MBall
-    """
-    def setKeyframesEnd(self, current_frame):
-        # Additional lines for MBall specifically
-        self.setScaleStart()
-        self.obj.keyframe_insert(
-            data_path="scale", frame=(current_frame - 1))
-        self.obj.scale = self.scale_end
-
-        # original setKeyframesMethod below
-        self.obj.keyframe_insert(
-            data_path="scale", frame=current_frame)
-        self.obj.keyframe_insert(
-            data_path="location", frame=current_frame)
-
 
 class InflateMixin():
     """Replicant Methods for Inflate behavior.
     """
-    def setScaleStart(self):
-        """Sets size of replicant before it moves to its final position"""
-        self.obj.scale[0] = 0
-        self.obj.scale[1] = 0
-        self.obj.scale[2] = 0
+    @classmethod
+    def templateScaleStart(cls, parent):
+        return (0, 0, 0)
+
+    @classmethod
+    def templateLocationStart(cls, locations_start, locations_end):
+        return locations_end
 
     def assignMotionPath(self, location_start, location_end):
         self.location_start = location_end
@@ -459,14 +1329,12 @@ class InflateMixin():
 
 
 class DivideAndMergeMixin():
-    """locationIsEmpty only detects what was empty in previous generation
-    Therefore, two objects can go to the same location in a given generation
+    """Replicant Methods for Divide and Merge behavior
+    Replicants divide like DIVIDE, but only check which cells were empty in
+    previous generations, so two can divide into the same cell, where they
+    merge into one object. See ReplicationPlan._planMerging().
     """
-    def locationIsEmpty(self, location_vector):
-        for replicant in self.replicants:
-            if replicant.obj.location == location_vector:
-                return False
-        return True
+    merges = True
 
 
 ##################################
@@ -517,8 +1385,6 @@ class BehaviorModifiers():
         except IndexError:
             current_value = blender_obj.__getattribute__(data_path)[index]
 
-        bpy.context.scene.frame_current = frame_start
-
         #fc.keyframe_points.add(2)
         #fc.keyframe_points.foreach_set(  # first arg attribute, second sequence
         #    'co', [keyframe_start, current_value, final_frame, value])
@@ -529,6 +1395,13 @@ class BehaviorModifiers():
 
         fc.update()
 
+    def getCurrentValue(blender_obj, data_path, index=0):
+        """Returns value of data_path at given index, 0.0 if not found"""
+        try:
+            return float(getattr(blender_obj, data_path)[index])
+        except (AttributeError, IndexError, TypeError):
+            return 0.0
+
     ### Specific Behavior Functions ###
     # These are works in progress, not currently used, & may not be functional
     # Currently unsure if it's a useful direction at the moment.
@@ -624,10 +1497,830 @@ class BehaviorModifiers():
             data_path=behavior, frame=final_frame)
 
 
+def keyframe_window_mask(frames, frame_window):
+    """Finds keyframes needed to play a curve within a frame window
+    Those outside the window are dropped, except the nearest one on each
+    side, which keep the curve's shape inside the window.
+    :param frames: numpy array, increasing keyframe frames
+    :param frame_window: tuple of (first, last) frame, or None for all
+    :return: numpy array of Bools, True for keyframes to keep"""
+    if frame_window is None:
+        return np.ones(len(frames), dtype=bool)
+    first, last = frame_window
+    keep = (frames >= first) & (frames <= last)
+    before = np.flatnonzero(frames < first)
+    after = np.flatnonzero(frames > last)
+    if len(before):
+        keep[before[-1]] = True
+    if len(after):
+        keep[after[0]] = True
+    return keep
+
+
+def clip_keyframes(co, frame_window):
+    """Returns flat co array with only keyframes keyframe_window_mask keeps
+    :param co: numpy array, flat frame and value pairs
+    :param frame_window: tuple of (first, last) frame, or None for all
+    :return: numpy array"""
+    if frame_window is None:
+        return co
+    return co[np.repeat(keyframe_window_mask(co[0::2], frame_window), 2)]
+
+
+def write_fcurve(action, data_path, index, co, group=""):
+    """Creates fcurve in action holding given keyframe coordinates
+    :param action: blender Action to add the fcurve to
+    :param data_path: str, data path of the animated property
+    :param index: int, index of the animated property
+    :param co: numpy array, flat frame and value pairs
+    :param group: str, name of action group, none if empty
+    :return: the new fcurve"""
+    fc = action.fcurves.new(
+        data_path=data_path, index=index, action_group=group)
+    fc.keyframe_points.add(len(co) // 2)
+    fc.keyframe_points.foreach_set('co', co)
+    fc.update()
+    # Without fc.update(), left keyframe tangents/"Bézier handles"
+    # will extend to zero,  warping the shape of the curves
+    return fc
+
+
+class SpawnKeyframeTemplate():
+    """Spawn animation keyframes shared by a generation of replicants
+    Every replicant of a generation spawns over the same frames, and only
+    differs in its location. Frames, scale and visibility keyframes are
+    computed once per generation and replicant type, and location values
+    are filled in for the whole generation at once.
+    :param replicant_type: Replicant subclass, supplies behavior specifics
+    :param parent: Replicator spawning the generation
+    :param frame_spawn: int, first frame of the generation's spawn animation
+    With the parent's frame_window set, keyframes are clipped to it, and
+    generations that finish spawning before it are static. With the
+    parent's variation set, keyframes are scaled and delayed per replicant.
+    """
+    TRANSFORM_GROUP = "Object Transforms"  # Same group keyframe_insert uses
+
+    def __init__(self, replicant_type, parent, frame_spawn):
+        frames_to_spawn = parent.frames_to_spawn
+        self.frame_start = frame_spawn
+        self.frame_end = frame_spawn + frames_to_spawn
+        if frames_to_spawn:
+            self.frames = np.array(
+                [self.frame_start, self.frame_end], dtype=np.float32)
+        else:  # Start and end keyframes would land on the same frame
+            self.frames = np.array([self.frame_end], dtype=np.float32)
+
+        scale_start = replicant_type.templateScaleStart(parent)
+        self.scale = []
+        for i in range(3):
+            values = [scale_start[i], parent.scale_end[i]]
+            self.scale.append(self._coordinates(values[-len(self.frames):]))
+
+        # Object is hidden when fcurve y-value is greater than or equal to 1
+        frame_visible = replicant_type.templateFrameVisible(
+            frame_spawn, frames_to_spawn)
+        frame_visible = (frame_visible - 1) if frame_visible >= 0 else 0
+        self.visibility = np.array(
+            [0, 1, frame_visible, 1, frame_visible + 1, 0], dtype=np.float32)
+
+        frame_window = parent.frame_window
+        variation = getattr(parent, 'variation', None)
+        if frame_window is not None and variation is not None:
+            # Keyframes of late spawning replicants are shifted, so keep
+            # those that could be shifted into the window
+            frame_window = (frame_window[0] - variation.delay,
+                            frame_window[1])
+        # Generations not seen in the window aren't needed at all, and those
+        # done spawning before it only need their final state
+        self.after_window = (frame_window is not None
+                             and frame_visible + 1 > frame_window[1])
+        self.static = (frame_window is not None
+                       and self.frame_end <= frame_window[0])
+        self._keys = keyframe_window_mask(self.frames, frame_window)
+        self.scale = [co[np.repeat(self._keys, 2)] for co in self.scale]
+        self.visibility = clip_keyframes(self.visibility, frame_window)
+
+    def _coordinates(self, values):
+        """Returns flat co array pairing template frames with values"""
+        co = np.empty(len(self.frames) * 2, dtype=np.float32)
+        co[0::2] = self.frames
+        co[1::2] = values
+        return co
+
+    def locationCoordinates(self, replicants):
+        """Returns location co arrays for a generation of replicants
+        :param replicants: list of Replicants
+        :return: numpy array, shape (replicants, 3 axes, 2 * keyframes)"""
+        locations = np.empty((len(replicants), 2, 3), dtype=np.float32)
+        for i, replicant in enumerate(replicants):
+            locations[i, 0] = replicant.location_start
+            locations[i, 1] = replicant.location_end
+        num_keyframes = len(self.frames)
+        locations = locations[:, -num_keyframes:, :]
+
+        co = np.empty((len(replicants), 3, num_keyframes * 2),
+                      dtype=np.float32)
+        co[:, :, 0::2] = self.frames
+        co[:, :, 1::2] = locations.transpose(0, 2, 1)
+        return co[:, :, np.repeat(self._keys, 2)]
+
+    def applyTo(self, replicants, variation=None):
+        """Writes spawn animation of each replicant in a generation
+        :param replicants: list of Replicants spawned in this generation
+        :param variation: dict of each replicant's variation, see
+                          Variation.sample()
+        :return: None"""
+        location_co = self.locationCoordinates(replicants)
+        scale_co = np.broadcast_to(
+            np.array(self.scale), (len(replicants), 3, len(self.scale[0])))
+        visibility_co = np.broadcast_to(
+            self.visibility, (len(replicants), len(self.visibility)))
+        if variation is not None:
+            scale_co = scale_co.copy()
+            scale_co[:, :, 1::2] *= variation['scale'][:, None, None]
+            delays = variation['delay'].astype(np.float32)
+            location_co[:, :, 0::2] += delays[:, None, None]
+            scale_co[:, :, 0::2] += delays[:, None, None]
+            visibility_co = visibility_co.copy()
+            visibility_co[:, 0::2] += delays[:, None]
+
+        for replicant, location, scale, visibility in zip(
+                replicants, location_co, scale_co, visibility_co):
+            obj = replicant.obj
+            if obj.animation_data is None:
+                obj.animation_data_create()
+            ac = obj.animation_data.action
+            if ac is None:
+                ac = bpy.data.actions.new(obj.name + "Action")
+                obj.animation_data.action = ac
+
+            for i in range(3):
+                write_fcurve(ac, 'scale', i, scale[i], self.TRANSFORM_GROUP)
+            for i in range(3):
+                write_fcurve(
+                    ac, 'location', i, location[i], self.TRANSFORM_GROUP)
+            write_fcurve(ac, 'hide_viewport', 0, visibility)
+            write_fcurve(ac, 'hide_render', 0, visibility)
+
+
+class BehaviorModTimeline():
+    """Behavior mods compiled into keyframe buffers for each fcurve
+    Each (data_path, index) channel gets one segment timeline, with keyframe
+    frames stored relative to the frame the mod delays count from.
+    Overlapping mods on the same channel are resolved by start frame. A mod
+    starting before the previous one ends cuts the previous one short at the
+    value it had reached. Of mods starting on the same frame, the one added
+    last is used.
+    :param behavior_mods: list of behavior mod dicts, see addBehaviorMods
+    :param base_obj: blender object, values before any mod are read from it
+    :param frame_window: tuple of (first, last) frame keyframes are clipped
+                         to, see keyframe_window_mask
+    """
+    def __init__(self, behavior_mods, base_obj=None, frame_window=None):
+        self.frame_window = frame_window
+        self.channels = {}  # (data_path, index): flat array of co pairs
+        self._buffers = {}  # Frame offset: channel buffers offset to it
+        self.compile(behavior_mods, base_obj)
+
+    def compile(self, behavior_mods, base_obj=None):
+        """Builds keyframe buffer for each channel used by behavior_mods
+        :return: None"""
+        segments = {}
+        for order, mod in enumerate(behavior_mods):
+            channel = (mod['data_path'], mod['index'])
+            start = mod['delay'] if mod['delay'] else 0
+            segments.setdefault(channel, []).append(
+                (start, order, start + mod['duration'], mod['value']))
+
+        self.channels.clear()
+        self._buffers.clear()
+        for channel, channel_segments in segments.items():
+            channel_segments.sort()
+            if base_obj is None:
+                value_current = 0.0
+            else:
+                value_current = BehaviorModifiers.getCurrentValue(
+                    base_obj, channel[0], channel[1])
+            keyframes = []
+            for i, (start, order, end, value) in enumerate(channel_segments):
+                if i + 1 < len(channel_segments):
+                    start_next = channel_segments[i + 1][0]
+                    if start_next <= start:
+                        continue  # Completely replaced by next mod
+                    if start_next < end:  # Cut short by next mod
+                        value = value_current + (value - value_current) * (
+                            (start_next - start) / (end - start))
+                        end = start_next
+                self._addKeyframe(keyframes, start, value_current)
+                self._addKeyframe(keyframes, end, value)
+                value_current = value
+            self.channels[channel] = np.array(
+                keyframes, dtype=np.float32).ravel()
+
+    def _addKeyframe(self, keyframes, frame, value):
+        """Appends keyframe, replacing the last one if on the same frame"""
+        if keyframes and keyframes[-1][0] == frame:
+            keyframes[-1] = (frame, value)
+        else:
+            keyframes.append((frame, value))
+
+    def keyframeBuffers(self, frame_offset):
+        """Returns channel keyframe buffers offset to given frame
+        Buffers are kept for each frame_offset, since every replicant of a
+        generation shares the same frame, or one of a few with delays.
+        :param frame_offset: int, frame the behavior mod delays count from
+        :return: dict, (data_path, index) keys with flat co arrays as values"""
+        buffers = self._buffers.get(frame_offset)
+        if buffers is None:
+            buffers = {}
+            for channel, keyframes in self.channels.items():
+                buffer = keyframes.copy()
+                buffer[0::2] += frame_offset
+                buffers[channel] = clip_keyframes(buffer, self.frame_window)
+            self._buffers[frame_offset] = buffers
+        return buffers
+
+    def applyTo(self, blender_obj, frame_offset, amplitude=1.0):
+        """Writes compiled behavior mod keyframes to a blender object
+        :param blender_obj: blender object to animate
+        :param frame_offset: int, frame the behavior mod delays count from
+        :param amplitude: number, factor of each mod's change in value from
+                          the value before any mod
+        :return: None"""
+        if not self.channels:
+            return
+        if blender_obj.animation_data is None:
+            blender_obj.animation_data_create()
+        ac = blender_obj.animation_data.action
+        if ac is None:
+            ac = bpy.data.actions.new(blender_obj.name + "Action")
+            blender_obj.animation_data.action = ac
+
+        for (data_path, index), buffer in self.keyframeBuffers(
+                frame_offset).items():
+            if amplitude != 1.0:
+                value_start = self.channels[(data_path, index)][1]
+                buffer = buffer.copy()
+                buffer[1::2] = value_start + (
+                    buffer[1::2] - value_start) * amplitude
+            fc = ac.fcurves.find(data_path=data_path, index=index)
+            if fc is None:
+                fc = ac.fcurves.new(data_path=data_path, index=index)
+                fc.keyframe_points.add(len(buffer) // 2)
+                fc.keyframe_points.foreach_set('co', buffer)
+            else:  # Channel already animated, merge keyframes in
+                for i in range(0, len(buffer), 2):
+                    fc.keyframe_points.insert(
+                        frame=buffer[i], value=buffer[i + 1])
+            fc.update()
+
+
+def update_behavior_mods(collection, behavior_mods):
+    """Replaces behavior mods of an existing Mitosis animation
+    Only the behavior mod fcurves are rewritten, replicants are kept as is
+    :param collection: blender collection with a stored plan
+    :param behavior_mods: list of behavior mod dicts, see addBehaviorMods
+    :return: int, number of replicants updated"""
+    plan = load_plan(collection)
+    parameters = load_parameters(collection)
+    if plan is None:
+        raise ValueError("Collection {0} has no stored Mitosis animation "
+                         "to update.".format(collection.name))
+    base_obj = bpy.data.objects.get(parameters['source'] or "")
+    frame_window = parameters.get('frame_window')
+    timeline = BehaviorModTimeline(behavior_mods, base_obj=base_obj,
+                                   frame_window=frame_window and tuple(
+                                       frame_window))
+
+    # Clear fcurves of previous mods, and those any mod type could use
+    data_paths = set(BehaviorModifiers.mods.values())
+    data_paths.update(mod['data_path'] for mod in parameters['behavior_mods'])
+
+    objs = [obj for obj in collection.objects
+            if obj.get(PLAN_INDEX_PROP) is not None]
+    indices = np.array([obj[PLAN_INDEX_PROP] for obj in objs], dtype=np.int64)
+    generations = plan.generationsOf(indices)
+    # Mod delays count from the end of each generation's spawn animation
+    frames = plan.frame_start + generations * plan.frames_to_spawn
+    # Varied replicants keep their spawn delay and mod amplitude
+    amplitudes = np.ones(len(objs))
+    if parameters.get('variation'):
+        variation = Variation(**parameters['variation'])
+        for generation in np.unique(generations):
+            members = np.flatnonzero(generations == generation)
+            sampled = variation.sample(
+                int(generation),
+                indices[members] - plan.generation_starts[generation])
+            frames[members] += sampled['delay']
+            amplitudes[members] = sampled['mod_amplitude']
+
+    # Sorted by frame so each generation's keyframe buffers are made once
+    for i in np.argsort(frames, kind='stable'):
+        obj = objs[i]
+        if obj.animation_data is not None and obj.animation_data.action:
+            fcurves = obj.animation_data.action.fcurves
+            for fc in list(fcurves):
+                if fc.data_path in data_paths:
+                    fcurves.remove(fc)
+        timeline.applyTo(obj, int(frames[i]), amplitude=amplitudes[i])
+
+    parameters['behavior_mods'] = behavior_mods
+    store_plan(collection, plan, parameters)
+    return len(objs)
+
+
+#######################
+# Keyframe Decimation #
+#######################
+# Blender independent, safe to run outside Blender's main thread
+
+HANDLE_ALIGNED = 3  # 'ALIGNED' keyframe handle type, as read by foreach_get
+
+# Channels decimated at once, small enough for temporary arrays to stay cached
+DECIMATE_CHUNK = 256
+
+
+def sample_slopes(frames, values):
+    """Returns slope of each channel at each sample
+    :param frames: numpy array, (samples,) increasing frames
+    :param values: numpy array, (channels, samples)
+    :return: numpy array, (channels, samples)"""
+    values = np.asarray(values, dtype=np.float64)
+    if values.shape[-1] < 2:
+        return np.zeros_like(values)
+    return np.gradient(values, np.asarray(frames, dtype=np.float64), axis=-1)
+
+
+def bezier_handles(frames, values, slopes, frame_before=None):
+    """Returns Bezier handles of keyframes so each segment between them is
+    the cubic through both keys with the given slopes
+    :param frames: numpy array, (keys,) keyframe frames
+    :param values: numpy array, (keys,) keyframe values
+    :param slopes: numpy array, (keys,) slope at each keyframe
+    :param frame_before: number, frame of a keyframe before these, if any
+    :return: tuple of numpy arrays, (keys, 2) left and right handles"""
+    gaps = np.diff(frames) / 3
+    if len(gaps) == 0:
+        gaps = np.ones(1)
+    left = np.concatenate(([gaps[0]], gaps))
+    if frame_before is not None:
+        left[0] = (frames[0] - frame_before) / 3
+    right = np.concatenate((gaps, [gaps[-1]]))
+    handles_left = np.column_stack((frames - left, values - slopes * left))
+    handles_right = np.column_stack((frames + right, values + slopes * right))
+    return handles_left, handles_right
+
+
+def decimate_channels(frames, values, tolerance):
+    """Picks the fewest keyframes of each channel that keep its Bezier curve,
+    with handles from bezier_handles and sample_slopes, within tolerance of
+    every sample. Each pass keys the worst sample of every segment still out
+    of tolerance, for every channel at once.
+    :param frames: numpy array, (samples,) increasing frames of every channel
+    :param values: numpy array, (channels, samples)
+    :param tolerance: number, largest allowed difference from a sample
+    :return: numpy array, (channels, samples) Bools, True for samples kept
+             as keyframes. The first and last samples are always kept"""
+    frames = np.asarray(frames, dtype=np.float64)
+    values = np.asarray(values).reshape(-1, len(frames))
+    keep = np.zeros(values.shape, dtype=bool)
+    keep[:, 0] = True
+    keep[:, -1] = True
+    for start in range(0, len(values), DECIMATE_CHUNK):
+        stop = start + DECIMATE_CHUNK
+        _decimate_chunk(frames, values[start:stop].astype(np.float64),
+                        keep[start:stop], tolerance)
+    return keep
+
+
+def _decimate_chunk(frames, values, keep, tolerance):
+    """Adds keys to keep, in place, until values are within tolerance"""
+    num_samples = values.shape[1]
+    slopes = sample_slopes(frames, values)
+    positions = np.arange(num_samples)
+    active = np.arange(len(values))  # Channels still out of tolerance
+    while len(active):
+        kept = keep[active]
+        # Keys on each side of every sample
+        before = np.maximum.accumulate(np.where(kept, positions, 0), axis=1)
+        after = np.minimum.accumulate(
+            np.where(kept, positions, num_samples - 1)[:, ::-1], axis=1)[:, ::-1]
+        width = frames[after] - frames[before]
+        t = np.divide(frames - frames[before], width,
+                      out=np.zeros(width.shape), where=width > 0)
+        # Cubic Hermite form of the Bezier segment
+        t2 = t * t
+        h01 = t2 * (3 - 2 * t)
+        h11 = t2 * (t - 1)
+        h10 = t - t2 + h11
+        channel_values = values[active]
+        channel_slopes = slopes[active]
+        value_before = np.take_along_axis(channel_values, before, axis=1)
+        curve = (value_before
+                 + h01 * (np.take_along_axis(channel_values, after, axis=1)
+                          - value_before)
+                 + width * (h10 * np.take_along_axis(
+                     channel_slopes, before, axis=1)
+                            + h11 * np.take_along_axis(
+                                channel_slopes, after, axis=1)))
+        error = np.abs(curve - channel_values)
+        error[kept] = 0
+        over = (error > tolerance).any(axis=1)
+        active = active[over]
+        error = error[over]
+        kept = kept[over]
+        if not len(active):
+            return keep
+
+        # Segments run from each key up to the next, in flattened order
+        segment_starts = np.flatnonzero(kept)
+        segment_worst = np.maximum.reduceat(error.ravel(), segment_starts)
+        segments = np.cumsum(kept.ravel()) - 1
+        worst = np.flatnonzero((error.ravel() == segment_worst[segments])
+                               & (error.ravel() > tolerance))
+        # Ties within a segment only need one new key
+        _, first = np.unique(segments[worst], return_index=True)
+        worst = worst[first]
+        keep[active[worst // num_samples], worst % num_samples] = True
+    return keep
+
+
+############
+# Flocking #
+############
+
+class FlockSimulation():
+    """Boids style flocking of replicants, without touching bpy
+    Each agent steers away from crowded neighbors (separation), toward its
+    neighbors' heading (alignment) and toward their center (cohesion).
+    Neighbors are every agent in the surrounding 3x3x3 cells of a grid, with
+    each cell summarized by its agent count and sums of their positions and
+    velocities, so a step costs the same however crowded the flock gets.
+    Arguments:
+    positions -- numpy array, (agents, 3) start locations
+    velocities -- numpy array, (agents, 3) start velocities in units per
+                  frame. Random directions at half max_speed if None
+    neighbor_radius -- number, grid cell size for alignment and cohesion
+    separation_radius -- number, grid cell size for separation
+    separation, alignment, cohesion -- numbers, weight of each rule
+    max_speed -- number, units per frame agents can't go faster than
+    max_force -- number, most agents can change velocity by in a frame.
+                 Defaults to a twentieth of max_speed
+    seed -- int, seed of random start velocities
+    workers -- int, number of processes stepping tiles of the flock, or 0
+               for one per CPU core. Needs the fork start method, so other
+               platforms than Linux step in this process
+    """
+    NEIGHBOR_OFFSETS = np.array(
+        [(x, y, z) for x in (-1, 0, 1) for y in (-1, 0, 1) for z in (-1, 0, 1)],
+        dtype=np.int64)
+
+    def __init__(self, positions, velocities=None, neighbor_radius=10.0,
+                 separation_radius=4.0, separation=1.5, alignment=1.0,
+                 cohesion=1.0, max_speed=0.5, max_force=None, seed=0,
+                 workers=1):
+        self.positions = np.array(positions, dtype=np.float64).reshape(-1, 3)
+        if velocities is None:
+            rng = np.random.default_rng(seed)
+            velocities = rng.normal(size=self.positions.shape)
+            lengths = np.linalg.norm(velocities, axis=1, keepdims=True)
+            velocities *= 0.5 * max_speed / np.maximum(lengths, 1e-12)
+        self.velocities = np.array(
+            velocities, dtype=np.float64).reshape(-1, 3)
+        self.neighbor_radius = neighbor_radius
+        self.separation_radius = separation_radius
+        self.separation = separation
+        self.alignment = alignment
+        self.cohesion = cohesion
+        self.max_speed = max_speed
+        self.max_force = max_force or max_speed / 20
+        self.workers = workers or os.cpu_count() or 1
+        self._pool = None
+        self._shared = []
+
+    def __len__(self):
+        return len(self.positions)
+
+    @property
+    def parallel(self):
+        """Whether steps are split between worker processes"""
+        # macOS offers fork, but forking Blender there isn't safe
+        return (self.workers > 1 and len(self) > self.workers
+                and sys.platform.startswith('linux')
+                and 'fork' in multiprocessing.get_all_start_methods())
+
+    # Grids with up to this many cells per agent are summed as dense arrays
+    DENSE_CELLS_PER_AGENT = 8
+
+    @classmethod
+    def neighborhoods(cls, positions, values, cell_size):
+        """Sums values over the 3x3x3 grid cells around each position
+        :param positions: numpy array, (agents, 3)
+        :param values: numpy array, (agents, k) values to sum
+        :param cell_size: number, width of grid cells
+        :return: tuple of numpy arrays, neighbor count (agents,) and summed
+                 values (agents, k), both including the agent itself"""
+        cells = np.floor(positions / cell_size).astype(np.int64)
+        # Pad by a cell so neighboring keys never wrap into another row
+        cells -= cells.min(axis=0) - 1
+        dims = cells.max(axis=0) + 2
+        keys = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+        columns = np.hstack((np.ones((len(values), 1)), values))
+
+        if dims.prod() <= max(len(positions) * cls.DENSE_CELLS_PER_AGENT,
+                              2 ** 16):
+            grid = np.empty((dims.prod(), columns.shape[1]))
+            for k in range(columns.shape[1]):
+                grid[:, k] = np.bincount(
+                    keys, weights=columns[:, k], minlength=dims.prod())
+            grid = grid.reshape(tuple(dims) + (columns.shape[1],))
+            # Box sum one axis at a time, the padding stays empty
+            for axis in range(3):
+                summed = grid.copy()
+                inner = [slice(1, -1)] * 3
+                for shift in (-1, 1):
+                    shifted = list(inner)
+                    shifted[axis] = slice(1 + shift, dims[axis] - 1 + shift)
+                    summed[tuple(inner)] += grid[tuple(shifted)]
+                grid = summed
+            hood = grid.reshape(-1, columns.shape[1])[keys]
+        else:  # Sprawling grid, only sum occupied cells
+            cell_keys, inverse = np.unique(keys, return_inverse=True)
+            inverse = inverse.reshape(-1)
+            # Extra empty row stands in for missing neighbor cells
+            sums = np.zeros((len(cell_keys) + 1, columns.shape[1]))
+            for k in range(columns.shape[1]):
+                sums[:-1, k] = np.bincount(
+                    inverse, weights=columns[:, k], minlength=len(cell_keys))
+            cell_hoods = np.zeros((len(cell_keys), columns.shape[1]))
+            for dx, dy, dz in cls.NEIGHBOR_OFFSETS:
+                neighbor_keys = cell_keys + (dx * dims[1] + dy) * dims[2] + dz
+                found = np.searchsorted(cell_keys, neighbor_keys)
+                np.minimum(found, len(cell_keys) - 1, out=found)
+                found[cell_keys[found] != neighbor_keys] = len(cell_keys)
+                cell_hoods += sums[found]
+            hood = cell_hoods[inverse]
+        return np.rint(hood[:, 0]).astype(np.int64), hood[:, 1:]
+
+    @classmethod
+    def steer(cls, positions, velocities, neighbor_radius, separation_radius,
+              separation, alignment, cohesion):
+        """Returns acceleration of each agent from the three flocking rules
+        :return: numpy array, (agents, 3)"""
+        values = np.hstack((positions, velocities))
+        counts, sums = cls.neighborhoods(positions, values, neighbor_radius)
+        others = np.maximum(counts - 1, 1)[:, None]
+        center = (sums[:, :3] - positions) / others
+        heading = (sums[:, 3:] - velocities) / others
+        alone = (counts <= 1)[:, None]
+        acceleration = np.where(
+            alone, 0, cohesion * (center - positions)
+            + alignment * (heading - velocities))
+
+        # Pushed harder the more agents crowd in
+        counts, sums = cls.neighborhoods(
+            positions, positions, separation_radius)
+        crowd = (counts - 1)[:, None]
+        crowd_center = (sums - positions) / np.maximum(crowd, 1)
+        acceleration += np.where(
+            crowd == 0, 0, separation * crowd * (positions - crowd_center))
+        return acceleration
+
+    def _startWorkers(self):
+        """Moves positions and velocities into shared memory, and forks
+        worker processes that see them
+        :return: None"""
+        global _flock_buffers
+        arrays = []
+        for array in (self.positions, self.velocities,
+                      np.zeros_like(self.positions)):
+            shared = shared_memory.SharedMemory(create=True, size=array.nbytes)
+            self._shared.append(shared)
+            arrays.append(np.ndarray(
+                array.shape, dtype=np.float64, buffer=shared.buf))
+            arrays[-1][:] = array
+        self.positions, self.velocities, self._accelerations = arrays
+        _flock_buffers = (
+            self.positions, self.velocities, self._accelerations,
+            (self.neighbor_radius, self.separation_radius, self.separation,
+             self.alignment, self.cohesion))
+        self._pool = multiprocessing.get_context('fork').Pool(self.workers)
+
+    def _stopWorkers(self):
+        """Stops worker processes and copies state out of shared memory
+        :return: None"""
+        global _flock_buffers
+        self._pool.terminate()
+        self._pool.join()
+        self._pool = None
+        _flock_buffers = None
+        self.positions = self.positions.copy()
+        self.velocities = self.velocities.copy()
+        self._accelerations = None
+        for shared in self._shared:
+            shared.close()
+            shared.unlink()
+        self._shared = []
+
+    def tiles(self):
+        """Splits the flock into slabs along its longest side, one per
+        worker, each with about the same number of agents
+        :return: list of (axis, low, high, halo) tuples. Agents in
+                 [low, high) are the tile's, those within halo of it are
+                 neighbors needed to steer them"""
+        axis = int(np.argmax(np.ptp(self.positions, axis=0)))
+        edges = np.quantile(self.positions[:, axis],
+                            np.linspace(0, 1, self.workers + 1))
+        edges[0] = -np.inf
+        edges[-1] = np.inf
+        # Neighbor cells reach up to two cells from an agent
+        halo = 2 * max(self.neighbor_radius, self.separation_radius)
+        return [(axis, edges[i], edges[i + 1], halo)
+                for i in range(self.workers)]
+
+    def step(self):
+        """Advances the flock by one frame
+        :return: None"""
+        if self._pool is not None:
+            self._pool.map(_steer_flock_tile, self.tiles())
+            acceleration = self._accelerations
+        else:
+            acceleration = self.steer(
+                self.positions, self.velocities, self.neighbor_radius,
+                self.separation_radius, self.separation, self.alignment,
+                self.cohesion)
+        # Limited steering keeps agents from turning sharply frame to frame
+        lengths = np.linalg.norm(acceleration, axis=1, keepdims=True)
+        acceleration *= np.minimum(
+            1, self.max_force / np.maximum(lengths, 1e-12))
+        self.velocities += acceleration
+        speeds = np.linalg.norm(self.velocities, axis=1, keepdims=True)
+        self.velocities *= np.minimum(
+            1, self.max_speed / np.maximum(speeds, 1e-12))
+        self.positions += self.velocities
+
+    def run(self, frames, step=1):
+        """Simulates frames, sampling positions every step frames
+        :param frames: int, number of frames to simulate
+        :param step: int, frames between samples
+        :return: numpy array, (samples, agents, 3) float32 positions, the
+                 first sample being the start positions"""
+        samples = [self.positions.astype(np.float32)]
+        if self.parallel:
+            self._startWorkers()
+        try:
+            for frame in range(1, frames + 1):
+                self.step()
+                if frame % step == 0 or frame == frames:
+                    samples.append(self.positions.astype(np.float32))
+        finally:
+            if self._pool is not None:
+                self._stopWorkers()
+        return np.stack(samples)
+
+
+# Arrays shared with forked flock workers, see FlockSimulation._startWorkers
+_flock_buffers = None
+
+
+def _steer_flock_tile(tile):
+    """Steers one tile of a flock in a worker process
+    :param tile: tuple, see FlockSimulation.tiles
+    :return: None"""
+    positions, velocities, accelerations, settings = _flock_buffers
+    axis, low, high, halo = tile
+    coordinates = positions[:, axis]
+    nearby = np.flatnonzero(
+        (coordinates >= low - halo) & (coordinates < high + halo))
+    acceleration = FlockSimulation.steer(
+        positions[nearby], velocities[nearby], *settings)
+    own = (coordinates[nearby] >= low) & (coordinates[nearby] < high)
+    accelerations[nearby[own]] = acceleration[own]
+
+
+def bake_flock(collection, frames=250, step=5, frame_start=None,
+               neighbor_radius=None, separation_radius=None,
+               max_speed=None, tolerance=0.0, **kwargs):
+    """Simulates flocking of an existing Mitosis animation's replicants and
+    writes it to their location keyframes. Any location keyframes after
+    frame_start, such as from a previous flock, are replaced.
+    :param collection: blender collection with a stored plan
+    :param frames: int, number of frames to simulate
+    :param step: int, frames between samples of the simulation
+    :param frame_start: int, defaults to the end of the last generation
+    :param neighbor_radius: number, defaults to 2.5 spawn offsets
+    :param separation_radius: number, defaults to the spawn offset
+    :param max_speed: number, units per frame, defaults to a tenth of the
+                      spawn offset
+    :param tolerance: number, when above 0, samples are decimated to the
+                      fewest keyframes within this distance of every sample
+    :param kwargs: other FlockSimulation keyword arguments
+    :return: int, number of replicants flocked"""
+    plan = load_plan(collection)
+    if plan is None:
+        raise ValueError("Collection {0} has no stored Mitosis animation "
+                         "to flock.".format(collection.name))
+    if frame_start is None:
+        frame_start = (plan.frameSpawn(plan.num_generations)
+                       + plan.frames_to_spawn)
+    objs = [obj for obj in collection.objects
+            if obj.get(PLAN_INDEX_PROP) is not None]
+    indices = [obj[PLAN_INDEX_PROP] for obj in objs]
+    positions = plan.locations(np.asarray(plan.cells)[indices])
+
+    simulation = FlockSimulation(
+        positions,
+        neighbor_radius=neighbor_radius or plan.offset * 2.5,
+        separation_radius=separation_radius or plan.offset,
+        max_speed=max_speed or plan.offset / 10, **kwargs)
+    samples = simulation.run(frames, step)
+    sample_frames = np.minimum(
+        np.arange(len(samples), dtype=np.float64) * step, frames) + frame_start
+    # One channel per replicant and axis
+    channels = samples.transpose(1, 2, 0).reshape(-1, len(samples))
+    keys = None
+    if tolerance > 0:
+        keys = decimate_channels(sample_frames, channels, tolerance)
+
+    for i, obj in enumerate(objs):
+        if obj.animation_data is None:
+            obj.animation_data_create()
+        ac = obj.animation_data.action
+        if ac is None:
+            ac = bpy.data.actions.new(obj.name + "Action")
+            obj.animation_data.action = ac
+        for axis in range(3):
+            write_flock_fcurve(ac, axis, sample_frames, channels[i * 3 + axis],
+                               None if keys is None else keys[i * 3 + axis])
+    return len(objs)
+
+
+def write_flock_fcurve(action, axis, frames, values, keys=None):
+    """Replaces location keyframes from frames[0] on with flock samples
+    :param action: blender action of a replicant
+    :param axis: int, location index
+    :param frames: numpy array, frame of each sample
+    :param values: numpy array, location of each sample
+    :param keys: numpy array of Bools, samples kept by decimate_channels.
+                 Every sample is keyed with automatic handles if None
+    :return: None"""
+    co = np.empty(0, dtype=np.float32)  # Keyframes before the flock
+    fc = action.fcurves.find(data_path="location", index=axis)
+    if fc is not None:
+        co = np.empty(len(fc.keyframe_points) * 2, dtype=np.float32)
+        fc.keyframe_points.foreach_get('co', co)
+        co = co[np.repeat(co[0::2] < frames[0], 2)]
+        action.fcurves.remove(fc)
+    num_before = len(co) // 2
+
+    key_frames = frames if keys is None else frames[keys]
+    key_values = values if keys is None else values[keys]
+    fc = action.fcurves.new(data_path="location", index=axis,
+                            action_group=SpawnKeyframeTemplate.TRANSFORM_GROUP)
+    fc.keyframe_points.add(num_before + len(key_frames))
+    fc.keyframe_points.foreach_set('co', np.concatenate(
+        (co, np.column_stack((key_frames, key_values)).ravel())))
+    fc.update()
+    if keys is None:
+        return
+
+    # Handles the decimation was measured with, instead of automatic ones
+    slopes = sample_slopes(frames, values)[keys]
+    handles = bezier_handles(key_frames, key_values, slopes,
+                             co[-2] if num_before else None)
+    for attribute, key_handles in zip(('handle_left', 'handle_right'),
+                                      handles):
+        all_handles = np.empty(len(fc.keyframe_points) * 2, dtype=np.float32)
+        fc.keyframe_points.foreach_get(attribute, all_handles)
+        all_handles[num_before * 2:] = key_handles.ravel()
+        handle_types = np.empty(len(fc.keyframe_points), dtype=np.int32)
+        fc.keyframe_points.foreach_get(attribute + '_type', handle_types)
+        handle_types[num_before:] = HANDLE_ALIGNED
+        fc.keyframe_points.foreach_set(attribute + '_type', handle_types)
+        fc.keyframe_points.foreach_set(attribute, all_handles)
+    fc.update()
+
+
 ##############
 # Replicants #
 ##############
 
+UNLINK_ON_DEMAND_PROP = "mitosis_unlink_on_demand"
+
+
+def unlink_replicant(obj):
+    """Gives a replicant marked as unlink on demand its own copy of data
+    :param obj: blender object, replicant to unlink
+    :return: Bool, True if the object's data was copied"""
+    if not obj.get(UNLINK_ON_DEMAND_PROP, False):
+        return False
+    del obj[UNLINK_ON_DEMAND_PROP]
+    if obj.data is None or obj.data.users <= 1:
+        return False
+    obj.data = obj.data.copy()
+    return True
+
+
 class Custom(Replicant):
     """Holds data and methods for individual spawned objects
     Arguments:
@@ -652,7 +2345,11 @@ class Custom(Replicant):
         self.obj.name = parent.obj_to_copy.name + "_Replicant" \
             + str(parent.num_replicants)
         if not linked:  # Copying data unlinks the blender object from original
-            self.obj.data = parent.obj_to_copy.data.copy()
+            if parent.unlink_on_demand:
+                # Data stays shared until the artist unlinks the replicant
+                self.obj[UNLINK_ON_DEMAND_PROP] = True
+            else:
+                self.obj.data = parent.obj_to_copy.data.copy()
         self.obj.animation_data_clear()
         self.obj.scale[0] = parent.obj_to_copy.scale[0]
         self.obj.scale[1] = parent.obj_to_copy.scale[1]
@@ -680,6 +2377,10 @@ class Custom_Inflate(InflateMixin, Replicant):
         Custom.__init__(self, **kwargs)
 
 
+class Custom_DivideAndMerge(DivideAndMergeMixin, Custom):
+    """Custom Object to Replicate, divides and merges with neighbors"""
+
+
 ###############
 # Replicators #
 ###############
@@ -687,12 +2388,13 @@ class Custom_Inflate(InflateMixin, Replicant):
 class CustomObj_Replicator(Replicator):
     behavior_objs = {
         "DIVIDE": Custom, "APPEAR": Custom_Appear,
-        "INFLATE": Custom_Inflate}
+        "INFLATE": Custom_Inflate, "DIVIDE_AND_MERGE": Custom_DivideAndMerge}
 
     def __init__(self, behavior="DIVIDE", offset=4.0,
                  start_x=False, start_y=False, start_z=False,
                  frame_start=0, frames_to_spawn=15, scale_start=[.2, .2, .2],
-                 scale_end=False, linked=True, **kwargs):
+                 scale_end=False, linked=True, unlink_on_demand=False,
+                 **kwargs):
         # Assign Behavior #
         self.obj_type = self._getBehaviorObject(behavior)
         self.obj_to_copy = bpy.context.active_object
@@ -706,7 +2408,8 @@ class CustomObj_Replicator(Replicator):
                             start_y=start_y, start_z=start_z,
                             frame_start=frame_start, scale_start=scale_start,
                             scale_end=scale_end,
-                            frames_to_spawn=frames_to_spawn, linked=linked, **kwargs)
+                            frames_to_spawn=frames_to_spawn, linked=linked,
+                            unlink_on_demand=unlink_on_demand, **kwargs)
 
     def copyActiveObject(active_obj):
         C = bpy.context
@@ -718,6 +2421,1176 @@ class CustomObj_Replicator(Replicator):
         return new_obj
 
 
+class MBall_Replicator():
+    """Replicates a metaball as elements of a single metaball data block
+    Instead of an object per replicant, every replicant is an element of one
+    new metaball object, so the growth is polygonized as a single surface
+    and costs scale with element count instead of object count. Element
+    locations are set for all elements at once, but each element is still
+    added, and given its own radius fcurve and, if it moves, three co
+    fcurves, in a Python loop, since every element has its own data path.
+    Each fcurve's keyframes are set at once. The new object is named after
+    the original, so Blender fuses their surfaces. Behavior mods, scales,
+    variation and the other settings of object replicants don't apply.
+    Arguments:
+    behavior -- str, one of BEHAVIORS
+    offset -- number, distance between neighboring elements
+    frame_start -- int, frame the first generation begins spawning
+    frames_to_spawn -- int, duration of each generation's spawn animation
+    use_x, use_y, use_z -- Bools, axes elements can spawn along
+    domain -- DomainMask or closed mesh object elements only spawn inside
+    """
+    BEHAVIORS = ("DIVIDE", "APPEAR", "INFLATE", "DIVIDE_AND_MERGE")
+    DEFAULT_RADIUS = 2.0  # Radius of elements if the original has none
+
+    def __init__(self, behavior="DIVIDE", offset=4.0, frame_start=0,
+                 frames_to_spawn=15, use_x=True, use_y=True, use_z=True,
+                 domain=None):
+        behavior = behavior.upper()
+        if behavior not in self.BEHAVIORS:
+            raise ValueError("behavior keyword must be string describing "
+                             "spawn behavior from the following list: "
+                             + str(self.BEHAVIORS))
+        self.behavior = behavior
+        self.obj_to_copy = bpy.context.active_object
+        if self.obj_to_copy is None or self.obj_to_copy.type != 'META':
+            raise ValueError("For Metaball Replicators, a metaball object "
+                             "must be selected as bpy.context.active_object.")
+        self.frame_start = frame_start
+        self.frames_to_spawn = frames_to_spawn
+        self.frame_current = frame_start
+        self.domain_name = getattr(domain, 'name', None)
+        if isinstance(domain, bpy.types.Object):
+            domain = voxelize_mesh(domain, self.obj_to_copy.location, offset)
+        self.plan = ReplicationPlan(
+            origin=self.obj_to_copy.location, offset=offset,
+            frame_start=frame_start, frames_to_spawn=frames_to_spawn,
+            use_x=use_x, use_y=use_y, use_z=use_z, domain=domain,
+            merge=behavior == "DIVIDE_AND_MERGE")
+
+        self.collection = bpy.context.blend_data.collections.new(
+            name=self.obj_to_copy.name + ' Replicants')
+        bpy.context.scene.collection.children.link(self.collection)
+        self.obj = None
+
+    def generate(self, generations):
+        """Plans generations and writes them as animated elements
+        :param generations: int, number of generations
+        :return: None"""
+        for i in range(generations):
+            self.plan.planGeneration()
+        self.obj = self.writeElements()
+        self.frame_current = (self.plan.frameSpawn(self.plan.num_generations)
+                              + self.frames_to_spawn)
+        store_plan(self.collection, self.plan, self.getParameters())
+
+    def getParameters(self):
+        """Returns settings affecting how elements are animated
+        :return: dict"""
+        return {'source': self.obj_to_copy.name,
+                'replicant_type': type(self).__name__,
+                'behavior': self.behavior, 'offset': self.plan.offset,
+                'frame_start': self.frame_start,
+                'frames_to_spawn': self.frames_to_spawn,
+                'use_x': self.plan.axes[0], 'use_y': self.plan.axes[1],
+                'use_z': self.plan.axes[2], 'domain': self.domain_name,
+                'behavior_mods': []}
+
+    def radiusKeyframes(self, frames_spawn):
+        """Returns frames each element's radius grows from 0 to full
+        :param frames_spawn: numpy array, first spawn frame of each element
+        :return: tuple of numpy arrays, frames of 0 and of full radius"""
+        frames_end = frames_spawn + self.frames_to_spawn
+        if self.behavior == "APPEAR" or self.frames_to_spawn == 0:
+            return frames_end - 1, frames_end
+        return frames_spawn, frames_end
+
+    def writeElements(self):
+        """Adds an object with an element for each planned replicant
+        :return: blender object, the new metaball"""
+        data = self.obj_to_copy.data.copy()
+        template = data.elements[0] if len(data.elements) else None
+        data.elements.clear()
+        data.animation_data_clear()
+        obj = bpy.data.objects.new(self.obj_to_copy.name, data)
+        obj.matrix_world = self.obj_to_copy.matrix_world
+        self.collection.objects.link(obj)
+
+        indices = np.arange(1, len(self.plan))
+        cells = np.asarray(self.plan.cells)
+        # Elements are in the object's space, which matches the original's
+        to_local = np.array(self.obj_to_copy.matrix_world.inverted())
+        locations_end = (self.plan.locations(cells[indices])
+                         @ to_local[:3, :3].T + to_local[:3, 3])
+        parents = np.asarray(self.plan.parents)[indices]
+        locations_start = locations_end
+        divides = self.behavior in ("DIVIDE", "DIVIDE_AND_MERGE")
+        if divides:  # Start at the parent's end location
+            locations_start = (self.plan.locations(cells[parents])
+                               @ to_local[:3, :3].T + to_local[:3, 3])
+
+        radius = self.DEFAULT_RADIUS
+        for i in indices:
+            element = data.elements.new(
+                type=template.type if template else 'BALL')
+            if template is not None:
+                radius = template.radius
+                element.stiffness = template.stiffness
+                element.size_x = template.size_x
+                element.size_y = template.size_y
+                element.size_z = template.size_z
+                element.rotation = template.rotation
+        data.elements.foreach_set(
+            'co', locations_end.astype(np.float32).ravel())
+
+        generations = self.plan.generationsOf(indices)
+        frames_spawn = (self.plan.frame_start
+                        + (generations - 1) * self.frames_to_spawn)
+        frames_empty, frames_full = self.radiusKeyframes(frames_spawn)
+
+        data.animation_data_create()
+        action = bpy.data.actions.new(obj.name + "Action")
+        data.animation_data.action = action
+        co = np.empty(4, dtype=np.float32)
+        for element_index in range(len(indices)):
+            co[:] = (frames_empty[element_index], 0,
+                     frames_full[element_index], radius)
+            write_fcurve(
+                action, "elements[{0}].radius".format(element_index), 0, co)
+            if not divides or self.frames_to_spawn == 0:
+                continue
+            for axis in range(3):
+                co[:] = (frames_spawn[element_index],
+                         locations_start[element_index, axis],
+                         frames_spawn[element_index] + self.frames_to_spawn,
+                         locations_end[element_index, axis])
+                write_fcurve(
+                    action, "elements[{0}].co".format(element_index), axis,
+                    co)
+        return obj
+
+
+###################
+# Instrumentation #
+###################
+
+def get_process_rss():
+    """Returns memory used by this process in bytes, or None if unknown
+    On Linux this is the current resident set size. Elsewhere on unix it's
+    the peak resident set size, which never goes down."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class MemoryLog():
+    """Records memory use of bpy.data and Python after each generation
+    Python heap sizes come from tracemalloc, which is started if it isn't
+    already tracing. That slows bakes down, so only use while investigating.
+    """
+    FIELDS = ('generation', 'seconds', 'objects', 'meshes', 'actions',
+              'fcurves', 'keyframes', 'python_heap', 'python_heap_peak',
+              'rss')
+
+    def __init__(self, filepath=None):
+        self.filepath = filepath  # Written by finish() when given
+        self.records = []
+        self._started_tracing = not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+        self._time_start = time.perf_counter()
+        self.record(0)
+
+    def record(self, generation):
+        """Records current memory use
+        python_heap_peak is the peak since the previous record, so each
+        record shows the peak of its own generation
+        :param generation: int, generation just finished, 0 before any
+        :return: dict, the record"""
+        fcurves = 0
+        keyframes = 0
+        for action in bpy.data.actions:
+            fcurves += len(action.fcurves)
+            for fc in action.fcurves:
+                keyframes += len(fc.keyframe_points)
+        python_heap, python_heap_peak = (0, 0)
+        if tracemalloc.is_tracing():
+            python_heap, python_heap_peak = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+
+        record = {'generation': generation,
+                  'seconds': time.perf_counter() - self._time_start,
+                  'objects': len(bpy.data.objects),
+                  'meshes': len(bpy.data.meshes),
+                  'actions': len(bpy.data.actions),
+                  'fcurves': fcurves, 'keyframes': keyframes,
+                  'python_heap': python_heap,
+                  'python_heap_peak': python_heap_peak,
+                  'rss': get_process_rss()}
+        self.records.append(record)
+        return record
+
+    def finish(self):
+        """Stops tracemalloc if this log started it, then writes the log to
+        self.filepath if set
+        :return: None"""
+        if self._started_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._started_tracing = False
+        if self.filepath:
+            self.write(self.filepath)
+
+    def growth(self):
+        """Returns change in each field from first to last record
+        :return: dict"""
+        first = self.records[0]
+        last = self.records[-1]
+        growth = {}
+        for field in self.FIELDS[2:]:
+            if first[field] is None or last[field] is None:
+                growth[field] = None
+            else:
+                growth[field] = last[field] - first[field]
+        return growth
+
+    def summary(self):
+        """Returns one line description of memory growth over the bake"""
+        growth = self.growth()
+        text = ("Mitosis memory: +{objects} objects, +{meshes} meshes, "
+                "+{actions} actions, +{fcurves} fcurves, +{keyframes} "
+                "keyframes, Python heap +{0:.1f} MB".format(
+                    growth['python_heap'] / 2**20, **growth))
+        if growth['rss'] is not None:
+            text += ", process +{0:.1f} MB".format(growth['rss'] / 2**20)
+        return text
+
+    def write(self, filepath):
+        """Writes records to a .csv file, or JSON for any other extension
+        :param filepath: str, path of file to write
+        :return: None"""
+        if filepath.lower().endswith('.csv'):
+            with open(filepath, 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=self.FIELDS)
+                writer.writeheader()
+                writer.writerows(self.records)
+        else:
+            with open(filepath, 'w') as f:
+                json.dump({'records': self.records, 'growth': self.growth()},
+                          f, indent=2)
+
+
+####################
+# Background Bakes #
+####################
+
+def tag_redraw_mitosis_ui():
+    """Redraws editors that can display Mitosis progress"""
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == 'PROPERTIES':
+                area.tag_redraw()
+
+
+def push_undo_step():
+    """Adds one undo step for a finished bake
+    :return: None"""
+    try:
+        bpy.ops.ed.undo_push(message="Mitosis")
+    except RuntimeError:
+        pass  # No undo stack, such as when running in background mode
+
+
+def report_message(message, icon='INFO'):
+    """Shows message in a popup, for code that isn't run by an operator
+    Printed instead when Blender runs in background mode, with no UI
+    :param message: str, text to show
+    :param icon: str, popup icon, such as 'INFO' or 'ERROR'
+    :return: None"""
+    window_manager = bpy.context.window_manager
+    if bpy.app.background or not window_manager.windows:
+        print(message)
+        return
+
+    def draw(self, context):
+        self.layout.label(text=message)
+
+    # Timers run without a window in context, which popups need
+    with bpy.context.temp_override(window=window_manager.windows[0]):
+        window_manager.popup_menu(draw, title="Mitosis", icon=icon)
+
+
+class BackgroundBake():
+    """Plans a replication in a worker thread, applied in a timer callback
+    bpy can only be used from Blender's main thread, so the worker thread
+    only fills in the Replicator's ReplicationPlan. Each planned generation
+    is handed over a queue to a bpy.app.timers callback, which applies a
+    limited number of replicants per call so Blender stays responsive.
+    Arguments:
+    replicator -- Replicator to plan and apply
+    generations -- int, number of generations to plan
+    chunk_size -- int, max number of replicants applied per timer call
+    """
+    active = []  # Bakes in progress, their progress is drawn in the panel
+    CHUNK_SIZE = 200
+    INTERVAL = 0.01  # Seconds between timer calls
+
+    def __init__(self, replicator, generations, chunk_size=CHUNK_SIZE):
+        self.replicator = replicator
+        self.generations = generations
+        self.chunk_size = chunk_size
+
+        self.queue = queue.Queue()
+        self.generations_planned = 0
+        self.replicants_planned = 0
+        self.replicants_applied = 0
+        self.error = None
+        self.apply_failed = False  # Whether error was raised applying
+        self.finished = False
+        self.cancelled = False
+
+        self._generation = None  # PlanGeneration currently being applied
+        self._generation_applied = 0
+        self._thread = threading.Thread(target=self._plan, daemon=True)
+        self._timer = self._apply  # Same function object to unregister
+
+    def start(self):
+        """Starts planning, and registers timer applying the plan
+        :return: None"""
+        self.replicator.getBehaviorTimeline()  # Reads bpy, compile here
+        BackgroundBake.active.append(self)
+        self._thread.start()
+        bpy.app.timers.register(self._timer)
+
+    def applyAll(self):
+        """Waits for planning to finish, then applies the rest of the bake
+        Useful from scripts, where timers don't run until the script ends
+        :return: None"""
+        self._thread.join()
+        while not self.finished:
+            self._apply()
+        if bpy.app.timers.is_registered(self._timer):
+            bpy.app.timers.unregister(self._timer)
+
+    def _plan(self):
+        """Worker thread, plans generations and queues them to apply"""
+        try:
+            i = 0
+            while i < self.generations and not self.cancelled:
+                generation = self.replicator.plan.planGeneration()
+                self.replicants_planned += len(generation)
+                self.generations_planned += 1
+                self.queue.put(generation)
+                i += 1
+        except Exception as e:
+            self.error = e
+        finally:
+            self.queue.put(None)  # Tells the timer planning has ended
+
+    def _apply(self):
+        """Timer callback, applies up to chunk_size planned replicants
+        :return: float, seconds until next call, None once finished"""
+        applied = 0
+        while applied < self.chunk_size:
+            if self._generation is None:
+                try:
+                    self._generation = self.queue.get_nowait()
+                except queue.Empty:
+                    break  # Waiting for the planner
+                if self._generation is None:
+                    self._finish()
+                    return None
+                self._generation_applied = 0
+
+            stop = min(len(self._generation),
+                       self._generation_applied + self.chunk_size - applied)
+            try:
+                self.replicator.applyGeneration(
+                    self._generation, self._generation_applied, stop)
+            except Exception as e:
+                # Timers that raise are unregistered without finishing
+                self.error = e
+                self.apply_failed = True
+                self.cancelled = True  # Stops planning
+                self._finish()
+                return None
+            applied += stop - self._generation_applied
+            self.replicants_applied += stop - self._generation_applied
+            self._generation_applied = stop
+            if stop >= len(self._generation):
+                self._generation = None
+
+        tag_redraw_mitosis_ui()
+        return self.INTERVAL
+
+    def cancel(self):
+        """Stops the bake, leaving its objects as they are
+        Used when undo or loading a file replaces the objects being baked
+        :return: None"""
+        self.cancelled = True
+        if bpy.app.timers.is_registered(self._timer):
+            bpy.app.timers.unregister(self._timer)
+        if self in BackgroundBake.active:
+            BackgroundBake.active.remove(self)
+
+    def _finish(self):
+        """Links output to the scene and adds an undo step for the bake"""
+        self.finished = True
+        if self in BackgroundBake.active:
+            BackgroundBake.active.remove(self)
+        if self.error is None:
+            self.replicator.finishGenerate()
+        else:
+            # The partial plan isn't stored, so it can't be updated later
+            # as if it were the whole animation
+            if self.replicator.detached:
+                self.replicator.attachCollection()
+            if self.apply_failed:
+                message = "Mitosis failed applying after {0} replicants: {1}"
+                done = self.replicants_applied
+            else:
+                message = "Mitosis planning failed after {0} generations: {1}"
+                done = self.generations_planned
+            report_message(message.format(done, self.error), icon='ERROR')
+        push_undo_step()
+        tag_redraw_mitosis_ui()
+
+    def planningProgress(self):
+        return "Planning: {0}/{1} generations".format(
+            self.generations_planned, self.generations)
+
+    def applyingProgress(self):
+        return "Applying: {0}/{1} replicants".format(
+            self.replicants_applied, self.replicants_planned)
+
+
+@persistent
+def cancel_background_bakes(*args):
+    """Cancels bakes in progress, whose objects undo and loading files replace
+    """
+    for bake in list(BackgroundBake.active):
+        bake.cancel()
+
+
+#################
+# Sharded Bakes #
+#################
+
+# Runs a shard when Blender is a Python module (bpy) with no binary to launch
+BPY_MODULE_WORKER = (
+    "import runpy, sys, bpy; "
+    "bpy.ops.wm.open_mainfile(filepath=sys.argv[1]); "
+    "runpy.run_path(sys.argv[2], run_name='__main__')")
+
+
+class ShardedBake():
+    """Bakes a replication across several background Blender processes
+    The whole plan is made up front, and its replicants are split into one
+    shard per worker. Each worker opens a copy of the current file, applies
+    its shard and writes the result to a library .blend, which is then
+    appended into the Replicator's collection.
+    Arguments:
+    replicator -- Replicator to plan and apply
+    generations -- int, number of generations to plan
+    num_workers -- int, number of worker processes, defaults to CPU count
+    partition -- str, how replicants are split between workers, either
+                 'SPAWN_ORDER' (by generation) or 'SPACE' (by location)
+    """
+    PARTITIONS = ('SPAWN_ORDER', 'SPACE')
+
+    def __init__(self, replicator, generations, num_workers=None,
+                 partition='SPAWN_ORDER'):
+        if partition not in self.PARTITIONS:
+            raise ValueError("partition must be one of: {0}".format(
+                self.PARTITIONS))
+        self.replicator = replicator
+        self.generations = generations
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.partition = partition
+
+    def run(self):
+        """Plans, bakes shards in parallel, then merges them
+        :return: None"""
+        i = 0
+        while i < self.generations:
+            self.replicator.plan.planGeneration()
+            i += 1
+
+        directory = tempfile.mkdtemp(prefix="mitosis_shards_")
+        try:
+            blend_path = os.path.join(directory, "source.blend")
+            bpy.ops.wm.save_as_mainfile(filepath=blend_path, copy=True)
+            shard_paths = self._writeShards(directory)
+            self._runWorkers(blend_path, shard_paths)
+            self._merge([path[:-len(".json")] + ".blend"
+                         for path in shard_paths])
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        self.replicator.finishGenerate()
+
+    def partitionIndices(self):
+        """Splits plan indices of replicants to spawn into one array per shard
+        :return: list of numpy arrays"""
+        plan = self.replicator.plan
+        indices = np.arange(1, len(plan))  # Index 0 is the original object
+        if self.partition == 'SPACE':
+            cells = np.asarray(plan.cells, dtype=np.int64)[indices]
+            indices = indices[np.lexsort((cells[:, 2], cells[:, 1],
+                                          cells[:, 0]))]
+        num_shards = max(1, min(self.num_workers, len(indices)))
+        return [np.sort(shard) for shard in
+                np.array_split(indices, num_shards)]
+
+    def _writeShards(self, directory):
+        """Writes a JSON description of each shard for its worker"""
+        plan = base64.b64encode(self.replicator.plan.toBytes()).decode('ascii')
+        parameters = self.replicator.getParameters()
+        shard_paths = []
+        for i, indices in enumerate(self.partitionIndices()):
+            path = os.path.join(directory, "shard_{0}.json".format(i))
+            with open(path, 'w') as f:
+                json.dump({'plan': plan, 'parameters': parameters,
+                           'indices': indices.tolist(),
+                           'output': path[:-len(".json")] + ".blend"}, f)
+            shard_paths.append(path)
+        return shard_paths
+
+    def _runWorkers(self, blend_path, shard_paths):
+        """Runs one worker process per shard, and waits for all of them"""
+        module_path = os.path.abspath(__file__)
+        workers = []
+        for shard_path in shard_paths:
+            if bpy.app.binary_path:
+                command = [bpy.app.binary_path, '-b', blend_path,
+                           '--python-exit-code', '1',
+                           '--python', module_path]
+            else:
+                command = [sys.executable, '-c', BPY_MODULE_WORKER,
+                           blend_path, module_path]
+            workers.append(subprocess.Popen(
+                command + ['--', '--shard', shard_path]))
+        failed = [w.args for w in workers if w.wait() != 0]
+        if failed:
+            raise RuntimeError("{0} Mitosis shard workers failed: {1}".format(
+                len(failed), failed))
+
+    def _merge(self, shard_blend_paths):
+        """Appends baked shards into the Replicator's collection"""
+        replicator = self.replicator
+        source_data = replicator.obj_to_copy.data
+        share_data = replicator.linked or replicator.unlink_on_demand
+        for path in shard_blend_paths:
+            with bpy.data.libraries.load(path, link=False) as (
+                    data_from, data_to):
+                data_to.collections = list(data_from.collections)
+            for shard_collection in data_to.collections:
+                appended_data = set()
+                for obj in shard_collection.objects:
+                    replicator.collection.objects.link(obj)
+                    if share_data and obj.data != source_data:
+                        # Each shard brings its own copy of shared data
+                        appended_data.add(obj.data)
+                        obj.data = source_data
+                bpy.data.collections.remove(shard_collection)
+                bpy.data.batch_remove(ids=[
+                    data for data in appended_data if data.users == 0])
+
+
+def run_shard(shard_path):
+    """Worker side of a ShardedBake, applies one shard of a plan
+    :param shard_path: str, path of shard JSON written by ShardedBake
+    :return: None"""
+    with open(shard_path) as f:
+        shard = json.load(f)
+    parameters = shard['parameters']
+    bpy.context.view_layer.objects.active = bpy.data.objects[
+        parameters['source']]
+
+    behaviors = {obj_type.__name__: behavior for behavior, obj_type in
+                 CustomObj_Replicator.behavior_objs.items()}
+    replicator = CustomObj_Replicator(
+        behavior=behaviors[parameters['replicant_type']],
+        offset=parameters['offset'], frame_start=parameters['frame_start'],
+        frames_to_spawn=parameters['frames_to_spawn'],
+        scale_start=parameters['scale_start'],
+        scale_end=parameters['scale_end'], use_x=parameters['use_x'],
+        use_y=parameters['use_y'], use_z=parameters['use_z'],
+        linked=parameters['linked'],
+        unlink_on_demand=parameters['unlink_on_demand'], detached=True,
+        frame_window=parameters.get('frame_window'),
+        variation=parameters.get('variation') and Variation(
+            **parameters['variation']))
+    replicator.addBehaviorMods(parameters['behavior_mods'])
+    replicator.plan = ReplicationPlan.fromBytes(
+        base64.b64decode(shard['plan']))
+
+    indices = np.asarray(shard['indices'], dtype=np.int64)
+    generation = 1
+    while generation <= replicator.plan.num_generations:
+        replicator.applyGeneration(
+            replicator.plan.getGeneration(generation, indices))
+        generation += 1
+    bpy.data.libraries.write(
+        shard['output'], {replicator.collection}, fake_user=True)
+
+
+#####################
+# Merged Mesh Bakes #
+#####################
+
+# Behavior mod data paths merged mesh bakes can animate, by transform part
+MERGED_MOD_PATHS = ('delta_location', 'delta_scale', 'rotation_euler',
+                    'delta_rotation_euler')
+# magic, version, points, start frame, sample rate, samples
+PC2_HEADER = struct.Struct("<12siiffi")
+PC2_MAGIC = b"POINTCACHE2\0"
+
+
+def euler_matrices(angles, order='XYZ'):
+    """Rotation matrices of euler angles, composed the way Blender does
+    :param angles: numpy array, shape (n, 3), radians about X, Y and Z
+    :param order: str, rotation_mode of the objects, ex: 'XYZ'
+    :return: numpy array, shape (n, 3, 3)"""
+    angles = np.asarray(angles, dtype=np.float64).reshape(-1, 3)
+    cos = np.cos(angles)
+    sin = np.sin(angles)
+    matrices = np.broadcast_to(np.eye(3), (len(angles), 3, 3))
+    for axis in ['XYZ'.index(a) for a in order]:
+        i, j = (axis + 1) % 3, (axis + 2) % 3
+        rotation = np.zeros((len(angles), 3, 3))
+        rotation[:, axis, axis] = 1
+        rotation[:, i, i] = rotation[:, j, j] = cos[:, axis]
+        rotation[:, i, j] = -sin[:, axis]
+        rotation[:, j, i] = sin[:, axis]
+        matrices = rotation @ matrices  # Later axes are applied after
+    return matrices
+
+
+class MergedMeshBake():
+    """Bakes replicants into one mesh, animated by a PC2 point cache
+    Instead of an object and Action for each replicant, every replicant's
+    geometry is joined into one mesh, and a Mesh Cache modifier moves its
+    vertices with a point cache. The cache is computed and written a frame
+    at a time, so the whole animation is never in memory at once.
+    Replicants are sampled from the same keyframes an ordinary bake writes,
+    so both play back the same. Hidden replicants are collapsed to a point.
+    Arguments:
+    replicator -- CustomObj_Replicator of a mesh object, not yet generated
+    filepath -- str, path of the PC2 file to write
+    frame_start -- int, first frame cached. Frame window start if set,
+                   otherwise the scene's start frame
+    frame_end -- int, last frame cached. Frame window end if set, otherwise
+                 the animation's last keyframe
+    """
+    def __init__(self, replicator, filepath, frame_start=None,
+                 frame_end=None):
+        self.replicator = replicator
+        self.filepath = filepath
+        self.frame_start = frame_start
+        self.frame_end = frame_end
+        self.obj = None
+        self._action = None  # Scratch Action keyframes are sampled with
+
+    def run(self, generations):
+        """Plans generations, then writes the point cache and merged mesh
+        :param generations: int, n of times replicants spawn
+        :return: blender object with the merged mesh"""
+        replicator = self.replicator
+        source = replicator.obj_to_copy
+        if source.type != 'MESH':
+            raise ValueError("Merged mesh bakes need a mesh object, {0} is "
+                             "a {1}.".format(source.name, source.type))
+        if source.rotation_mode not in ('XYZ', 'XZY', 'YXZ', 'YZX', 'ZXY',
+                                         'ZYX'):
+            raise ValueError("Merged mesh bakes need an euler rotation mode, "
+                             "{0} uses {1}.".format(
+                                 source.name, source.rotation_mode))
+        for mod in replicator.behavior_mods:
+            if mod['data_path'] not in MERGED_MOD_PATHS:
+                raise ValueError("Merged mesh bakes can't animate behavior "
+                                 "mods of {0}.".format(mod['data_path']))
+        for i in range(generations):
+            replicator.plan.planGeneration()
+
+        self._action = bpy.data.actions.new("Mitosis Sampling")
+        try:
+            tracks = self._sampleTracks()
+        finally:
+            bpy.data.actions.remove(self._action)
+            self._action = None
+
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        source_evaluated = source.evaluated_get(depsgraph)
+        mesh = source_evaluated.to_mesh()
+        try:
+            vertices = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+            mesh.vertices.foreach_get('co', vertices)
+            merged = self._mergedMesh(mesh, len(replicator.plan) - 1)
+        finally:
+            source_evaluated.to_mesh_clear()
+
+        last = self._writeCache(tracks, vertices.reshape(-1, 3))
+        merged.vertices.foreach_set('co', last.ravel())
+        merged.update()
+
+        self.obj = bpy.data.objects.new(source.name + " Merged", merged)
+        replicator.collection.objects.link(self.obj)
+        modifier = self.obj.modifiers.new("Mitosis Point Cache", 'MESH_CACHE')
+        modifier.cache_format = 'PC2'
+        modifier.filepath = self.filepath
+        modifier.frame_start = tracks['frames'][0]
+
+        parameters = replicator.getParameters()
+        parameters['point_cache'] = self.filepath
+        store_plan(replicator.collection, replicator.plan, parameters)
+        if replicator.detached:
+            replicator.attachCollection()
+        return self.obj
+
+    def _sampleKeyframes(self, co, frames):
+        """Evaluates keyframes the way an fcurve of them plays back
+        :param co: flat numpy array of keyframe co pairs
+        :param frames: sequence of ints
+        :return: numpy array, value on each frame"""
+        fc = self._action.fcurves.new(data_path='location')
+        fc.keyframe_points.add(len(co) // 2)
+        fc.keyframe_points.foreach_set('co', co)
+        fc.update()
+        values = np.array([fc.evaluate(frame) for frame in frames])
+        self._action.fcurves.remove(fc)
+        return values
+
+    def _sampleTracks(self):
+        """Samples spawn and behavior mod animation of each replicant
+        Replicants of a generation with the same delay share their
+        keyframes, so each of these groups is only sampled once
+        :return: dict of numpy arrays, see _writeCache"""
+        replicator = self.replicator
+        plan = replicator.plan
+        timeline = replicator.getBehaviorTimeline()
+        num_replicants = len(plan) - 1
+
+        groups = np.empty(num_replicants, dtype=np.int64)
+        scales = np.ones(num_replicants)
+        rotations = np.broadcast_to(
+            np.array(replicator.obj_to_copy.delta_rotation_euler),
+            (num_replicants, 3)).copy()
+        amplitudes = np.ones(num_replicants)
+        group_keys = []  # (generation, delay) of each group
+        for generation in range(1, plan.num_generations + 1):
+            index_start = plan.generation_starts[generation]
+            if generation < plan.num_generations:
+                index_stop = plan.generation_starts[generation + 1]
+            else:
+                index_stop = len(plan)
+            positions = np.arange(index_stop - index_start)
+            delays = np.zeros(len(positions), dtype=np.int64)
+            if replicator.variation is not None:
+                variation = replicator.variation.sample(generation, positions)
+                delays = variation['delay']
+                scales[index_start - 1:index_stop - 1] = variation['scale']
+                rotations[index_start - 1:index_stop - 1] = \
+                    variation['rotation']
+                amplitudes[index_start - 1:index_stop - 1] = \
+                    variation['mod_amplitude']
+            for delay in np.unique(delays).tolist():
+                groups[index_start - 1 + positions[delays == delay]] = \
+                    len(group_keys)
+                group_keys.append((generation, delay))
+
+        # Keyframes of each group, as flat co arrays
+        group_curves = []
+        for generation, delay in group_keys:
+            template = replicator._getSpawnTemplate(
+                plan.frameSpawn(generation))
+            spawn = template._coordinates(
+                [0.0, 1.0][-len(template.frames):])[
+                    np.repeat(template._keys, 2)]
+            curves = {'spawn': spawn, 'visibility': template.visibility}
+            for i in range(3):
+                curves[('scale', i)] = template.scale[i]
+            for channel, co in timeline.keyframeBuffers(
+                    template.frame_end + delay).items():
+                curves[channel] = co
+            for key, co in curves.items():
+                if key in timeline.channels:
+                    continue  # Already offset by delay
+                co = co.copy()
+                co[0::2] += delay
+                curves[key] = co
+            group_curves.append(curves)
+
+        frame_window = replicator.frame_window
+        frame_start, frame_end = self.frame_start, self.frame_end
+        if frame_start is None:
+            frame_start = frame_window[0] if frame_window \
+                else bpy.context.scene.frame_start
+        if frame_end is None:
+            frame_end = frame_window[1] if frame_window else int(np.ceil(max(
+                co[-2] for curves in group_curves for co in curves.values())))
+        frames = np.arange(frame_start, max(frame_end, frame_start) + 1)
+
+        num_groups = len(group_keys)
+        spawn = np.empty((num_groups, len(frames)))
+        hidden = np.empty((num_groups, len(frames)), dtype=bool)
+        scale = np.empty((num_groups, 3, len(frames)))
+        mods = {channel: np.empty((num_groups, len(frames)))
+                for channel in timeline.channels}
+        for group, curves in enumerate(group_curves):
+            spawn[group] = self._sampleKeyframes(curves['spawn'], frames)
+            # Same test Blender uses to animate a boolean property
+            hidden[group] = self._sampleKeyframes(
+                curves['visibility'], frames) > 1 - np.finfo(np.float32).eps
+            for i in range(3):
+                scale[group, i] = self._sampleKeyframes(
+                    curves[('scale', i)], frames)
+            for channel in mods:
+                mods[channel][group] = self._sampleKeyframes(
+                    curves[channel], frames)
+
+        cells = np.asarray(plan.cells, dtype=np.int64)
+        parents = np.asarray(plan.parents[1:], dtype=np.int64)
+        locations_end = plan.locations(cells[1:])
+        return {'frames': frames, 'groups': groups, 'spawn': spawn,
+                'hidden': hidden, 'scale': scale, 'mods': mods,
+                'locations_start': replicator.obj_type.templateLocationStart(
+                    plan.locations(cells[parents]), locations_end),
+                'locations_end': locations_end,
+                'scales': scales, 'rotations': rotations,
+                'amplitudes': amplitudes}
+
+    def _transforms(self, tracks, frame):
+        """Returns location, rotation matrix and scale of every replicant
+        :param tracks: dict, from _sampleTracks
+        :param frame: int, index of frame in tracks['frames']
+        :return: tuple of numpy arrays, shapes (n, 3), (n, 3, 3), (n, 3),
+                 and Bools, True for hidden replicants"""
+        source = self.replicator.obj_to_copy
+        groups = tracks['groups']
+        spawn = tracks['spawn'][groups, frame][:, None]
+        location = tracks['locations_start'] + spawn * (
+            tracks['locations_end'] - tracks['locations_start'])
+        scale = tracks['scale'][groups, :, frame] * tracks['scales'][:, None]
+
+        # Unanimated parts keep the values replicants copy from the source
+        parts = {
+            'delta_location': np.broadcast_to(
+                np.array(source.delta_location), location.shape).copy(),
+            'delta_scale': np.broadcast_to(
+                np.array(source.delta_scale), location.shape).copy(),
+            'rotation_euler': np.broadcast_to(
+                np.array(source.rotation_euler), location.shape).copy(),
+            'delta_rotation_euler': tracks['rotations'].copy()}
+        timeline = self.replicator.getBehaviorTimeline()
+        for (data_path, index), values in tracks['mods'].items():
+            value_start = timeline.channels[(data_path, index)][1]
+            parts[data_path][:, index] = value_start + (
+                values[groups, frame] - value_start) * tracks['amplitudes']
+
+        order = source.rotation_mode
+        rotation = euler_matrices(parts['delta_rotation_euler'], order) \
+            @ euler_matrices(parts['rotation_euler'], order)
+        return (location + parts['delta_location'], rotation,
+                scale * parts['delta_scale'], tracks['hidden'][groups, frame])
+
+    def _writeCache(self, tracks, vertices):
+        """Writes each frame's vertex locations to the point cache
+        :param tracks: dict, from _sampleTracks
+        :param vertices: numpy array, shape (vertices, 3), source geometry
+        :return: numpy array, vertex locations on the last frame"""
+        num_replicants = len(tracks['groups'])
+        frames = tracks['frames']
+        with open(self.filepath, 'wb') as f:
+            f.write(PC2_HEADER.pack(
+                PC2_MAGIC, 1, num_replicants * len(vertices),
+                float(frames[0]), 1.0, len(frames)))
+            for frame in range(len(frames)):
+                location, rotation, scale, hidden = self._transforms(
+                    tracks, frame)
+                scale[hidden] = 0  # Collapsed onto their location
+                points = np.einsum('nij,nvj->nvi', rotation,
+                                   vertices[None] * scale[:, None, :])
+                points += location[:, None, :]
+                points = points.astype('<f4')
+                points.tofile(f)
+        return points.reshape(-1, 3)
+
+    def _mergedMesh(self, mesh, count):
+        """Returns new mesh with count copies of a mesh's geometry
+        :param mesh: blender mesh, geometry to copy
+        :param count: int, number of copies
+        :return: blender mesh"""
+        num_vertices = len(mesh.vertices)
+        num_loops = len(mesh.loops)
+        num_polygons = len(mesh.polygons)
+        merged = bpy.data.meshes.new(self.replicator.obj_to_copy.name
+                                     + " Merged")
+        merged.vertices.add(num_vertices * count)
+        merged.loops.add(num_loops * count)
+        merged.polygons.add(num_polygons * count)
+
+        copies = np.arange(count, dtype=np.int32)[:, None]
+        vertex_index = np.empty(num_loops, dtype=np.int32)
+        mesh.loops.foreach_get('vertex_index', vertex_index)
+        merged.loops.foreach_set(
+            'vertex_index', (vertex_index + copies * num_vertices).ravel())
+        loop_start = np.empty(num_polygons, dtype=np.int32)
+        mesh.polygons.foreach_get('loop_start', loop_start)
+        merged.polygons.foreach_set(
+            'loop_start', (loop_start + copies * num_loops).ravel())
+        material_index = np.empty(num_polygons, dtype=np.int32)
+        mesh.polygons.foreach_get('material_index', material_index)
+        merged.polygons.foreach_set(
+            'material_index', np.tile(material_index, count))
+        smooth = np.empty(num_polygons, dtype=bool)
+        mesh.polygons.foreach_get('use_smooth', smooth)
+        merged.polygons.foreach_set('use_smooth', np.tile(smooth, count))
+
+        for uv_layer in mesh.uv_layers:
+            uv = np.empty(num_loops * 2, dtype=np.float32)
+            uv_layer.data.foreach_get('uv', uv)
+            merged.uv_layers.new(name=uv_layer.name).data.foreach_set(
+                'uv', np.tile(uv, count))
+        for material in mesh.materials:
+            merged.materials.append(material)
+        merged.update(calc_edges=True)
+        return merged
+
+
+#############
+# Instances #
+#############
+
+TIME_OFFSET_PROP = "mitosis_time_offset"
+VARIANT_OF_PROP = "mitosis_variant_of"
+
+
+def time_shifted_collection(collection, time_offset):
+    """Returns a copy of an output collection animated time_offset frames
+    later, making it the first time it's needed. Copies share mesh data, and
+    play the original Actions through NLA strips, so only objects are added.
+    :param collection: blender collection with a stored plan
+    :param time_offset: int, frames to delay the animation by
+    :return: blender collection, the original for a time_offset of 0"""
+    if time_offset == 0:
+        return collection
+    for variant in bpy.data.collections:
+        if (variant.get(VARIANT_OF_PROP) == collection.name
+                and variant.get(TIME_OFFSET_PROP) == time_offset):
+            return variant
+
+    variant = bpy.data.collections.new(
+        "{0} {1:+d}".format(collection.name, time_offset))
+    variant[VARIANT_OF_PROP] = collection.name
+    variant[TIME_OFFSET_PROP] = time_offset
+    variant.instance_offset = collection.instance_offset
+    for obj in collection.objects:
+        copy = obj.copy()
+        variant.objects.link(copy)
+        _shift_animation(copy, time_offset)
+        # Data animated on its own, like metaball elements, can't be shared
+        if (copy.data is not None and getattr(copy.data, 'animation_data',
+                                              None) is not None):
+            copy.data = copy.data.copy()
+            _shift_animation(copy.data, time_offset)
+    return variant
+
+
+def _shift_animation(id_data, time_offset):
+    """Replaces an ID's action with an NLA strip of it offset in time"""
+    animation_data = id_data.animation_data
+    if animation_data is None or animation_data.action is None:
+        return
+    action = animation_data.action
+    animation_data.action = None
+    track = animation_data.nla_tracks.new()
+    track.name = "Mitosis Time Offset"
+    track.strips.new(action.name, int(action.frame_range[0]) + time_offset,
+                     action)
+
+
+def add_instance(collection, location=(0, 0, 0), time_offset=0,
+                 target_collection=None):
+    """Places an existing Mitosis animation again, as a collection instance
+    Its origin is the original object's location when it was baked.
+    :param collection: blender collection with a stored plan
+    :param location: 3 numbers, where the original object's location goes
+    :param time_offset: int, frames to delay the animation by. Instances
+                        with the same offset share one copy of the objects
+    :param target_collection: blender collection to add the instance to,
+                              the scene collection by default
+    :return: blender object, the instance empty"""
+    plan = load_plan(collection)
+    if plan is None:
+        raise ValueError("Collection {0} has no stored Mitosis animation "
+                         "to instance.".format(collection.name))
+    collection.instance_offset = plan.origin
+    instance = bpy.data.objects.new(collection.name + " Instance", None)
+    instance.instance_type = 'COLLECTION'
+    instance.instance_collection = time_shifted_collection(
+        collection, time_offset)
+    instance.location = location
+    if target_collection is None:
+        target_collection = bpy.context.scene.collection
+    target_collection.objects.link(instance)
+    return instance
+
+
+################
+# Viewport LOD #
+################
+# Simplifies how replicants draw in the viewport
+
+# Object.display_type enum values, so it can be set with foreach_set
+DISPLAY_TYPE_VALUES = {
+    item.identifier: item.value for item in
+    bpy.types.Object.bl_rna.properties['display_type'].enum_items}
+# Custom property holding a replicant's own data while it uses a LOD proxy
+LOD_DATA_PROP = "mitosis_lod_data"
+
+
+def viewport_lod_mask(locations, viewpoint, distance=0.0, max_full=0):
+    """Finds replicants to draw with less detail
+    :param locations: numpy array, shape (replicants, 3)
+    :param viewpoint: 3 numbers, location replicants are viewed from
+    :param distance: number, replicants farther away are simplified, 0 for
+                     no limit
+    :param max_full: int, only this many of the nearest replicants are
+                     drawn in full, 0 for no limit
+    :return: numpy array of Bools, True for replicants to simplify"""
+    distances = np.linalg.norm(
+        np.asarray(locations, dtype=np.float64).reshape(-1, 3)
+        - np.asarray(viewpoint, dtype=np.float64), axis=1)
+    simplified = np.zeros(len(distances), dtype=bool)
+    if distance > 0:
+        simplified |= distances > distance
+    if 0 < max_full < len(distances):
+        far = np.ones(len(distances), dtype=bool)
+        far[np.argpartition(distances, max_full - 1)[:max_full]] = False
+        simplified |= far
+    return simplified
+
+
+def decimated_proxies(meshes, ratio):
+    """Makes a decimated copy of each mesh for distant replicants to share
+    The meshes are evaluated together in a temporary scene, so the rest of
+    the file isn't evaluated to decimate them.
+    :param meshes: list of blender meshes to decimate
+    :param ratio: number, ratio of faces the copies keep
+    :return: dict of mesh name: decimated blender mesh"""
+    scene = bpy.data.scenes.new("Mitosis LOD")
+    objs = []
+    for mesh in meshes:
+        obj = bpy.data.objects.new("Mitosis LOD", mesh)
+        scene.collection.objects.link(obj)
+        modifier = obj.modifiers.new("Decimate", 'DECIMATE')
+        modifier.ratio = ratio
+        objs.append(obj)
+    with bpy.context.temp_override(scene=scene,
+                                   view_layer=scene.view_layers[0]):
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+    proxies = {}
+    for mesh, obj in zip(meshes, objs):
+        proxies[mesh.name] = bpy.data.meshes.new_from_object(
+            obj.evaluated_get(depsgraph))
+        proxies[mesh.name].name = mesh.name + " LOD"
+        bpy.data.objects.remove(obj)
+    bpy.data.scenes.remove(scene)
+    return proxies
+
+
+# Object name: LOD proxy it draws, while its own data is being rendered
+_render_proxies = {}
+
+
+@persistent
+def unset_lod_proxies(*args):
+    """Gives replicants drawn with a LOD proxy their own data to render"""
+    for obj in bpy.data.objects:
+        data = obj.get(LOD_DATA_PROP)
+        if data is not None and obj.data is not data:
+            _render_proxies[obj.name] = obj.data
+            obj.data = data
+
+
+@persistent
+def reset_lod_proxies(*args):
+    """Draws replicants with their LOD proxy again once rendering ends"""
+    for name, proxy in _render_proxies.items():
+        obj = bpy.data.objects.get(name)
+        if obj is not None and obj.get(LOD_DATA_PROP) is not None:
+            obj.data = proxy
+    _render_proxies.clear()
+
+
+def apply_viewport_lod(collection, viewpoint, lod_type='BOUNDS', distance=0.0,
+                       max_full=0, decimate_ratio=0.1):
+    """Simplifies viewport drawing of distant replicants of an animation
+    Replicants are measured where they are on the current frame, and are
+    only updated when this is run again, not on every frame. Renders always
+    use each replicant's own data.
+    :param collection: blender collection of replicants
+    :param viewpoint: 3 numbers, location replicants are viewed from, ex:
+                      the active camera's
+    :param lod_type: str, 'BOUNDS' or 'WIRE' display type, 'DECIMATE' to
+                     draw a shared decimated copy of the source mesh, or
+                     'FULL' to draw every replicant with its own data again
+    :param distance: number, see viewport_lod_mask
+    :param max_full: int, see viewport_lod_mask
+    :param decimate_ratio: number, ratio of faces 'DECIMATE' keeps
+    :return: int, number of replicants simplified"""
+    objs = collection.objects
+    matrices = np.empty(len(objs) * 16, dtype=np.float32)
+    objs.foreach_get('matrix_world', matrices)
+    simplified = viewport_lod_mask(matrices.reshape(-1, 4, 4)[:, 3, :3],
+                                   viewpoint, distance, max_full)
+    if lod_type == 'FULL':
+        simplified[:] = False
+
+    parameters = load_parameters(collection) or {}
+    source = bpy.data.objects.get(parameters.get('source') or "")
+    full = DISPLAY_TYPE_VALUES[source.display_type if source else 'TEXTURED']
+    display_types = np.full(len(objs), full, dtype=np.int32)
+    if lod_type in ('BOUNDS', 'WIRE'):
+        display_types[simplified] = DISPLAY_TYPE_VALUES[lod_type]
+    objs.foreach_set('display_type', display_types)
+
+    decimate = simplified if lod_type == 'DECIMATE' else \
+        np.zeros(len(objs), dtype=bool)
+    # Replicants with data of their own share the source's proxy too
+    source_mesh = source.data if source and source.type == 'MESH' else None
+    proxy_meshes = {}  # Name of mesh to decimate: the mesh
+    for obj, use_proxy in zip(objs, decimate.tolist()):
+        if use_proxy and obj.type == 'MESH':
+            mesh = source_mesh or obj.get(LOD_DATA_PROP) or obj.data
+            proxy_meshes[mesh.name] = mesh
+    proxies = decimated_proxies(list(proxy_meshes.values()), decimate_ratio) \
+        if proxy_meshes else {}
+
+    old_proxies = set()
+    for obj, use_proxy in zip(objs, decimate.tolist()):
+        data = obj.get(LOD_DATA_PROP) or obj.data
+        if obj.data is not data:
+            old_proxies.add(obj.data)
+        if use_proxy and obj.type == 'MESH':
+            obj[LOD_DATA_PROP] = data  # Also keeps the data from being freed
+            obj.data = proxies[(source_mesh or data).name]
+        elif obj.data is not data:
+            obj.data = data
+            del obj[LOD_DATA_PROP]
+    for proxy in old_proxies:
+        if proxy.users == 0:
+            bpy.data.meshes.remove(proxy)
+    return int(np.count_nonzero(simplified))
+
+
 #######
 # GUI #
 #######
@@ -754,15 +3627,54 @@ class OBJECT_PT_MitosisPanel(bpy.types.Panel):
                 row.prop(mitosis_props, prop)
             elif prop == 'linked_data':
                 row.prop(mitosis_props, prop)
+            elif prop == 'unlink_on_demand':
+                row = col.row()
+                row.active = not mitosis_props.linked_data
+                row.prop(mitosis_props, prop)
+            elif prop == 'metaball_elements':
+                row = layout.row()
+                row.active = (context.active_object is not None
+                              and context.active_object.type == 'META')
+                row.prop(mitosis_props, prop)
+            elif prop == 'memory_log_path':
+                row = layout.row()
+                row.active = mitosis_props.memory_log
+                row.prop(mitosis_props, prop)
+            elif prop == 'point_cache_path':
+                row = layout.row()
+                row.active = mitosis_props.merged_mesh
+                row.prop(mitosis_props, prop)
+            elif prop in ('frame_window_start', 'frame_window_end'):
+                row = layout.row()
+                row.active = mitosis_props.use_frame_window
+                row.prop(mitosis_props, prop)
+            elif prop.startswith('variation_'):
+                row = layout.row()
+                row.active = mitosis_props.use_variation
+                row.prop(mitosis_props, prop)
             else:
                 row = layout.row()
                 row.prop(mitosis_props, prop)
         row = layout.row()
         row.operator("object.mod_list", text="Behavior Modifiers")
+        row = layout.row()
+        row.operator("object.mitosis_unlink_replicants")
+        row = layout.row()
+        row.operator("object.mitosis_flock")
+        row.operator("object.mitosis_add_instance")
+        row = layout.row()
+        row.operator("object.mitosis_select_generation")
+        row.operator("object.mitosis_select_lineage")
+        row = layout.row()
+        row.operator("object.mitosis_viewport_lod")
         if not isinstance(self, OBJECT_OT_MitosisPopupPanel):
             # Refrain from drawing execute button if drawing as popup
             row = layout.row()
             row.operator("object.mitosis", text="Execute")
+        for bake in BackgroundBake.active:
+            box = layout.box()
+            box.label(text=bake.planningProgress())
+            box.label(text=bake.applyingProgress())
 
     def execute(self, context):
         return context.window_manager.invoke_popup(self, width=300)
@@ -803,6 +3715,13 @@ class MitosisProperties(bpy.types.PropertyGroup):
         name="Spawn in Z Axis", default=True,
         description="Spawn replicants in the Z Axis direction.")
 
+    domain: bpy.props.PointerProperty(
+        name="Domain",
+        description="Closed mesh spawned objects are kept inside of. "
+                    "Replication stops where the shape is filled",
+        type=bpy.types.Object,
+        poll=lambda self, obj: obj.type == 'MESH')
+
     scale_start: bpy.props.FloatVectorProperty(
         name="Starting Scale",
         #options='HIDDEN',
@@ -826,9 +3745,122 @@ class MitosisProperties(bpy.types.PropertyGroup):
         description="Link spawned objects data to original object",
         default=True)
 
+    unlink_on_demand: bpy.props.BoolProperty(
+        name="Unlink On Demand",
+        description="When data isn't linked, keep spawned objects sharing "
+                    "data until they're made single user with 'Unlink "
+                    "Replicants'. Avoids copying large meshes for every "
+                    "spawned object",
+        default=False)
+
+    large_bake: bpy.props.BoolProperty(
+        name="Large Bake Mode",
+        description="Build spawned objects in a collection outside the "
+                    "scene, and link it to the scene once finished. Speeds "
+                    "up animations with many spawned objects",
+        default=False)
+
+    background: bpy.props.BoolProperty(
+        name="Plan in Background",
+        description="Plan spawn locations in a separate thread, and add "
+                    "spawned objects a few at a time so Blender can be used "
+                    "while the animation is written",
+        default=False)
+
+    workers: bpy.props.IntProperty(
+        name="Worker Processes",
+        description="Number of background Blender processes spawned objects "
+                    "are split between. 1 writes the animation in this "
+                    "Blender, 0 uses one process per CPU core",
+        min=0, default=1)
+
+    merged_mesh: bpy.props.BoolProperty(
+        name="Merged Mesh",
+        description="Join spawned objects into one mesh, animated by a "
+                    "point cache instead of an object and Action for each",
+        default=False)
+
+    point_cache_path: bpy.props.StringProperty(
+        name="Point Cache File",
+        description="PC2 file the merged mesh's animation is written to",
+        subtype='FILE_PATH', default="//mitosis.pc2")
+
+    metaball_elements: bpy.props.BoolProperty(
+        name="Metaball Elements",
+        description="Replicate a metaball as elements of one new metaball "
+                    "instead of as objects. Scales, behavior modifiers, "
+                    "variation and the bake options below aren't used",
+        default=True)
+
+    update_existing: bpy.props.BoolProperty(
+        name="Update Existing",
+        description="Reuse this object's previous Mitosis animation, only "
+                    "rebuilding spawned objects whose animation changed",
+        default=False)
+
+    memory_log: bpy.props.BoolProperty(
+        name="Log Memory Use",
+        description="Record object, data and memory totals after each "
+                    "generation. Slows down the animation",
+        default=False)
+
+    memory_log_path: bpy.props.StringProperty(
+        name="Memory Log File",
+        description="CSV or JSON file the memory log is written to. "
+                    "Leave empty to only report totals",
+        subtype='FILE_PATH', default="")
+
+    use_frame_window: bpy.props.BoolProperty(
+        name="Use Frame Window",
+        description="Only build spawned objects seen between Window Start "
+                    "and Window End, and trim keyframes outside of it",
+        default=False)
+
+    frame_window_start: bpy.props.IntProperty(
+        name="Window Start",
+        description="First frame of the animation that will be rendered",
+        default=1)
+
+    frame_window_end: bpy.props.IntProperty(
+        name="Window End",
+        description="Last frame of the animation that will be rendered",
+        default=250)
+
+    use_variation: bpy.props.BoolProperty(
+        name="Vary Replicants",
+        description="Give each spawned object a random scale, rotation, "
+                    "spawn delay and behavior modifier amount",
+        default=False)
+
+    variation_seed: bpy.props.IntProperty(
+        name="Seed",
+        description="Animations with the same seed vary the same way",
+        min=0, default=0)
+
+    variation_scale: bpy.props.FloatProperty(
+        name="Scale Variation",
+        description="Fraction the end scale of spawned objects can differ by",
+        min=0.0, max=1.0, default=0.2)
+
+    variation_rotation: bpy.props.FloatProperty(
+        name="Rotation Variation",
+        description="Most spawned objects can be turned by on each axis",
+        subtype='ANGLE', min=0.0, default=radians(15))
+
+    variation_delay: bpy.props.IntProperty(
+        name="Delay Variation",
+        description="Most frames a spawned object can start spawning late",
+        min=0, default=0)
+
+    variation_mod_amplitude: bpy.props.FloatProperty(
+        name="Behavior Mod Variation",
+        description="Fraction the change of each behavior modifier can "
+                    "differ by",
+        min=0.0, default=0.0)
+
     behavior_strings = []
     for b in CustomObj_Replicator.behavior_objs.keys():
-        behavior_strings.append((b, b.capitalize(), ""))
+        behavior_strings.append((b, b.replace('_', ' ').capitalize(), ""))
     behavior_strings = tuple(behavior_strings)
 
     behavior: bpy.props.EnumProperty(
@@ -842,7 +3874,10 @@ class OBJECT_OT_MitosisAddon(bpy.types.Operator):
     """Object Replication Animation"""
     bl_idname = "object.mitosis"
     bl_label = "Mitosis"
-    bl_options = {'REGISTER', 'UNDO'}
+    # No 'UNDO', execute_func() pushes the bake's one undo step itself once
+    # it's done, after Large Bake Mode links its collection, and background
+    # bakes push theirs when they finish instead of when they start
+    bl_options = {'REGISTER'}
 
     # Consider whether it's better to have below propertyies here,
     # or directly register them with the Scene in register() function
@@ -868,19 +3903,132 @@ class OBJECT_OT_MitosisAddon(bpy.types.Operator):
 def execute_func(self, context):
     # MIGHT WANT TO PASS context arg TO REPLICATOR INSTEAD OF USING BPY.CONTEXT IN ALL THE CODE ABOVE
     # SINCE SOME CODE MAY PASS CUSTOM CONTEXT TO OPERATORS
-    end_scale = context.scene.mitosis_props.scale_end if context.scene.mitosis_props.use_target_scale is False else False
-    custom_replicator = CustomObj_Replicator(
-        behavior=context.scene.mitosis_props.behavior,
-        offset=context.scene.mitosis_props.offset,
-        frames_to_spawn=context.scene.mitosis_props.frames_to_spawn,
-        frame_start=context.scene.mitosis_props.frame_start,
-        scale_start=context.scene.mitosis_props.scale_start,
-        scale_end=end_scale, use_x=context.scene.mitosis_props.use_x,
-        use_y=context.scene.mitosis_props.use_y,
-        use_z=context.scene.mitosis_props.use_z,
-        linked=context.scene.mitosis_props.linked_data)
-    custom_replicator.addBehaviorMods(get_behavior_mod_values(context))
-    custom_replicator.generate(context.scene.mitosis_props.generations)
+    settings = get_settings(context.scene.mitosis_props)
+    behavior_mods = get_behavior_mod_values(context)
+    replicator = build_replicator(settings, behavior_mods)
+    if isinstance(replicator, MBall_Replicator):
+        ignored = ignored_metaball_settings(settings, behavior_mods)
+        if ignored:
+            self.report({'WARNING'}, "Metaball elements don't use: "
+                        + ", ".join(ignored))
+    if run_replicator(replicator, settings) is None:
+        push_undo_step()  # Background bakes push theirs once finished
+    memory_log = getattr(replicator, 'memory_log', False)
+    if memory_log and len(memory_log.records) > 1:
+        self.report({'INFO'}, memory_log.summary())
+
+
+def get_settings(mitosis_props):
+    """Returns the Mitosis panel's settings as a dict, like a batch job's
+    :param mitosis_props: MitosisProperties
+    :return: dict of setting name: value"""
+    return {name: getattr(mitosis_props, name)
+            for name in MitosisProperties.__annotations__}
+
+
+def build_replicator(settings, behavior_mods):
+    """Makes a replicator of the active object from Mitosis settings
+    Shared by the Execute operator and batch jobs, so the same settings
+    always build the same animation
+    :param settings: dict of MitosisProperties values, see get_settings()
+    :param behavior_mods: list of behavior mod dicts, see addBehaviorMods
+    :return: CustomObj_Replicator, or MBall_Replicator for metaballs
+    replicated as elements"""
+    domain = settings['domain'] or None
+    if isinstance(domain, str):  # Batch jobs name the domain object
+        domain = bpy.data.objects.get(settings['domain'])
+        if domain is None:
+            raise ValueError("Domain object {0} not found.".format(
+                settings['domain']))
+    if (settings['metaball_elements'] and bpy.context.active_object
+            and bpy.context.active_object.type == 'META'):
+        return MBall_Replicator(
+            behavior=settings['behavior'], offset=settings['offset'],
+            frame_start=settings['frame_start'],
+            frames_to_spawn=settings['frames_to_spawn'],
+            use_x=settings['use_x'], use_y=settings['use_y'],
+            use_z=settings['use_z'], domain=domain)
+    collection = False
+    if settings['update_existing']:
+        collection = find_output_collection(
+            bpy.context.active_object) or False
+    memory_log = False
+    if settings['memory_log']:
+        memory_log = MemoryLog(
+            bpy.path.abspath(settings['memory_log_path']) or None)
+    replicator = CustomObj_Replicator(
+        behavior=settings['behavior'], offset=settings['offset'],
+        frames_to_spawn=settings['frames_to_spawn'],
+        frame_start=settings['frame_start'],
+        scale_start=list(settings['scale_start']),
+        scale_end=(False if settings['use_target_scale']
+                   else list(settings['scale_end'])),
+        use_x=settings['use_x'], use_y=settings['use_y'],
+        use_z=settings['use_z'], linked=settings['linked_data'],
+        unlink_on_demand=settings['unlink_on_demand'],
+        detached=settings['large_bake'], collection=collection,
+        memory_log=memory_log, domain=domain, frame_window=(
+            (settings['frame_window_start'], settings['frame_window_end'])
+            if settings['use_frame_window'] else None),
+        variation=(get_variation(settings) if settings['use_variation']
+                   else None))
+    replicator.addBehaviorMods(behavior_mods)
+    return replicator
+
+
+def run_replicator(replicator, settings):
+    """Writes a replicator's animation the way Mitosis settings ask to
+    :param replicator: CustomObj_Replicator, see build_replicator()
+    :param settings: dict of MitosisProperties values
+    :return: BackgroundBake if the animation is still being written, or None
+    """
+    if isinstance(replicator, MBall_Replicator):
+        replicator.generate(settings['generations'])
+    elif settings['merged_mesh']:
+        MergedMeshBake(replicator, bpy.path.abspath(
+            settings['point_cache_path'])).run(settings['generations'])
+    elif settings['workers'] != 1:
+        ShardedBake(replicator, settings['generations'],
+                    settings['workers']).run()
+    elif settings['background']:
+        bake = BackgroundBake(replicator, settings['generations'])
+        bake.start()
+        return bake
+    else:
+        replicator.generate(settings['generations'])
+
+
+# Settings of object replicants that metaball elements don't have
+METABALL_IGNORED_SETTINGS = (
+    'scale_start', 'scale_end', 'use_target_scale', 'linked_data',
+    'unlink_on_demand', 'large_bake', 'background', 'workers',
+    'merged_mesh', 'update_existing', 'memory_log', 'use_frame_window',
+    'use_variation')
+
+
+def ignored_metaball_settings(settings, behavior_mods):
+    """Returns names of changed settings a MBall_Replicator doesn't use
+    :param settings: dict of MitosisProperties values, see get_settings()
+    :param behavior_mods: list of behavior mod dicts, see addBehaviorMods
+    :return: list of str, setting names as shown in the panel"""
+    ignored = [MitosisProperties.__annotations__[name].keywords['name']
+               for name in METABALL_IGNORED_SETTINGS
+               if not np.allclose(settings[name], get_property_default(name))]
+    if behavior_mods:
+        ignored.append("Behavior Modifiers")
+    return ignored
+
+
+def get_variation(settings):
+    """Returns Variation of the Mitosis settings
+    :param settings: dict of MitosisProperties values, see get_settings()
+    :return: Variation"""
+    return Variation(
+        seed=settings['variation_seed'], scale=settings['variation_scale'],
+        rotation=settings['variation_rotation'],
+        delay=settings['variation_delay'],
+        mod_amplitude=settings['variation_mod_amplitude'])
+
 
 def get_data_path_string(behavior_type):
     """Takes the selected behavior_type string and gets data_path string
@@ -1048,6 +4196,301 @@ class OBJECT_OT_MitosisPopupPanel(bpy.types.Operator):
         return {'FINISHED'}
 
 
+class OBJECT_OT_MitosisUnlinkReplicants(bpy.types.Operator):
+    """Give selected replicants their own copy of data.
+    Only affects replicants spawned with 'Unlink On Demand'
+    """
+    bl_idname = "object.mitosis_unlink_replicants"
+    bl_label = "Unlink Replicants"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    @classmethod
+    def poll(cls, context):
+        return len(context.selected_objects) > 0
+
+    def execute(self, context):
+        num_unlinked = 0
+        for obj in context.selected_objects:
+            if unlink_replicant(obj):
+                num_unlinked += 1
+        self.report({'INFO'}, "Unlinked {0} replicants".format(num_unlinked))
+        return {'FINISHED'}
+
+
+class OBJECT_OT_MitosisUpdateBehaviorMods(bpy.types.Operator):
+    """Rewrite behavior modifier animation of the active object's existing
+    Mitosis animation, without rebuilding spawned objects
+    """
+    bl_idname = "object.mitosis_update_mods"
+    bl_label = "Update Existing Animation"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    @classmethod
+    def poll(cls, context):
+        return context.active_object is not None
+
+    def execute(self, context):
+        collection = find_output_collection(context.active_object)
+        if collection is None:
+            self.report({'WARNING'}, "No existing Mitosis animation found "
+                                     "for the active object")
+            return {'CANCELLED'}
+        num_updated = update_behavior_mods(
+            collection, get_behavior_mod_values(context))
+        self.report({'INFO'}, "Updated behavior mods of {0} replicants".format(
+            num_updated))
+        return {'FINISHED'}
+
+
+class OBJECT_OT_MitosisSelectGeneration(bpy.types.Operator):
+    """Select every spawned object of a generation of the active object's
+    Mitosis animation
+    """
+    bl_idname = "object.mitosis_select_generation"
+    bl_label = "Select Generation"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    generation: bpy.props.IntProperty(
+        name="Generation",
+        description="Generation to select, the original object is 0",
+        min=0, default=1)
+    extend: bpy.props.BoolProperty(
+        name="Extend", description="Keep the current selection",
+        default=False)
+
+    @classmethod
+    def poll(cls, context):
+        return context.active_object is not None
+
+    def execute(self, context):
+        collection = find_output_collection(context.active_object)
+        if collection is None:
+            self.report({'WARNING'}, "No existing Mitosis animation found "
+                                     "for the active object")
+            return {'CANCELLED'}
+        lineage, objects = get_lineage(collection)
+        if self.generation > lineage.num_generations:
+            self.report({'WARNING'}, "Animation only has {0} "
+                                     "generations".format(
+                                         lineage.num_generations))
+            return {'CANCELLED'}
+        if not self.extend:
+            for obj in context.selected_objects:
+                obj.select_set(False)
+        num_selected = select_replicants(
+            objects, lineage.generation(self.generation))
+        self.report({'INFO'}, "Selected {0} objects".format(num_selected))
+        return {'FINISHED'}
+
+
+class OBJECT_OT_MitosisSelectLineage(bpy.types.Operator):
+    """Select ancestors or descendants of selected spawned objects"""
+    bl_idname = "object.mitosis_select_lineage"
+    bl_label = "Select Lineage"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    direction: bpy.props.EnumProperty(
+        name="Direction",
+        description="Which relatives of the selected objects to select",
+        items=(('DESCENDANTS', "Descendants",
+                "Objects spawned from the selected objects"),
+               ('ANCESTORS', "Ancestors",
+                "Objects the selected objects were spawned from")),
+        default='DESCENDANTS')
+    extend: bpy.props.BoolProperty(
+        name="Extend", description="Keep the current selection",
+        default=True)
+
+    @classmethod
+    def poll(cls, context):
+        return context.active_object is not None
+
+    def execute(self, context):
+        collection = find_output_collection(context.active_object)
+        if collection is None:
+            self.report({'WARNING'}, "No existing Mitosis animation found "
+                                     "for the active object")
+            return {'CANCELLED'}
+        lineage, objects = get_lineage(collection)
+        indices = []
+        for obj in context.selected_objects:
+            # The original object has no plan index, and is plan index 0
+            index = obj.get(PLAN_INDEX_PROP, 0)
+            if index < len(objects) and objects[index] == obj:
+                indices.append(index)
+        if self.direction == 'ANCESTORS':
+            relatives = lineage.ancestors(indices)
+        else:
+            relatives = lineage.descendants(indices)
+        if not self.extend:
+            for obj in context.selected_objects:
+                obj.select_set(False)
+        num_selected = select_replicants(objects, relatives)
+        self.report({'INFO'}, "Selected {0} objects".format(num_selected))
+        return {'FINISHED'}
+
+
+class OBJECT_OT_MitosisViewportLOD(bpy.types.Operator):
+    """Draw distant spawned objects of the active object's Mitosis animation
+    with less detail in the viewport. Renders are unchanged
+    """
+    bl_idname = "object.mitosis_viewport_lod"
+    bl_label = "Viewport LOD"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    lod_type: bpy.props.EnumProperty(
+        name="Simplify To",
+        description="How distant spawned objects are drawn",
+        items=(('BOUNDS', "Bounds", "Draw as bounding boxes"),
+               ('WIRE', "Wire", "Draw as wireframes"),
+               ('DECIMATE', "Decimated", "Draw one shared copy of the mesh "
+                                         "with fewer faces"),
+               ('FULL', "Full", "Draw every spawned object in full, with "
+                                "its own data")),
+        default='BOUNDS')
+    distance: bpy.props.FloatProperty(
+        name="Distance",
+        description="Simplify spawned objects farther than this from the "
+                    "active camera, or the 3D cursor without one. 0 for "
+                    "no limit",
+        min=0.0, default=50.0, subtype='DISTANCE')
+    max_full: bpy.props.IntProperty(
+        name="Most in Full",
+        description="Only draw this many of the nearest spawned objects in "
+                    "full. 0 for no limit",
+        min=0, default=0)
+    decimate_ratio: bpy.props.FloatProperty(
+        name="Decimate Ratio",
+        description="Ratio of faces decimated spawned objects keep",
+        min=0.0, max=1.0, default=0.1)
+
+    @classmethod
+    def poll(cls, context):
+        return context.active_object is not None
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        collection = find_output_collection(context.active_object)
+        if collection is None:
+            self.report({'WARNING'}, "No existing Mitosis animation found "
+                                     "for the active object")
+            return {'CANCELLED'}
+        if context.scene.camera is not None:
+            viewpoint = context.scene.camera.matrix_world.translation
+        else:
+            viewpoint = context.scene.cursor.location
+        num_simplified = apply_viewport_lod(
+            collection, viewpoint, self.lod_type, self.distance,
+            self.max_full, self.decimate_ratio)
+        self.report({'INFO'}, "Simplified {0} of {1} objects".format(
+            num_simplified, len(collection.objects)))
+        return {'FINISHED'}
+
+
+class OBJECT_OT_MitosisFlock(bpy.types.Operator):
+    """Simulate flocking of the active object's existing Mitosis animation
+    after its last generation, and write it to location keyframes
+    """
+    bl_idname = "object.mitosis_flock"
+    bl_label = "Bake Flock"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    frames: bpy.props.IntProperty(
+        name="Frames", description="Number of frames to simulate.",
+        min=1, default=250)
+    step: bpy.props.IntProperty(
+        name="Sample Step", description="Frames between samples of the "
+                                        "simulation.",
+        min=1, default=1)
+    tolerance: bpy.props.FloatProperty(
+        name="Keyframe Tolerance",
+        description="Samples are reduced to the fewest keyframes within this "
+                    "distance of every sample. 0 keys every sample.",
+        min=0.0, default=0.01, precision=3)
+    neighbor_radius: bpy.props.FloatProperty(
+        name="Neighbor Distance",
+        description="Distance replicants align and group with each other "
+                    "within. 0 uses 2.5 times the spawn offset.",
+        min=0.0, default=0.0)
+    separation_radius: bpy.props.FloatProperty(
+        name="Separation Distance",
+        description="Distance replicants avoid crowding within. "
+                    "0 uses the spawn offset.",
+        min=0.0, default=0.0)
+    separation: bpy.props.FloatProperty(
+        name="Separation", description="Strength of avoiding crowds.",
+        min=0.0, default=1.5)
+    alignment: bpy.props.FloatProperty(
+        name="Alignment", description="Strength of matching neighbors' "
+                                      "direction.",
+        min=0.0, default=1.0)
+    cohesion: bpy.props.FloatProperty(
+        name="Cohesion", description="Strength of moving toward neighbors.",
+        min=0.0, default=1.0)
+    max_speed: bpy.props.FloatProperty(
+        name="Max Speed",
+        description="Distance per frame replicants can't go faster than. "
+                    "0 uses a tenth of the spawn offset.",
+        min=0.0, default=0.0)
+    seed: bpy.props.IntProperty(
+        name="Seed", description="Seed of random starting directions.",
+        min=0, default=0)
+
+    @classmethod
+    def poll(cls, context):
+        return context.active_object is not None
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        collection = find_output_collection(context.active_object)
+        if collection is None:
+            self.report({'WARNING'}, "No existing Mitosis animation found "
+                                     "for the active object")
+            return {'CANCELLED'}
+        num_flocked = bake_flock(
+            collection, frames=self.frames, step=self.step,
+            tolerance=self.tolerance, neighbor_radius=self.neighbor_radius,
+            separation_radius=self.separation_radius,
+            separation=self.separation, alignment=self.alignment,
+            cohesion=self.cohesion, max_speed=self.max_speed, seed=self.seed,
+            workers=context.scene.mitosis_props.workers)
+        self.report({'INFO'}, "Flocked {0} replicants".format(num_flocked))
+        return {'FINISHED'}
+
+
+class OBJECT_OT_MitosisAddInstance(bpy.types.Operator):
+    """Place the active object's existing Mitosis animation again at the
+    3D cursor, without spawning new objects
+    """
+    bl_idname = "object.mitosis_add_instance"
+    bl_label = "Add Instance"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    time_offset: bpy.props.IntProperty(
+        name="Time Offset",
+        description="Frames to delay the instance's animation by.",
+        default=0)
+
+    @classmethod
+    def poll(cls, context):
+        return context.active_object is not None
+
+    def execute(self, context):
+        collection = find_output_collection(context.active_object)
+        if collection is None:
+            self.report({'WARNING'}, "No existing Mitosis animation found "
+                                     "for the active object")
+            return {'CANCELLED'}
+        add_instance(collection, location=context.scene.cursor.location,
+                     time_offset=self.time_offset,
+                     target_collection=context.collection)
+        return {'FINISHED'}
+
+
 def add_to_obj_menu(self, context):
     """Appends Mitosis to object menu."""
     self.layout.operator(OBJECT_OT_MitosisPopupPanel.bl_idname)
@@ -1150,6 +4593,7 @@ class OBJECT_OT_BehaviorModList(bpy.types.Operator):
         row = layout.row()
         row.split(factor=.1)
         row.operator("object.behavior_mod", text="New Behavior Mod")
+        row.operator("object.mitosis_update_mods")
 
     def invoke(self, context, event):
         wm = context.window_manager
@@ -1225,13 +4669,48 @@ def register():
     bpy.utils.register_class(OBJECT_OT_MitosisPopupPanel)
     bpy.utils.register_class(OBJECT_OT_BehaviorModOp)
     bpy.utils.register_class(OBJECT_OT_BehaviorModList)
+    bpy.utils.register_class(OBJECT_OT_MitosisUnlinkReplicants)
+    bpy.utils.register_class(OBJECT_OT_MitosisUpdateBehaviorMods)
+    bpy.utils.register_class(OBJECT_OT_MitosisFlock)
+    bpy.utils.register_class(OBJECT_OT_MitosisAddInstance)
+    bpy.utils.register_class(OBJECT_OT_MitosisSelectGeneration)
+    bpy.utils.register_class(OBJECT_OT_MitosisSelectLineage)
+    bpy.utils.register_class(OBJECT_OT_MitosisViewportLOD)
+    for handlers in (bpy.app.handlers.undo_post, bpy.app.handlers.redo_post,
+                     bpy.app.handlers.load_post):
+        handlers.append(clear_lineage_cache)
+    for handlers in (bpy.app.handlers.undo_pre, bpy.app.handlers.redo_pre,
+                     bpy.app.handlers.load_pre):
+        handlers.append(cancel_background_bakes)
+    bpy.app.handlers.render_init.append(unset_lod_proxies)
+    for handlers in (bpy.app.handlers.render_complete,
+                     bpy.app.handlers.render_cancel):
+        handlers.append(reset_lod_proxies)
 
     bpy.types.VIEW3D_MT_object.append(add_to_obj_menu)
 
 
 def unregister():
     bpy.types.VIEW3D_MT_object.remove(add_to_obj_menu)
-
+    for handlers in (bpy.app.handlers.undo_post, bpy.app.handlers.redo_post,
+                     bpy.app.handlers.load_post):
+        handlers.remove(clear_lineage_cache)
+    for handlers in (bpy.app.handlers.undo_pre, bpy.app.handlers.redo_pre,
+                     bpy.app.handlers.load_pre):
+        handlers.remove(cancel_background_bakes)
+    bpy.app.handlers.render_init.remove(unset_lod_proxies)
+    for handlers in (bpy.app.handlers.render_complete,
+                     bpy.app.handlers.render_cancel):
+        handlers.remove(reset_lod_proxies)
+
+    bpy.utils.unregister_class(OBJECT_OT_MitosisViewportLOD)
+    bpy.utils.unregister_class(OBJECT_OT_MitosisSelectLineage)
+    bpy.utils.unregister_class(OBJECT_OT_MitosisSelectGeneration)
+
+    bpy.utils.unregister_class(OBJECT_OT_MitosisUpdateBehaviorMods)
+    bpy.utils.unregister_class(OBJECT_OT_MitosisFlock)
+    bpy.utils.unregister_class(OBJECT_OT_MitosisAddInstance)
+    bpy.utils.unregister_class(OBJECT_OT_MitosisUnlinkReplicants)
     bpy.utils.unregister_class(OBJECT_OT_BehaviorModList)
     bpy.utils.unregister_class(OBJECT_OT_BehaviorModOp)
     bpy.utils.unregister_class(OBJECT_OT_MitosisPopupPanel)
@@ -1258,13 +4737,157 @@ def print_behavior_mods(context):
     print(mods.values())
     print("Behavior Mod list type {0}".format(type(mods)))
 
+
+################
+# Command Line #
+################
+# Bakes a list of jobs headlessly, ex:
+# blender -b scene.blend --python mitosis.py -- --config job.json
+#
+# job.json contains a "jobs" list. Each job names a "source" object, and can
+# set any MitosisProperties setting by name (ex: "generations", "offset",
+# "behavior", "use_z") plus a "behavior_mods" list. Behavior mods take the
+# keys of the Behavior Modifiers panel ("behavior_type", "direction",
+# "delay", "duration", "value"), or of addBehaviorMods().
+# Jobs build on each other in the same file. A job with an "output" path
+# saves a copy of the file there once it's baked, and the config's "output"
+# path gets a copy once every job is done. To bake variants separately,
+# such as across farm nodes, run one process per job with --job.
+# A JSON summary of timings is written to the config's "summary" path, or
+# printed after a "MITOSIS SUMMARY" line.
+
+
+def get_property_default(name):
+    """Returns default value of a MitosisProperties setting"""
+    default = MitosisProperties.__annotations__[name].keywords.get('default')
+    if isinstance(default, (list, tuple)):
+        return list(default)
+    return default
+
+
+def job_behavior_mods(mods):
+    """Converts behavior mods of a batch job to dicts used by replicators
+    :param mods: list of dicts, in panel or addBehaviorMods() format
+    :return: list of dicts"""
+    behavior_mods = []
+    for mod in mods:
+        if 'data_path' not in mod:
+            mod = {'data_path': get_data_path_string(mod['behavior_type']),
+                   'index': int(mod.get('direction', 0)),
+                   'value': mod.get('value', 15),
+                   'duration': mod.get('duration', 15),
+                   'delay': mod.get('delay', 0)}
+        behavior_mods.append(mod)
+    return behavior_mods
+
+
+def bake_job(job):
+    """Bakes one batch job into the current file
+    :param job: dict of job settings, see Command Line notes above
+    :return: dict, summary of the job's results and timing"""
+    settings = {name: get_property_default(name)
+                for name in MitosisProperties.__annotations__}
+    settings.update(job)
+    source = bpy.data.objects.get(settings['source'])
+    if source is None:
+        raise ValueError("Source object {0} not found.".format(
+            settings['source']))
+    bpy.context.view_layer.objects.active = source
+    # Background bakes need Blender's event loop, which batch jobs don't run
+    settings['background'] = False
+
+    time_start = time.perf_counter()
+    behavior_mods = job_behavior_mods(settings.get('behavior_mods', []))
+    replicator = build_replicator(settings, behavior_mods)
+    ignored = []
+    if isinstance(replicator, MBall_Replicator):
+        ignored = ignored_metaball_settings(settings, behavior_mods)
+    run_replicator(replicator, settings)
+    summary = {'name': settings.get('name', settings['source']),
+               'source': settings['source'],
+               'generations': settings['generations'],
+               'replicants': len(replicator.plan) - 1,
+               'collection': replicator.collection.name,
+               'seconds': time.perf_counter() - time_start}
+    if getattr(replicator, 'memory_log', False):
+        summary['memory_growth'] = replicator.memory_log.growth()
+    if ignored:
+        summary['ignored_settings'] = ignored
+    return summary
+
+
+def run_batch(config_path, job_indices=None):
+    """Bakes jobs listed in a JSON config, see Command Line notes above
+    :param config_path: str, path of JSON config
+    :param job_indices: list of ints, only bake these jobs if given
+    :return: dict, summary of every job's results and timing"""
+    with open(config_path) as f:
+        config = json.load(f)
+    jobs = config['jobs']
+    if job_indices:
+        jobs = [jobs[i] for i in job_indices]
+
+    time_start = time.perf_counter()
+    summary = {'file': bpy.data.filepath,
+               'blender': bpy.app.version_string, 'jobs': []}
+    for job in jobs:
+        try:
+            result = bake_job(job)
+            if job.get('output'):
+                bpy.ops.wm.save_as_mainfile(
+                    filepath=bpy.path.abspath(job['output']), copy=True)
+                result['output'] = job['output']
+        except Exception as e:
+            result = {'name': job.get('name', job.get('source')),
+                      'error': "{0}: {1}".format(type(e).__name__, e)}
+        summary['jobs'].append(result)
+
+    if config.get('output'):
+        bpy.ops.wm.save_as_mainfile(
+            filepath=bpy.path.abspath(config['output']), copy=True)
+    summary['seconds'] = time.perf_counter() - time_start
+
+    if config.get('summary'):
+        with open(bpy.path.abspath(config['summary']), 'w') as f:
+            json.dump(summary, f, indent=2)
+    else:
+        print("MITOSIS SUMMARY")
+        print(json.dumps(summary, indent=2))
+    return summary
+
+
+def parse_command_line(argv):
+    """Parses arguments given after '--' on Blender's command line
+    :param argv: list of str, usually sys.argv
+    :return: argparse.Namespace, or None if no Mitosis arguments given"""
+    if '--' not in argv:
+        return None
+    parser = argparse.ArgumentParser(
+        prog="blender -b scene.blend --python mitosis.py --",
+        description="Bake Mitosis animations without the UI")
+    commands = parser.add_mutually_exclusive_group(required=True)
+    commands.add_argument('--config', help="JSON file listing bake jobs")
+    commands.add_argument('--shard',
+                          help="JSON shard of a ShardedBake to apply, used "
+                               "by its worker processes")
+    parser.add_argument('--job', type=int, action='append', dest='jobs',
+                        help="Index of a job in the config to bake. Can be "
+                             "repeated. All jobs are baked if not given")
+    return parser.parse_args(argv[argv.index('--') + 1:])
+
 # TO do - way to select a frame then add a generation that ends at that frame
 
 if __name__ == "__main__":
     time_start = time.time()
 
-    register()
+    args = parse_command_line(sys.argv)
+    if args is None:
+        register()
+    elif args.shard:
+        run_shard(args.shard)
+    else:
+        summary = run_batch(args.config, args.jobs)
+        if any('error' in job for job in summary['jobs']):
+            sys.exit(1)
 
     print("Script duration: %.4f sec" % (time.time() - time_start))
-
-
@@ -13,7 +13,15 @@
 import bpy
 from random import choice
 import mathutils
-from mitosis import CustomObj_Replicator, register
+from mitosis import (PLAN_INDEX_PROP, BackgroundBake, CustomObj_Replicator,
+                     MBall_Replicator, MemoryLog, MergedMeshBake,
+                     PlanFileSink, ShardedBake, Variation, add_instance,
+                     apply_viewport_lod, bake_flock, bake_job,
+                     cancel_background_bakes, find_output_collection,
+                     iter_plan_file, load_plan, register, reset_lod_proxies,
+                     unset_lod_proxies, update_behavior_mods)
+import os
+import tempfile
 import time
 
 
@@ -122,6 +130,697 @@ def test_behavior_mods(
     add_text_title(location=location + mathutils.Vector((0, -distance_int, 0)),
                     display_text=display_text)
 
+
+def test_overlapping_behavior_mods(
+        spawn_offset=12, num_generations=3,
+        location=mathutils.Vector((0, 300, 0))):
+    """
+    Overlapping mods of the same type resolve to one sorted timeline.
+    :return: None
+    """
+    add_random_obj_type(location)
+
+    replicator1 = CustomObj_Replicator(offset=spawn_offset, use_z=False)
+    replicator1.addBehaviorMods(
+        [{'data_path': 'delta_location', 'value': 20, 'duration': 20,
+         'delay': 10, 'index': 2},
+         {'data_path': 'delta_location', 'value': 40, 'duration': 20,
+         'delay': 0, 'index': 2}])
+    replicator1.generate(num_generations)
+
+    for obj in replicator1.collection.objects:
+        fc = obj.animation_data.action.fcurves.find(
+            'delta_location', index=2)
+        frames = [k.co[0] for k in fc.keyframe_points]
+        values = [k.co[1] for k in fc.keyframe_points]
+        assert frames == sorted(frames), "Keyframes must be in order"
+        # Second mod starts first, and is cut short halfway by the first
+        assert values == [0, 20, 20], values
+
+    add_text_title(location=location + mathutils.Vector((0, -spawn_offset, 0)),
+                   display_text="Overlapping Mods")
+
+
+def test_unlink_on_demand(
+        spawn_offset=10, num_generations=3,
+        location=mathutils.Vector((0, 400, 0))):
+    """
+    Spawn replicants with unlinked data deferred, then unlink a selection.
+    :return: None
+    """
+    add_random_obj_type(location)
+    obj_to_copy = bpy.context.active_object
+
+    replicator1 = CustomObj_Replicator(
+        offset=spawn_offset, linked=False, unlink_on_demand=True)
+    replicator1.generate(num_generations)
+
+    spawned = list(replicator1.collection.objects)
+    assert all(obj.data is obj_to_copy.data for obj in spawned), \
+        "Replicants should share data until unlinked"
+
+    # Replicants are hidden before they spawn, and can't be selected then
+    bpy.context.scene.frame_set(replicator1.frame_current)
+    bpy.ops.object.select_all(action='DESELECT')
+    spawned[0].select_set(True)
+    bpy.ops.object.mitosis_unlink_replicants()
+    assert spawned[0].data is not obj_to_copy.data
+    assert spawned[1].data is obj_to_copy.data
+
+    add_text_title(location=location + mathutils.Vector((0, -spawn_offset, 0)),
+                   display_text="Unlink On Demand")
+
+
+def test_large_bake(
+        spawn_offset=10, num_generations=4,
+        location=mathutils.Vector((0, 600, 0))):
+    """
+    Build replicants in a detached collection, linked to the scene at the end.
+    :return: None
+    """
+    add_random_obj_type(location)
+
+    replicator1 = CustomObj_Replicator(
+        offset=spawn_offset, use_z=False, detached=True)
+    assert bpy.context.scene.collection.children.get(
+        replicator1.collection.name) is None
+    replicator1.generate(num_generations)
+    assert bpy.context.scene.collection.children.get(
+        replicator1.collection.name) is not None
+
+    add_text_title(location=location + mathutils.Vector((0, -spawn_offset, 0)),
+                   display_text="Large Bake")
+
+
+def test_background_bake(
+        spawn_offset=10, num_generations=5,
+        location=mathutils.Vector((0, 800, 0))):
+    """
+    Plan in a worker thread and apply in small chunks, as the timer would.
+    :return: None
+    """
+    add_random_obj_type(location)
+
+    replicator1 = CustomObj_Replicator(offset=spawn_offset, use_z=False)
+    bake = BackgroundBake(replicator1, num_generations, chunk_size=3)
+    bake.start()
+    bake.applyAll()
+
+    assert bake.finished and bake.error is None
+    assert bake.replicants_applied == len(replicator1.plan) - 1
+    assert len(replicator1.collection.objects) == bake.replicants_applied
+
+    # Undo and loading files cancel bakes in progress
+    bpy.context.view_layer.objects.active = replicator1.obj_to_copy
+    replicator2 = CustomObj_Replicator(offset=spawn_offset, use_z=False)
+    bake2 = BackgroundBake(replicator2, num_generations, chunk_size=3)
+    bake2.start()
+    cancel_background_bakes()
+    assert bake2.cancelled and bake2 not in BackgroundBake.active
+    assert not bpy.app.timers.is_registered(bake2._timer)
+
+    add_text_title(location=location + mathutils.Vector((0, -spawn_offset, 0)),
+                   display_text="Background Bake")
+
+
+def test_update_existing(
+        spawn_offset=10, num_generations=3,
+        location=mathutils.Vector((0, 1000, 0))):
+    """
+    Re-running on a stored plan only rebuilds replicants that changed.
+    :return: None
+    """
+    add_random_obj_type(location)
+    obj_to_copy = bpy.context.active_object
+
+    replicator1 = CustomObj_Replicator(offset=spawn_offset, use_z=False)
+    replicator1.generate(num_generations)
+    stored_plan = load_plan(replicator1.collection)
+    assert stored_plan.toBytes() == replicator1.plan.toBytes()
+    names_before = {obj.name for obj in replicator1.collection.objects}
+
+    # One more generation keeps every object of the first run
+    bpy.context.view_layer.objects.active = obj_to_copy
+    replicator2 = CustomObj_Replicator(
+        offset=spawn_offset, use_z=False, collection=replicator1.collection)
+    replicator2.generate(num_generations + 1)
+    assert len(replicator2.replicants) == \
+        len(replicator2.plan) - len(stored_plan) + 1
+    names_after = {obj.name for obj in replicator2.collection.objects}
+    assert names_before < names_after
+
+    # Changing the offset changes every replicant
+    bpy.context.view_layer.objects.active = obj_to_copy
+    replicator3 = CustomObj_Replicator(
+        offset=spawn_offset * 2, use_z=False,
+        collection=replicator1.collection)
+    replicator3.generate(num_generations)
+    assert len(replicator3.collection.objects) == len(replicator3.plan) - 1
+    assert len(replicator3.replicants) == len(replicator3.plan)
+
+    add_text_title(location=location + mathutils.Vector((0, -spawn_offset, 0)),
+                   display_text="Update Existing")
+
+
+def test_update_behavior_mods(
+        spawn_offset=10, num_generations=3,
+        location=mathutils.Vector((0, 1200, 0))):
+    """
+    Rewrite behavior mods of an existing animation, keeping its replicants.
+    :return: None
+    """
+    add_random_obj_type(location)
+
+    replicator1 = CustomObj_Replicator(offset=spawn_offset, use_z=False)
+    replicator1.addBehaviorMods(
+        [{'data_path': 'rotation_euler', 'value': 10, 'duration': 20,
+         'delay': 0, 'index': 0}])
+    replicator1.generate(num_generations)
+    objs_before = list(replicator1.collection.objects)
+
+    update_behavior_mods(replicator1.collection, [
+        {'data_path': 'delta_scale', 'value': 2, 'duration': 10,
+         'delay': 5, 'index': 1}])
+
+    assert list(replicator1.collection.objects) == objs_before
+    for obj in objs_before:
+        fcurves = obj.animation_data.action.fcurves
+        assert fcurves.find('rotation_euler', index=0) is None
+        fc = fcurves.find('delta_scale', index=1)
+        frame_spawn_end = fcurves.find('scale', index=0).keyframe_points[-1].co[0]
+        assert fc.keyframe_points[0].co[0] == frame_spawn_end + 5
+
+    add_text_title(location=location + mathutils.Vector((0, -spawn_offset, 0)),
+                   display_text="Update Behavior Mods")
+
+
+def test_sharded_bake(
+        spawn_offset=10, num_generations=4,
+        location=mathutils.Vector((0, 1400, 0))):
+    """
+    Bake across worker processes, each writing a shard that is appended.
+    :return: None
+    """
+    add_random_obj_type(location)
+    obj_to_copy = bpy.context.active_object
+
+    replicator1 = CustomObj_Replicator(offset=spawn_offset, use_z=False)
+    ShardedBake(replicator1, num_generations, num_workers=2,
+                partition='SPACE').run()
+
+    spawned = list(replicator1.collection.objects)
+    assert len(spawned) == len(replicator1.plan) - 1
+    assert all(obj.data is obj_to_copy.data for obj in spawned)
+
+    add_text_title(location=location + mathutils.Vector((0, -spawn_offset, 0)),
+                   display_text="Sharded Bake")
+
+
+def test_memory_log(
+        spawn_offset=10, num_generations=3,
+        location=mathutils.Vector((0, 1600, 0))):
+    """
+    Record memory use after each generation.
+    :return: None
+    """
+    add_random_obj_type(location)
+
+    memory_log = MemoryLog()
+    replicator1 = CustomObj_Replicator(offset=spawn_offset, use_z=False,
+                                       memory_log=memory_log)
+    replicator1.generate(num_generations)
+
+    assert [r['generation'] for r in memory_log.records] == [0, 1, 2, 3]
+    assert memory_log.growth()['objects'] == len(replicator1.plan) - 1
+    assert memory_log.growth()['actions'] >= len(replicator1.plan) - 1
+
+    add_text_title(location=location + mathutils.Vector((0, -spawn_offset, 0)),
+                   display_text="Memory Log")
+
+
+def test_flock(
+        spawn_offset=10, num_generations=4, frames=60, step=5,
+        location=mathutils.Vector((0, 1800, 0))):
+    """
+    Flock replicants after they spawn.
+    :return: None
+    """
+    add_random_obj_type(location)
+
+    replicator1 = CustomObj_Replicator(offset=spawn_offset)
+    replicator1.generate(num_generations)
+    frame_end = replicator1.frame_current
+    bake_flock(replicator1.collection, frames=frames, step=step)
+    ends = [obj.animation_data.action.fcurves.find(
+        'location', index=0).keyframe_points[-1].co[1]
+        for obj in replicator1.collection.objects]
+    # Flocking again replaces the first flock's keyframes, and tiles of the
+    # flock stepped in separate processes give the same result
+    num_flocked = bake_flock(replicator1.collection, frames=frames,
+                             step=step, workers=2)
+
+    assert num_flocked == len(replicator1.plan) - 1
+    for obj, end in zip(replicator1.collection.objects, ends):
+        fc = obj.animation_data.action.fcurves.find('location', index=0)
+        flock_keys = [k for k in fc.keyframe_points if k.co[0] >= frame_end]
+        assert len(flock_keys) == frames // step + 1
+        assert fc.keyframe_points[-1].co[0] == frame_end + frames
+        assert abs(fc.keyframe_points[-1].co[1] - end) < 1e-4
+
+    # Decimated keyframes stay within tolerance of the simulated flock
+    bake_flock(replicator1.collection, frames=frames, step=1)
+    curves = [obj.animation_data.action.fcurves.find('location', index=0)
+              for obj in replicator1.collection.objects]
+    dense = [[fc.evaluate(frame_end + f) for f in range(frames + 1)]
+             for fc in curves]
+    bake_flock(replicator1.collection, frames=frames, step=1, tolerance=0.01)
+    for obj, values in zip(replicator1.collection.objects, dense):
+        fc = obj.animation_data.action.fcurves.find('location', index=0)
+        assert len(fc.keyframe_points) < frames
+        for f, value in enumerate(values):
+            assert abs(fc.evaluate(frame_end + f) - value) < 0.0101
+
+    add_text_title(location=location + mathutils.Vector((0, -spawn_offset, 0)),
+                   display_text="Flock")
+
+
+def test_metaball_elements(
+        spawn_offset=1.5, num_generations=4,
+        location=mathutils.Vector((0, 2000, 0))):
+    """
+    Replicate a metaball as elements of one metaball instead of objects.
+    :return: None
+    """
+    bpy.ops.object.metaball_add(type='BALL', location=location)
+
+    replicator1 = MBall_Replicator(offset=spawn_offset)
+    replicator1.generate(num_generations)
+
+    assert len(replicator1.collection.objects) == 1
+    assert len(replicator1.obj.data.elements) == len(replicator1.plan) - 1
+    radius = replicator1.obj.data.animation_data.action.fcurves.find(
+        'elements[0].radius')
+    assert radius.evaluate(replicator1.frame_start - 1) == 0
+
+    # Batch jobs build elements too, listing the settings they don't use
+    summary = bake_job({'source': replicator1.obj_to_copy.name,
+                        'generations': 1, 'offset': spawn_offset,
+                        'use_variation': True})
+    assert summary['ignored_settings'] == ["Vary Replicants"]
+    assert len(bpy.data.collections[summary['collection']].objects) == 1
+
+    add_text_title(location=location + mathutils.Vector((0, -10, 0)),
+                   display_text="Metaball Elements")
+
+
+def test_instances(
+        spawn_offset=10, num_generations=3,
+        location=mathutils.Vector((0, 2200, 0))):
+    """
+    Place one bake several times as collection instances, some delayed.
+    :return: None
+    """
+    add_random_obj_type(location)
+
+    replicator1 = CustomObj_Replicator(offset=spawn_offset)
+    replicator1.generate(num_generations)
+    num_objects = len(bpy.data.objects)
+    num_actions = len(bpy.data.actions)
+
+    instances = [add_instance(replicator1.collection,
+                              location=location + mathutils.Vector((x, 0, 0)))
+                 for x in (100, 200)]
+    delayed = [add_instance(replicator1.collection, time_offset=20,
+                            location=location + mathutils.Vector((x, 0, 0)))
+               for x in (300, 400)]
+
+    # Delayed instances share one time shifted copy, and no new Actions
+    assert delayed[0].instance_collection is delayed[1].instance_collection
+    assert all(i.instance_collection is replicator1.collection
+               for i in instances)
+    assert len(bpy.data.objects) == (num_objects + len(instances + delayed)
+                                     + len(replicator1.collection.objects))
+    assert len(bpy.data.actions) == num_actions
+    assert find_output_collection(delayed[0]) is replicator1.collection
+
+    add_text_title(location=location + mathutils.Vector((0, -spawn_offset, 0)),
+                   display_text="Instances")
+
+
+def test_domain(
+        spawn_offset=2, num_generations=12,
+        location=mathutils.Vector((0, 2400, 0))):
+    """
+    Fill a closed mesh, growth stops once it's full.
+    :return: None
+    """
+    bpy.ops.mesh.primitive_uv_sphere_add(radius=5, location=location)
+    domain = bpy.context.active_object
+    domain.display_type = 'WIRE'
+    add_random_obj_type(location)
+
+    replicator1 = CustomObj_Replicator(offset=spawn_offset, domain=domain)
+    replicator1.generate(num_generations)
+
+    assert 1 < len(replicator1.plan) <= len(replicator1.plan.domain)
+    assert replicator1.plan.domain.contains(replicator1.plan.cells[1:]).all()
+    # Full before the last generation, which spawns nothing
+    assert len(replicator1.plan) == replicator1.plan.generation_starts[-1]
+
+    add_text_title(location=location + mathutils.Vector((0, -10, 0)),
+                   display_text="Domain")
+
+
+def test_streaming_generations(
+        spawn_offset=10, num_generations=4,
+        location=mathutils.Vector((0, 2600, 0))):
+    """
+    Commit generations one at a time, to Blender or to a file.
+    :return: None
+    """
+    add_random_obj_type(location)
+    obj_to_copy = bpy.context.active_object
+
+    replicator1 = CustomObj_Replicator(offset=spawn_offset, use_z=False)
+    spawned = [len(g) for g in replicator1.iterGenerations(num_generations)]
+    assert len(replicator1.replicants) == 1  # Only the original is kept
+    assert len(replicator1.collection.objects) == sum(spawned)
+    assert load_plan(replicator1.collection) is not None
+
+    bpy.context.view_layer.objects.active = obj_to_copy
+    replicator2 = CustomObj_Replicator(offset=spawn_offset, use_z=False)
+    filepath = os.path.join(tempfile.mkdtemp(), "generations.mtgs")
+    for generation in replicator2.iterGenerations(
+            num_generations, PlanFileSink(filepath, replicator2.plan)):
+        pass
+    assert replicator2.collection is None  # Nothing added to Blender
+    assert [len(g) for g in iter_plan_file(filepath)] == spawned
+
+    add_text_title(location=location + mathutils.Vector((0, -spawn_offset, 0)),
+                   display_text="Streaming Generations")
+
+
+def test_frame_window(
+        spawn_offset=10, num_generations=6, frames_to_spawn=10,
+        location=mathutils.Vector((0, 2800, 0))):
+    """
+    Only build replicants seen in a shot's frames, static if done spawning.
+    :return: None
+    """
+    add_random_obj_type(location)
+
+    replicator1 = CustomObj_Replicator(
+        offset=spawn_offset, frames_to_spawn=frames_to_spawn,
+        frame_window=(25, 40))
+    replicator1.generate(num_generations)
+
+    plan = replicator1.plan
+    # The last generation only becomes visible after the window
+    assert len(replicator1.collection.objects) == plan.generation_starts[-1] - 1
+    for obj in replicator1.collection.objects:
+        generation = plan.generationsOf([obj[PLAN_INDEX_PROP]])[0]
+        if generation <= 2:  # Done spawning before the window
+            assert obj.animation_data is None
+            continue
+        # Keyframes are clipped to the window, and one on either side of it
+        for fc in obj.animation_data.action.fcurves:
+            frames = [k.co[0] for k in fc.keyframe_points]
+            assert len([f for f in frames if f < 25]) <= 1
+            assert len([f for f in frames if f > 40]) <= 1
+
+    add_text_title(location=location + mathutils.Vector((0, -spawn_offset, 0)),
+                   display_text="Frame Window")
+
+
+def test_execute_operator(
+        num_generations=2, location=mathutils.Vector((0, 3000, 0))):
+    """
+    Execute Mitosis with the panel's settings, as the Execute button does.
+    :return: None
+    """
+    add_random_obj_type(location)
+    obj_to_copy = bpy.context.active_object
+    mitosis_props = bpy.context.scene.mitosis_props
+    mitosis_props.generations = num_generations
+    mitosis_props.use_frame_window = True
+    mitosis_props.frame_window_end = 1000
+
+    bpy.ops.object.mitosis()
+    mitosis_props.use_frame_window = False
+    collection = find_output_collection(obj_to_copy)
+    assert collection is not None
+    assert len(collection.objects) == 2 ** num_generations - 1
+
+    add_text_title(location=location + mathutils.Vector(
+        (0, -mitosis_props.offset, 0)), display_text="Execute Operator")
+
+
+def test_lineage(
+        spawn_offset=10, num_generations=5,
+        location=mathutils.Vector((0, 3200, 0))):
+    """
+    Select a generation, and descendants and ancestors of a replicant.
+    :return: None
+    """
+    add_random_obj_type(location)
+
+    replicator1 = CustomObj_Replicator(offset=spawn_offset)
+    replicator1.generate(num_generations)
+
+    lineage = replicator1.plan.lineage()
+    objects = {obj[PLAN_INDEX_PROP]: obj
+               for obj in replicator1.collection.objects}
+    bpy.context.scene.frame_set(replicator1.frame_current)
+
+    bpy.context.view_layer.objects.active = objects[1]
+    bpy.ops.object.mitosis_select_generation(generation=3)
+    selected = {obj[PLAN_INDEX_PROP] for obj in bpy.context.selected_objects}
+    assert selected == set(lineage.generation(3).tolist())
+    assert all(replicator1.plan.generationsOf(list(selected)) == 3)
+
+    # Every descendant's chain of parents leads back to the replicant
+    bpy.ops.object.select_all(action='DESELECT')
+    objects[1].select_set(True)
+    bpy.ops.object.mitosis_select_lineage(direction='DESCENDANTS')
+    selected = {obj[PLAN_INDEX_PROP] for obj in bpy.context.selected_objects}
+    for index in range(2, len(replicator1.plan)):
+        parent = index
+        while parent > 1:
+            parent = replicator1.plan.parents[parent]
+        assert (index in selected) == (parent == 1)
+
+    last = len(replicator1.plan) - 1
+    bpy.ops.object.select_all(action='DESELECT')
+    objects[last].select_set(True)
+    bpy.ops.object.mitosis_select_lineage(direction='ANCESTORS',
+                                          extend=False)
+    selected = {obj.get(PLAN_INDEX_PROP, 0)
+                for obj in bpy.context.selected_objects}
+    assert len(selected) == num_generations
+    assert replicator1.plan.parents[last] in selected
+
+    add_text_title(location=location + mathutils.Vector((0, -spawn_offset, 0)),
+                   display_text="Lineage Selection")
+
+
+def test_variation(
+        spawn_offset=10, num_generations=4, frames_to_spawn=10,
+        location=mathutils.Vector((0, 3400, 0))):
+    """
+    Vary scale, rotation, spawn delay and behavior mods of replicants.
+    :return: None
+    """
+    add_random_obj_type(location)
+    obj_to_copy = bpy.context.active_object
+    variation = Variation(seed=7, scale=0.3, rotation=0.5, delay=4,
+                          mod_amplitude=0.5)
+    behavior_mods = [{'data_path': 'delta_location', 'value': 5,
+                      'duration': 20, 'delay': 0, 'index': 2}]
+
+    replicators = []
+    for i in range(2):
+        replicator = CustomObj_Replicator(
+            offset=spawn_offset, frames_to_spawn=frames_to_spawn,
+            variation=variation)
+        replicator.addBehaviorMods(behavior_mods)
+        replicator.generate(num_generations)
+        replicators.append(replicator)
+        bpy.context.view_layer.objects.active = obj_to_copy
+
+    # The same seed varies replicants the same way
+    objs, objs_again = [sorted(r.collection.objects,
+                               key=lambda obj: obj[PLAN_INDEX_PROP])
+                        for r in replicators]
+    scales = [obj.scale[0] / obj_to_copy.scale[0] for obj in objs]
+    assert scales == [obj.scale[0] / obj_to_copy.scale[0]
+                      for obj in objs_again]
+    assert len(set(round(scale, 5) for scale in scales)) > 1
+    assert all(0.7 - 1e-5 <= scale <= 1.3 + 1e-5 for scale in scales)
+    assert all(abs(angle) <= 0.5 + 1e-5
+               for obj in objs for angle in obj.delta_rotation_euler)
+
+    plan = replicators[0].plan
+    for obj in objs:
+        fcurves = obj.animation_data.action.fcurves
+        frame_spawn = plan.frameSpawn(
+            plan.generationsOf([obj[PLAN_INDEX_PROP]])[0])
+        delay = fcurves.find('location').keyframe_points[0].co[0] \
+            - frame_spawn
+        assert 0 <= delay <= 4
+        mod = fcurves.find('delta_location', index=2).keyframe_points
+        assert mod[0].co[0] == frame_spawn + frames_to_spawn + delay
+        assert 2.5 - 1e-5 <= mod[-1].co[1] <= 7.5 + 1e-5
+
+    add_text_title(location=location + mathutils.Vector((0, -spawn_offset, 0)),
+                   display_text="Variation")
+
+
+def test_viewport_lod(
+        spawn_offset=10, num_generations=4,
+        location=mathutils.Vector((0, 3600, 0))):
+    """
+    Draw distant replicants as bounds, then as a shared decimated mesh, then
+    in full again.
+    :return: None
+    """
+    bpy.ops.mesh.primitive_monkey_add(location=location)
+
+    replicator1 = CustomObj_Replicator(offset=spawn_offset)
+    replicator1.generate(num_generations)
+    objs = list(replicator1.collection.objects)
+    bpy.context.scene.frame_set(replicator1.frame_current)
+
+    num_simplified = apply_viewport_lod(
+        replicator1.collection, location, 'BOUNDS', max_full=4)
+    assert num_simplified == len(objs) - 4
+    near = [obj for obj in objs
+            if (obj.location - location).length <= spawn_offset]
+    assert len([obj for obj in objs if obj.display_type == 'BOUNDS']) \
+        == num_simplified
+    assert all(obj.display_type == 'TEXTURED' for obj in near)
+
+    source_data = replicator1.obj_to_copy.data
+    apply_viewport_lod(replicator1.collection, location, 'DECIMATE',
+                       distance=spawn_offset * 1.5, decimate_ratio=0.2)
+    proxies = set()
+    for obj in objs:
+        far = (obj.location - location).length > spawn_offset * 1.5
+        assert obj.display_type == 'TEXTURED'
+        assert (obj.data is not source_data) == far
+        if far:
+            proxies.add(obj.data)
+        # Render visibility is still animated
+        assert obj.animation_data.action.fcurves.find('hide_render')
+    assert len(proxies) == 1
+    proxy = proxies.pop()
+    proxy_name = proxy.name
+    assert len(bpy.data.meshes[proxy_name].polygons) \
+        < len(source_data.polygons) / 2
+    assert not any(obj.modifiers for obj in objs)
+    # Renders use each replicant's own data
+    unset_lod_proxies()
+    assert all(obj.data is source_data for obj in objs)
+    reset_lod_proxies()
+    assert len([obj for obj in objs if obj.data is proxy]) \
+        == len([obj for obj in objs if obj.data is not source_data]) > 0
+
+    assert apply_viewport_lod(replicator1.collection, location, 'FULL') == 0
+    assert all(obj.data is source_data for obj in objs)
+    assert bpy.data.meshes.get(proxy_name) is None
+
+    add_text_title(location=location + mathutils.Vector((0, -spawn_offset, 0)),
+                   display_text="Viewport LOD")
+
+
+def test_merged_mesh(
+        spawn_offset=10, num_generations=3, frames_to_spawn=10,
+        location=mathutils.Vector((0, 3800, 0))):
+    """
+    Bake replicants into one mesh animated by a point cache, and compare it
+    with an ordinary bake.
+    :return: None
+    """
+    bpy.ops.mesh.primitive_cube_add(location=location)
+    obj_to_copy = bpy.context.active_object
+    behavior_mods = [{'data_path': 'delta_location', 'value': 5,
+                      'duration': 20, 'delay': 5, 'index': 2}]
+    settings = {'offset': spawn_offset, 'frames_to_spawn': frames_to_spawn,
+                'variation': Variation(seed=2, scale=0.2, delay=3)}
+
+    replicator1 = CustomObj_Replicator(**settings)
+    replicator1.addBehaviorMods(behavior_mods)
+    replicator1.generate(num_generations)
+    objs = sorted(replicator1.collection.objects,
+                  key=lambda obj: obj[PLAN_INDEX_PROP])
+
+    bpy.context.view_layer.objects.active = obj_to_copy
+    filepath = os.path.join(tempfile.mkdtemp(), "merged.pc2")
+    replicator2 = CustomObj_Replicator(**settings)
+    replicator2.addBehaviorMods(behavior_mods)
+    merged = MergedMeshBake(replicator2, filepath).run(num_generations)
+
+    assert list(replicator2.collection.objects) == [merged]
+    num_vertices = len(obj_to_copy.data.vertices)
+    assert len(merged.data.vertices) == len(objs) * num_vertices
+    assert merged.modifiers[0].type == 'MESH_CACHE'
+    with open(filepath, 'rb') as f:
+        header = f.read(32)
+    assert header[:12] == b"POINTCACHE2\0"
+
+    # A cube's vertices are centered on its location
+    for frame in (frames_to_spawn + 5, replicator1.frame_current + 25):
+        bpy.context.scene.frame_set(frame)
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        merged_evaluated = merged.evaluated_get(depsgraph)
+        mesh = merged_evaluated.to_mesh()
+        for i, obj in enumerate(objs):
+            if obj.hide_viewport:  # Not evaluated
+                continue
+            center = sum((mesh.vertices[v].co for v in range(
+                i * num_vertices, (i + 1) * num_vertices)),
+                mathutils.Vector()) / num_vertices
+            obj_location = obj.evaluated_get(depsgraph).matrix_world.translation
+            assert (center - obj_location).length < 1e-4
+        merged_evaluated.to_mesh_clear()
+
+    add_text_title(location=location + mathutils.Vector((0, -spawn_offset, 0)),
+                   display_text="Merged Mesh")
+
+
+def test_divide_and_merge(
+        spawn_offset=10, num_generations=6,
+        location=mathutils.Vector((0, 4000, 0))):
+    """
+    Replicants dividing into the same cell merge into one object.
+    :return: None
+    """
+    add_random_obj_type(location)
+    obj_to_copy = bpy.context.active_object
+
+    replicator1 = CustomObj_Replicator(
+        behavior="DIVIDE_AND_MERGE", offset=spawn_offset, use_z=False)
+    replicator1.generate(num_generations)
+
+    plan = replicator1.plan
+    assert len(set(plan.cells)) == len(plan)
+    # Fewer replicants than dividing without merging
+    assert len(plan) < 2 ** num_generations
+    assert len(replicator1.collection.objects) == len(plan) - 1
+    assert load_plan(replicator1.collection).merge
+
+    # Running again on the stored plan keeps every object
+    objs_before = set(replicator1.collection.objects)
+    bpy.context.view_layer.objects.active = obj_to_copy
+    replicator2 = CustomObj_Replicator(
+        behavior="DIVIDE_AND_MERGE", offset=spawn_offset, use_z=False,
+        collection=replicator1.collection)
+    replicator2.generate(num_generations)
+    assert set(replicator2.collection.objects) == objs_before
+
+    add_text_title(location=location + mathutils.Vector((0, -spawn_offset, 0)),
+                   display_text="Divide and Merge")
+
+
 if __name__ == "__main__":
     time_start = time.time()
     current_location = 0
@@ -132,5 +831,27 @@ if __name__ == "__main__":
 
     ### Behavior Mod Tests ###
     test_behavior_mods()
+    test_overlapping_behavior_mods()
+
+    ### Data Linking Tests ###
+    test_unlink_on_demand()
+    test_large_bake()
+    test_background_bake()
+    test_update_existing()
+    test_update_behavior_mods()
+    test_sharded_bake()
+    test_memory_log()
+    test_flock()
+    test_metaball_elements()
+    test_instances()
+    test_domain()
+    test_streaming_generations()
+    test_frame_window()
+    test_execute_operator()
+    test_lineage()
+    test_variation()
+    test_viewport_lod()
+    test_merged_mesh()
+    test_divide_and_merge()
 
     print("Script duration: %.4f sec" % (time.time() - time_start))
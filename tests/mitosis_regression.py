@@ -0,0 +1,211 @@
+# ### Mitosis Performance Regression Tests ###
+#
+# Runs a fixed set of reference bakes headlessly, and compares their time,
+# peak Python memory, and counts of objects, fcurves and keyframes against
+# tests/regression_baseline.json. Each bake's plan must also be bit-identical
+# to the golden plan recorded in the baseline.
+#
+# Run with:
+# blender -b --python tests/mitosis_regression.py -- [options]
+# or, with Blender installed as a Python module (bpy):
+# python tests/mitosis_regression.py -- [options]
+#
+# or, without Blender, against the bpy stand-in in tests/standin:
+# python tests/mitosis_regression.py -- --standin [options]
+#
+# Exits with a non-zero code if any bake regresses past the tolerances.
+# Timings depend on the machine, so after an intended change, or on a new
+# reference machine, record a new baseline with --update. With --standin,
+# only counts and plans are compared, since time and memory aren't Blender's.
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+import zlib
+
+STANDIN = '--standin' in sys.argv
+if STANDIN:
+    sys.path.insert(0, os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "standin"))
+import bpy
+
+sys.path.insert(STANDIN, os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+from mitosis import CustomObj_Replicator
+
+BASELINE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "regression_baseline.json")
+
+MODS = [
+    {'data_path': 'rotation_euler', 'value': 10, 'duration': 30,
+     'delay': 0, 'index': 2},
+    {'data_path': 'delta_location', 'value': 5, 'duration': 20,
+     'delay': 10, 'index': 0},
+    {'data_path': 'delta_location', 'value': -5, 'duration': 20,
+     'delay': 20, 'index': 0},  # Overlaps the previous mod
+    {'data_path': 'delta_scale', 'value': 2, 'duration': 15,
+     'delay': 5, 'index': 1},
+]
+
+# name: replicator settings, number of generations, number of MODS used
+REFERENCE_BAKES = {
+    'divide_xyz_8': ({'behavior': 'DIVIDE'}, 8, 0),
+    'divide_xy_20_mods2': ({'behavior': 'DIVIDE', 'use_z': False}, 20, 2),
+    'appear_xz_8_mods1': ({'behavior': 'APPEAR', 'use_y': False}, 8, 1),
+    'inflate_xyz_5_mods4': ({'behavior': 'INFLATE'}, 5, 4),
+    'divide_x_30': ({'behavior': 'DIVIDE', 'use_y': False,
+                     'use_z': False}, 30, 0),
+    'divide_xyz_7_large_bake': ({'behavior': 'DIVIDE', 'detached': True},
+                                7, 1),
+}
+
+
+def setup_scene():
+    """Empties the file and adds the object to replicate"""
+    if STANDIN:
+        bpy.reset()
+        obj = bpy.data.objects.new("Cube", bpy.data.meshes.new("Cube"))
+        bpy.context.scene.collection.objects.link(obj)
+        bpy.context.view_layer.objects.active = obj
+        obj.select_set(True)
+        return obj
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    bpy.ops.mesh.primitive_cube_add(location=(0, 0, 0))
+    return bpy.context.active_object
+
+
+def run_bake(settings, generations, num_mods):
+    """Bakes in a fresh scene
+    :return: CustomObj_Replicator, after generating"""
+    setup_scene()
+    replicator = CustomObj_Replicator(offset=3.0, frames_to_spawn=10,
+                                      **settings)
+    replicator.addBehaviorMods(MODS[:num_mods])
+    replicator.generate(generations)
+    return replicator
+
+
+def measure_bake(name, repeats=5):
+    """Measures a reference bake
+    :param name: str, key of REFERENCE_BAKES
+    :param repeats: int, the fastest of this many timed runs is used
+    :return: dict of measurements"""
+    settings, generations, num_mods = REFERENCE_BAKES[name]
+
+    seconds = []
+    for i in range(repeats):
+        time_start = time.perf_counter()
+        run_bake(settings, generations, num_mods)
+        seconds.append(time.perf_counter() - time_start)
+
+    # Measured separately, since tracing slows the bake down
+    tracemalloc.start()
+    replicator = run_bake(settings, generations, num_mods)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    fcurves = 0
+    keyframes = 0
+    for obj in replicator.collection.objects:
+        if obj.animation_data is None or obj.animation_data.action is None:
+            continue
+        for fc in obj.animation_data.action.fcurves:
+            fcurves += 1
+            keyframes += len(fc.keyframe_points)
+
+    return {'seconds': min(seconds), 'peak_memory': peak_memory,
+            'objects': len(replicator.collection.objects),
+            'fcurves': fcurves, 'keyframes': keyframes,
+            # Hashed uncompressed, since zlib builds can compress differently
+            'plan_sha256': hashlib.sha256(zlib.decompress(
+                replicator.plan.toBytes())).hexdigest()}
+
+
+def compare(name, result, expected, tolerances):
+    """Compares measurements of a bake against its baseline
+    :return: list of str, description of each regression"""
+    failures = []
+    for key in ('objects', 'fcurves', 'keyframes'):
+        if result[key] != expected[key]:
+            failures.append("{0}: {1} {2}, baseline {3}".format(
+                name, key, result[key], expected[key]))
+    if result['plan_sha256'] != expected['plan_sha256']:
+        failures.append("{0}: plan differs from golden plan".format(name))
+    for key in ('seconds', 'peak_memory'):
+        if STANDIN:
+            break
+        limit = expected[key] * (1 + tolerances[key])
+        if result[key] > limit:
+            failures.append("{0}: {1} {2:.4g}, over limit {3:.4g} "
+                            "(baseline {4:.4g})".format(
+                                name, key, result[key], limit, expected[key]))
+    return failures
+
+
+def parse_args(argv):
+    argv = argv[argv.index('--') + 1:] if '--' in argv else []
+    parser = argparse.ArgumentParser(description="Mitosis regression gate")
+    parser.add_argument('--baseline', default=BASELINE_PATH,
+                        help="Baseline JSON file to compare against")
+    parser.add_argument('--update', action='store_true',
+                        help="Record current measurements as the baseline")
+    parser.add_argument('--time-tolerance', type=float,
+                        help="Allowed fraction of slowdown, ex: 0.25")
+    parser.add_argument('--memory-tolerance', type=float,
+                        help="Allowed fraction of peak memory growth")
+    parser.add_argument('--bake', action='append', dest='bakes',
+                        choices=sorted(REFERENCE_BAKES),
+                        help="Only run these reference bakes")
+    parser.add_argument('--standin', action='store_true',
+                        help="Bake against the bpy stand-in, and only "
+                        "compare counts and plans")
+    return parser.parse_args(argv)
+
+
+def main(argv):
+    args = parse_args(argv)
+    if args.standin and args.update:
+        print("A baseline can't be recorded with --standin")
+        return 2
+    baseline = {'tolerances': {'seconds': 0.25, 'peak_memory': 0.1},
+                'bakes': {}}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    tolerances = dict(baseline['tolerances'])
+    if args.time_tolerance is not None:
+        tolerances['seconds'] = args.time_tolerance
+    if args.memory_tolerance is not None:
+        tolerances['peak_memory'] = args.memory_tolerance
+
+    failures = []
+    for name in args.bakes or sorted(REFERENCE_BAKES):
+        result = measure_bake(name)
+        print("{0}: {1:.4f} sec, {2} bytes peak, {3} objects, {4} fcurves, "
+              "{5} keyframes".format(
+                  name, result['seconds'], result['peak_memory'],
+                  result['objects'], result['fcurves'], result['keyframes']))
+        if args.update:
+            baseline['bakes'][name] = result
+        elif name not in baseline['bakes']:
+            failures.append("{0}: no baseline, record one with "
+                            "--update".format(name))
+        else:
+            failures += compare(
+                name, result, baseline['bakes'][name], tolerances)
+
+    if args.update:
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print("Baseline written to {0}".format(args.baseline))
+    for failure in failures:
+        print("REGRESSION " + failure)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
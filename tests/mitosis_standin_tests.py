@@ -0,0 +1,419 @@
+# ### Mitosis Stand-in Tests ###
+#
+# Tests of Mitosis' replication, keyframing and behavior modifier code, run in
+# plain CPython against the bpy and mathutils stand-ins in tests/standin, so
+# they finish in well under a second without Blender:
+#
+# python tests/mitosis_standin_tests.py
+#
+# Features needing Blender itself, like operators, metaballs, domains, worker
+# processes and evaluating fcurves, are covered by the integration tests.
+
+import os
+import sys
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TESTS_DIR, "standin"))
+sys.path.insert(1, os.path.dirname(TESTS_DIR))
+
+import bpy
+import mathutils
+import numpy as np
+from mitosis import (OUTPUT_COLLECTION_PROP, PLAN_INDEX_PROP, BackgroundBake,
+                     CustomObj_Replicator, MemoryLog, Variation,
+                     find_output_collection, load_plan, update_behavior_mods)
+
+
+def add_cube(location=(0, 0, 0)):
+    """
+    Empties the file, and adds an active mesh object to replicate.
+    :param location: sequence of 3 floats, location of the object
+    :return: bpy.types.Object
+    """
+    bpy.reset()
+    obj = bpy.data.objects.new("Cube", bpy.data.meshes.new("Cube"))
+    obj.location = location
+    bpy.context.scene.collection.objects.link(obj)
+    bpy.context.view_layer.objects.active = obj
+    obj.select_set(True)
+    return obj
+
+
+def test_generate(spawn_offset=10, num_generations=5):
+    """
+    Replicants are keyed to spawn next to their parents.
+    :return: None
+    """
+    obj_to_copy = add_cube((1, 2, 3))
+
+    replicator1 = CustomObj_Replicator(offset=spawn_offset, use_z=False,
+                                       frames_to_spawn=10)
+    replicator1.generate(num_generations)
+
+    plan = replicator1.plan
+    spawned = list(replicator1.collection.objects)
+    assert len(plan.generation_starts) == num_generations + 1
+    assert len(spawned) == len(plan) - 1
+    assert all(obj.data is obj_to_copy.data for obj in spawned)
+    for obj in spawned:
+        index = obj[PLAN_INDEX_PROP]
+        fc = obj.animation_data.action.fcurves.find('location', index=2)
+        assert fc.keyframe_points[-1].co[1] == 3  # Stays on the XY plane
+        frame_spawn = plan.frameSpawn(plan.generationsOf([index])[0])
+        assert fc.keyframe_points[0].co[0] == frame_spawn
+        assert fc.keyframe_points[-1].co[0] == frame_spawn + 10
+        parent_location = mathutils.Vector(
+            plan.locations([plan.cells[plan.parents[index]]])[0])
+        end = mathutils.Vector([obj.animation_data.action.fcurves.find(
+            'location', index=i).keyframe_points[-1].co[1] for i in range(3)])
+        assert (end - parent_location).length == spawn_offset
+
+
+def test_behavior_mods(spawn_offset=10, num_generations=3):
+    """
+    Overlapping behavior mods are keyed after spawning, the later cutting
+    the earlier short.
+    :return: None
+    """
+    add_cube()
+
+    replicator1 = CustomObj_Replicator(offset=spawn_offset,
+                                       frames_to_spawn=10)
+    replicator1.addBehaviorMods([
+        {'data_path': 'delta_location', 'value': 5, 'duration': 20,
+         'delay': 0, 'index': 0},
+        {'data_path': 'delta_location', 'value': -5, 'duration': 20,
+         'delay': 10, 'index': 0}])
+    replicator1.generate(num_generations)
+
+    for obj in replicator1.collection.objects:
+        keyframes = obj.animation_data.action.fcurves.find(
+            'delta_location', index=0).keyframe_points
+        frames = [k.co[0] for k in keyframes]
+        assert frames == sorted(set(frames))
+        assert frames[-1] - frames[0] == 30
+        assert keyframes[1].co[1] == 2.5  # Where the earlier one was cut
+        assert keyframes[-1].co[1] == -5
+
+
+def test_large_bake_failure(spawn_offset=10, num_generations=5):
+    """
+    A detached collection is linked to the scene even if a generation fails.
+    :return: None
+    """
+    add_cube()
+
+    replicator1 = CustomObj_Replicator(offset=spawn_offset, detached=True)
+    apply_generation = replicator1.applyGeneration
+
+    def fail_on_third(generation, *args, **kwargs):
+        if generation.generation == 3:
+            raise RuntimeError("Failed generation")
+        return apply_generation(generation, *args, **kwargs)
+
+    replicator1.applyGeneration = fail_on_third
+    try:
+        replicator1.generate(num_generations)
+    except RuntimeError:
+        pass
+    else:
+        assert False, "Failure wasn't raised"
+    scene_children = bpy.context.scene.collection.children
+    assert scene_children.get(replicator1.collection.name) is \
+        replicator1.collection
+    assert len(replicator1.collection.objects) == 3
+
+
+def test_streaming_failure(spawn_offset=10, num_generations=5):
+    """
+    A generation failing while streaming links a detached collection without
+    storing the partial plan or removing what was committed.
+    :return: None
+    """
+    add_cube()
+
+    replicator1 = CustomObj_Replicator(offset=spawn_offset, detached=True)
+    apply_generation = replicator1.applyGeneration
+
+    def fail_on_third(generation, *args, **kwargs):
+        if generation.generation == 3:
+            raise RuntimeError("Failed generation")
+        return apply_generation(generation, *args, **kwargs)
+
+    replicator1.applyGeneration = fail_on_third
+    try:
+        for generation in replicator1.iterGenerations(num_generations):
+            pass
+    except RuntimeError:
+        pass
+    else:
+        assert False, "Failure wasn't raised"
+    scene_children = bpy.context.scene.collection.children
+    assert scene_children.get(replicator1.collection.name) is \
+        replicator1.collection
+    assert len(replicator1.collection.objects) == 3
+    assert load_plan(replicator1.collection) is None
+
+    # Stopping early finishes with what was committed
+    add_cube()
+    replicator2 = CustomObj_Replicator(offset=spawn_offset)
+    generations = replicator2.iterGenerations(num_generations)
+    next(generations)
+    generations.close()
+    assert len(load_plan(replicator2.collection)) == 2
+
+
+def test_background_bake_failure(spawn_offset=10, num_generations=5):
+    """
+    A background bake failing to apply a generation finishes, linking its
+    detached collection without storing the partial plan.
+    :return: None
+    """
+    add_cube()
+
+    replicator1 = CustomObj_Replicator(offset=spawn_offset, detached=True)
+    apply_generation = replicator1.applyGeneration
+
+    def fail_on_third(generation, *args, **kwargs):
+        if generation.generation == 3:
+            raise RuntimeError("Failed generation")
+        return apply_generation(generation, *args, **kwargs)
+
+    replicator1.applyGeneration = fail_on_third
+    bake = BackgroundBake(replicator1, num_generations)
+    bake.start()
+    bake.applyAll()
+
+    assert bake.finished and bake.apply_failed
+    assert isinstance(bake.error, RuntimeError)
+    assert bake not in BackgroundBake.active
+    assert not bpy.app.timers.is_registered(bake._timer)
+    scene_children = bpy.context.scene.collection.children
+    assert scene_children.get(replicator1.collection.name) is \
+        replicator1.collection
+    assert len(replicator1.collection.objects) == 3
+    assert load_plan(replicator1.collection) is None
+
+
+def test_update_existing(spawn_offset=10, num_generations=3):
+    """
+    Re-running on a stored plan keeps every object of the earlier run.
+    :return: None
+    """
+    obj_to_copy = add_cube()
+
+    replicator1 = CustomObj_Replicator(offset=spawn_offset, use_z=False)
+    replicator1.generate(num_generations)
+    stored_plan = load_plan(replicator1.collection)
+    assert stored_plan.toBytes() == replicator1.plan.toBytes()
+    objs_before = set(replicator1.collection.objects)
+
+    bpy.context.view_layer.objects.active = obj_to_copy
+    replicator2 = CustomObj_Replicator(
+        offset=spawn_offset, use_z=False, collection=replicator1.collection)
+    replicator2.generate(num_generations + 1)
+    assert objs_before < set(replicator2.collection.objects)
+    assert len(replicator2.collection.objects) == len(replicator2.plan) - 1
+    assert len(bpy.data.objects) == len(replicator2.plan)
+
+
+def test_find_output_collection(spawn_offset=10, num_generations=2):
+    """
+    An object's latest animation is found, even with several of it.
+    :return: None
+    """
+    obj_to_copy = add_cube()
+
+    collections = []
+    for i in range(3):
+        bpy.context.view_layer.objects.active = obj_to_copy
+        replicator = CustomObj_Replicator(offset=spawn_offset)
+        replicator.generate(num_generations)
+        collections.append(replicator.collection)
+    assert find_output_collection(obj_to_copy) is collections[-1]
+
+    # Without the record on the object, the latest is still found
+    del obj_to_copy[OUTPUT_COLLECTION_PROP]
+    assert find_output_collection(obj_to_copy) is collections[-1]
+
+
+def test_update_behavior_mods(spawn_offset=10, num_generations=3):
+    """
+    Rewrite behavior mods of an existing animation, keeping its replicants.
+    :return: None
+    """
+    add_cube()
+
+    replicator1 = CustomObj_Replicator(offset=spawn_offset, use_z=False)
+    replicator1.addBehaviorMods(
+        [{'data_path': 'rotation_euler', 'value': 10, 'duration': 20,
+         'delay': 0, 'index': 0}])
+    replicator1.generate(num_generations)
+    objs_before = list(replicator1.collection.objects)
+
+    update_behavior_mods(replicator1.collection, [
+        {'data_path': 'delta_scale', 'value': 2, 'duration': 10,
+         'delay': 5, 'index': 1}])
+
+    assert list(replicator1.collection.objects) == objs_before
+    for obj in objs_before:
+        fcurves = obj.animation_data.action.fcurves
+        assert fcurves.find('rotation_euler', index=0) is None
+        fc = fcurves.find('delta_scale', index=1)
+        frame_spawn_end = fcurves.find('scale', index=0).keyframe_points[-1].co[0]
+        assert fc.keyframe_points[0].co[0] == frame_spawn_end + 5
+
+
+def test_update_varied_behavior_mods(spawn_offset=10, num_generations=3):
+    """
+    Rewriting the same behavior mods of a varied animation keeps each
+    replicant's delay and amplitude.
+    :return: None
+    """
+    add_cube()
+    behavior_mods = [{'data_path': 'delta_location', 'value': 5,
+                      'duration': 20, 'delay': 0, 'index': 2}]
+
+    replicator1 = CustomObj_Replicator(
+        offset=spawn_offset, frames_to_spawn=10, variation=Variation(
+            seed=3, delay=4, mod_amplitude=0.5))
+    replicator1.addBehaviorMods(behavior_mods)
+    replicator1.generate(num_generations)
+
+    def mod_keyframes():
+        keyframes = []
+        for obj in replicator1.collection.objects:
+            fc = obj.animation_data.action.fcurves.find(
+                'delta_location', index=2)
+            keyframes.append(tuple(tuple(k.co) for k in fc.keyframe_points))
+        return keyframes
+
+    keyframes_before = mod_keyframes()
+    assert len(set(keyframes_before)) > 1
+    update_behavior_mods(replicator1.collection, behavior_mods)
+    assert mod_keyframes() == keyframes_before
+
+
+def test_frame_window(spawn_offset=10, num_generations=6):
+    """
+    Replicants spawning after the window aren't built.
+    :return: None
+    """
+    add_cube()
+
+    replicator1 = CustomObj_Replicator(offset=spawn_offset,
+                                       frames_to_spawn=10,
+                                       frame_window=(25, 40))
+    replicator1.generate(num_generations)
+
+    plan = replicator1.plan
+    assert len(replicator1.collection.objects) == plan.generation_starts[-1] - 1
+    for obj in replicator1.collection.objects:
+        if plan.generationsOf([obj[PLAN_INDEX_PROP]])[0] <= 2:
+            assert obj.animation_data is None
+
+
+def test_variation(spawn_offset=10, num_generations=4):
+    """
+    The same seed varies replicants the same way.
+    :return: None
+    """
+    obj_to_copy = add_cube()
+    variation = Variation(seed=7, scale=0.3, rotation=0.5, delay=4,
+                          mod_amplitude=0.5)
+
+    rotations = []
+    for i in range(2):
+        bpy.context.view_layer.objects.active = obj_to_copy
+        replicator = CustomObj_Replicator(offset=spawn_offset,
+                                          variation=variation)
+        replicator.generate(num_generations)
+        objs = sorted(replicator.collection.objects,
+                      key=lambda obj: obj[PLAN_INDEX_PROP])
+        rotations.append([obj.delta_rotation_euler.to_tuple()
+                          for obj in objs])
+    assert rotations[0] == rotations[1]
+    assert len(set(rotations[0])) > 1
+    assert all(abs(angle) <= 0.5 + 1e-5
+               for rotation in rotations[0] for angle in rotation)
+
+    # A slice of a generation draws the same values as the whole of it
+    whole = variation.sample(3, np.arange(200))
+    part = variation.sample(3, np.arange(120, 150))
+    assert all((whole[amount][120:150] == part[amount]).all()
+               for amount in whole)
+
+
+def test_lineage(spawn_offset=10, num_generations=5):
+    """
+    Every replicant of a generation descends from the first replicant.
+    :return: None
+    """
+    add_cube()
+
+    replicator1 = CustomObj_Replicator(offset=spawn_offset)
+    replicator1.generate(num_generations)
+
+    lineage = replicator1.plan.lineage()
+    assert lineage.num_generations == num_generations
+    descendants = set(lineage.descendants([0]).tolist())
+    assert descendants == set(range(1, len(replicator1.plan)))
+    last = len(replicator1.plan) - 1
+    assert len(lineage.ancestors([last])) == num_generations
+
+
+def test_divide_and_merge(spawn_offset=10, num_generations=6):
+    """
+    Replicants dividing into the same cell merge into one object.
+    :return: None
+    """
+    add_cube()
+
+    replicator1 = CustomObj_Replicator(
+        behavior="DIVIDE_AND_MERGE", offset=spawn_offset, use_z=False)
+    replicator1.generate(num_generations)
+
+    plan = replicator1.plan
+    assert len(set(plan.cells)) == len(plan) < 2 ** num_generations
+    # No two objects end on the same location
+    locations = set()
+    for obj in replicator1.collection.objects:
+        fcurves = obj.animation_data.action.fcurves
+        locations.add(tuple(fcurves.find('location', index=i)
+                            .keyframe_points[-1].co[1] for i in range(3)))
+    assert len(locations) == len(replicator1.collection.objects) \
+        == len(plan) - 1
+
+
+def test_memory_log(spawn_offset=10, num_generations=3):
+    """
+    Record object and keyframe counts after each generation.
+    :return: None
+    """
+    add_cube()
+
+    memory_log = MemoryLog()
+    replicator1 = CustomObj_Replicator(offset=spawn_offset, use_z=False,
+                                       memory_log=memory_log)
+    replicator1.generate(num_generations)
+
+    assert [r['generation'] for r in memory_log.records] == [0, 1, 2, 3]
+    assert memory_log.growth()['objects'] == len(replicator1.plan) - 1
+
+
+if __name__ == "__main__":
+    test_generate()
+    test_behavior_mods()
+    test_large_bake_failure()
+    test_streaming_failure()
+    test_background_bake_failure()
+    test_update_existing()
+    test_find_output_collection()
+    test_update_behavior_mods()
+    test_update_varied_behavior_mods()
+    test_frame_window()
+    test_variation()
+    test_lineage()
+    test_divide_and_merge()
+    test_memory_log()
+    print("Stand-in tests passed")
@@ -0,0 +1,668 @@
+# ### bpy Stand-in ###
+#
+# A minimal stand-in for Blender's bpy module, so Mitosis' replication,
+# keyframing and behavior modifier code can run in plain CPython, such as on
+# CI machines without Blender. Put this directory first on sys.path before
+# importing mitosis:
+#
+#   sys.path.insert(0, "tests/standin")
+#   import bpy  # This stand-in
+#   import mitosis
+#
+# Only what Mitosis' core uses is modeled: objects, meshes, collections,
+# Actions and fcurves in bpy.data, custom properties, selection, and the
+# active object. FCurve.update() sorts keyframes and merges those on the same
+# frame like Blender does, so keyframe counts match a real bake. Playback
+# isn't modeled, there's no depsgraph or FCurve.evaluate(), and operators,
+# panels and properties only register so mitosis can be imported.
+# reset() empties the file, like loading factory settings with use_empty.
+
+import sys
+import types as _types
+
+import numpy as np
+
+import mathutils
+
+##############
+# Properties #
+##############
+
+
+class _PropertyDeferred():
+    """Property definition, like the one bpy.props functions return"""
+    def __init__(self, function, keywords):
+        self.function = function
+        self.keywords = keywords
+
+
+def _property_function(name):
+    def function(**keywords):
+        return _PropertyDeferred(function, keywords)
+    function.__name__ = name
+    return function
+
+
+props = _types.ModuleType('bpy.props')
+for _name in ('BoolProperty', 'IntProperty', 'FloatProperty',
+              'StringProperty', 'EnumProperty', 'PointerProperty',
+              'CollectionProperty', 'FloatVectorProperty',
+              'IntVectorProperty', 'BoolVectorProperty'):
+    setattr(props, _name, _property_function(_name))
+
+##############
+# Data Types #
+##############
+
+
+class bpy_prop_array(list):
+    pass
+
+
+class bpy_struct():
+    pass
+
+
+class ID(bpy_struct):
+    """Data-block with a unique name and custom properties"""
+    _data_attr = None  # Name of the bpy.data collection holding this type
+
+    def __init__(self, name):
+        self._name = None
+        self._props = {}
+        self.use_fake_user = False
+        self.name = name
+
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, name):
+        self._name = data._uniqueName(self, name)
+
+    @property
+    def name_full(self):
+        return self._name
+
+    @property
+    def users(self):
+        return data._users(self)
+
+    def __getitem__(self, key):
+        return self._props[key]
+
+    def __setitem__(self, key, value):
+        self._props[key] = value
+
+    def __delitem__(self, key):
+        del self._props[key]
+
+    def __contains__(self, key):
+        return key in self._props
+
+    def get(self, key, default=None):
+        return self._props.get(key, default)
+
+    def keys(self):
+        return self._props.keys()
+
+    def copy(self):
+        new = self.__class__.__new__(self.__class__)
+        new.__dict__.update(self.__dict__)
+        new._name = None
+        new._props = dict(self._props)
+        new.name = self._name
+        getattr(data, self._data_attr)._add(new)
+        return new
+
+    def __repr__(self):
+        return "<bpy_struct, {0}(\"{1}\")>".format(
+            self.__class__.__name__, self._name)
+
+
+class Mesh(ID):
+    _data_attr = 'meshes'
+
+    def __init__(self, name):
+        ID.__init__(self, name)
+        self.materials = []
+
+
+class MetaBall(ID):
+    _data_attr = 'metaballs'
+
+
+class Keyframe(bpy_struct):
+    """One keyframe of an FCurve"""
+    def __init__(self, points, index):
+        self._points = points
+        self._index = index
+
+    @property
+    def co(self):
+        return mathutils.Vector(self._points._co[self._index])
+
+    @co.setter
+    def co(self, co):
+        self._points._co[self._index] = (co[0], co[1])
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return self._points._attributes[name][self._index]
+        except KeyError:
+            raise AttributeError(name)
+
+
+class FCurveKeyframePoints(bpy_struct):
+    """Keyframes of an FCurve, stored as a numpy array of (frame, value)"""
+    def __init__(self):
+        self._co = np.zeros((0, 2), dtype=np.float32)
+        self._attributes = {}  # Other keyframe attributes set in bulk
+
+    def __len__(self):
+        return len(self._co)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self._co)
+        if not 0 <= index < len(self._co):
+            raise IndexError("keyframe index out of range")
+        return Keyframe(self, index)
+
+    def __iter__(self):
+        return (Keyframe(self, i) for i in range(len(self._co)))
+
+    def values(self):
+        return list(self)
+
+    def items(self):
+        return list(enumerate(self))
+
+    def add(self, count=1):
+        self._co = np.concatenate((self._co, np.zeros((count, 2), np.float32)))
+        for name, values in self._attributes.items():
+            self._attributes[name] = np.concatenate(
+                (values, np.zeros((count,) + values.shape[1:], values.dtype)))
+
+    def insert(self, frame, value, options=set(), keyframe_type='KEYFRAME'):
+        """Adds a keyframe, or replaces the value of one on the same frame"""
+        same = np.flatnonzero(self._co[:, 0] == np.float32(frame))
+        if len(same):
+            self._co[same[-1], 1] = value
+            return Keyframe(self, int(same[-1]))
+        index = int(np.searchsorted(self._co[:, 0], frame, side='right'))
+        self._co = np.insert(self._co, index, (frame, value), axis=0)
+        for name, values in self._attributes.items():
+            self._attributes[name] = np.insert(values, index, 0, axis=0)
+        return Keyframe(self, index)
+
+    def remove(self, keyframe):
+        index = keyframe._index
+        self._co = np.delete(self._co, index, axis=0)
+        for name, values in self._attributes.items():
+            self._attributes[name] = np.delete(values, index, axis=0)
+
+    def foreach_set(self, attribute, seq):
+        values = np.asarray(seq).ravel()
+        if attribute == 'co':
+            self._co = values.astype(np.float32).reshape(-1, 2).copy()
+            return
+        per_key = len(values) // max(len(self._co), 1)
+        self._attributes[attribute] = values.reshape(
+            (len(self._co), per_key) if per_key > 1 else (len(self._co),))
+
+    def foreach_get(self, attribute, seq):
+        if attribute == 'co':
+            seq[:] = self._co.ravel()
+        else:
+            seq[:] = self._attributes[attribute].ravel()
+
+
+class FCurve(bpy_struct):
+    def __init__(self, data_path, index=0, action_group=""):
+        self.data_path = data_path
+        self.array_index = index
+        self.group = action_group or None
+        self.keyframe_points = FCurveKeyframePoints()
+
+    def update(self):
+        """Sorts keyframes, and keeps the last of those on the same frame"""
+        points = self.keyframe_points
+        order = np.argsort(points._co[:, 0], kind='stable')
+        frames = points._co[order, 0]
+        last = np.append(frames[1:] != frames[:-1], True)
+        keep = order[last]
+        points._co = points._co[keep]
+        for name, values in points._attributes.items():
+            points._attributes[name] = values[keep]
+
+
+class ActionFCurves(bpy_struct):
+    def __init__(self):
+        self._fcurves = []
+
+    def __len__(self):
+        return len(self._fcurves)
+
+    def __iter__(self):
+        return iter(list(self._fcurves))
+
+    def __getitem__(self, index):
+        return self._fcurves[index]
+
+    def new(self, data_path, index=0, action_group=""):
+        if self.find(data_path, index=index) is not None:
+            raise RuntimeError("Error: F-Curve '{0}[{1}]' already "
+                               "exists".format(data_path, index))
+        fc = FCurve(data_path, index, action_group)
+        self._fcurves.append(fc)
+        return fc
+
+    def find(self, data_path, index=0):
+        for fc in self._fcurves:
+            if fc.data_path == data_path and fc.array_index == index:
+                return fc
+        return None
+
+    def remove(self, fcurve):
+        self._fcurves.remove(fcurve)
+
+
+class Action(ID):
+    _data_attr = 'actions'
+
+    def __init__(self, name):
+        ID.__init__(self, name)
+        self.fcurves = ActionFCurves()
+
+    def copy(self):
+        raise NotImplementedError("Copying Actions isn't modeled")
+
+
+class AnimData(bpy_struct):
+    def __init__(self):
+        self.action = None
+
+
+class Object(ID):
+    _data_attr = 'objects'
+    # RNA of enum properties mitosis reads item values of
+    bl_rna = _types.SimpleNamespace(properties={
+        'display_type': _types.SimpleNamespace(enum_items=[
+            _types.SimpleNamespace(identifier=identifier, value=value)
+            for identifier, value in (('BOUNDS', 1), ('WIRE', 2),
+                                      ('SOLID', 3), ('TEXTURED', 5))])})
+    # Transform properties, kept as mathutils types
+    _vectors = {'location': (0, 0, 0), 'scale': (1, 1, 1),
+                'delta_location': (0, 0, 0), 'delta_scale': (1, 1, 1)}
+    _eulers = ('rotation_euler', 'delta_rotation_euler')
+
+    def __init__(self, name, object_data=None):
+        object.__setattr__(self, '_transforms', {})
+        ID.__init__(self, name)
+        for name, default in self._vectors.items():
+            self._transforms[name] = mathutils.Vector(default)
+        for name in self._eulers:
+            self._transforms[name] = mathutils.Euler((0, 0, 0))
+        self.data = object_data
+        self.rotation_mode = 'XYZ'
+        self.hide_viewport = False
+        self.hide_render = False
+        self.display_type = 'TEXTURED'
+        self.instance_type = 'NONE'
+        self.instance_collection = None
+        self.animation_data = None
+        self._select = False
+
+    @property
+    def type(self):
+        if self.data is None:
+            return 'EMPTY'
+        if isinstance(self.data, MetaBall):
+            return 'META'
+        return 'MESH'
+
+    def __getattr__(self, name):
+        transforms = object.__getattribute__(self, '_transforms')
+        if name in transforms:
+            return transforms[name]
+        raise AttributeError(
+            "'Object' object has no attribute '{0}'".format(name))
+
+    def __setattr__(self, name, value):
+        if name in self._transforms:
+            # Assigning copies values, the property keeps its own type
+            transform = self._transforms[name]
+            for i in range(3):
+                transform[i] = value[i]
+        else:
+            object.__setattr__(self, name, value)
+
+    def copy(self):
+        new = ID.copy(self)
+        object.__setattr__(new, '_transforms', {
+            name: value.copy() for name, value in self._transforms.items()})
+        new._select = False
+        return new
+
+    @property
+    def users_collection(self):
+        return [collection for collection in data._allCollections()
+                if self in collection.objects._objects]
+
+    def select_set(self, state):
+        self._select = bool(state)
+
+    def select_get(self):
+        return self._select
+
+    def animation_data_create(self):
+        if self.animation_data is None:
+            self.animation_data = AnimData()
+        return self.animation_data
+
+    def animation_data_clear(self):
+        self.animation_data = None
+
+    def keyframe_insert(self, data_path, index=-1, frame=None,
+                        group="Object Transforms"):
+        """Keys current value of a transform property on frame"""
+        frame = context.scene.frame_current if frame is None else frame
+        value = getattr(self, data_path)
+        if self.animation_data is None:
+            self.animation_data_create()
+        if self.animation_data.action is None:
+            self.animation_data.action = data.actions.new(self.name + "Action")
+        fcurves = self.animation_data.action.fcurves
+        indices = range(len(value)) if index == -1 else [index]
+        for i in indices:
+            fc = fcurves.find(data_path, index=i) or fcurves.new(
+                data_path, index=i, action_group=group)
+            fc.keyframe_points.insert(frame, value[i])
+        return True
+
+
+class CollectionObjects(bpy_struct):
+    """Objects linked to a collection"""
+    def __init__(self):
+        self._objects = {}  # Object: None, an ordered set
+
+    def __len__(self):
+        return len(self._objects)
+
+    def __iter__(self):
+        return iter(list(self._objects))
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            obj = self.get(key)
+            if obj is None:
+                raise KeyError(key)
+            return obj
+        return list(self._objects)[key]
+
+    def get(self, name, default=None):
+        for obj in self._objects:
+            if obj.name == name:
+                return obj
+        return default
+
+    def link(self, obj):
+        if obj in self._objects:
+            raise RuntimeError("Object '{0}' already in collection".format(
+                obj.name))
+        self._objects[obj] = None
+
+    def unlink(self, obj):
+        del self._objects[obj]
+
+    def foreach_get(self, attribute, seq):
+        seq[:] = np.ravel([getattr(obj, attribute) for obj in self._objects])
+
+
+class CollectionChildren(CollectionObjects):
+    pass
+
+
+class Collection(ID):
+    _data_attr = 'collections'
+
+    def __init__(self, name):
+        ID.__init__(self, name)
+        self.objects = CollectionObjects()
+        self.children = CollectionChildren()
+        self.hide_viewport = False
+        self.hide_render = False
+
+
+class _DataCollection(bpy_struct):
+    """One type of data-block in bpy.data"""
+    def __init__(self, id_type):
+        self._id_type = id_type
+        self._ids = {}  # Name: ID
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __iter__(self):
+        return iter(list(self._ids.values()))
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self._ids[key]
+        return list(self._ids.values())[key]
+
+    def __contains__(self, name):
+        return name in self._ids
+
+    def get(self, name, default=None):
+        return self._ids.get(name, default)
+
+    def new(self, name, *args):
+        new = self._id_type(name, *args)
+        self._add(new)
+        return new
+
+    def _add(self, new):
+        self._ids[new.name] = new
+
+    def remove(self, id_data, do_unlink=True):
+        del self._ids[id_data.name]
+        if isinstance(id_data, Object):
+            for collection in data._allCollections():
+                collection.objects._objects.pop(id_data, None)
+        elif isinstance(id_data, Collection):
+            for collection in data._allCollections():
+                collection.children._objects.pop(id_data, None)
+
+
+class BlendData(bpy_struct):
+    def __init__(self):
+        self.filepath = ""
+        self.objects = _DataCollection(Object)
+        self.meshes = _DataCollection(Mesh)
+        self.metaballs = _DataCollection(MetaBall)
+        self.collections = _DataCollection(Collection)
+        self.actions = _DataCollection(Action)
+
+    def _uniqueName(self, id_data, name):
+        """Blender's naming, a used name gets the lowest free .001 suffix"""
+        if id_data._data_attr is None or not hasattr(self, id_data._data_attr):
+            return name
+        ids = getattr(self, id_data._data_attr)._ids
+        if ids.get(id_data._name) is id_data:
+            del ids[id_data._name]
+            renamed = True
+        else:
+            renamed = False
+        unique = name
+        number = 0
+        while unique in ids:
+            number += 1
+            unique = "{0}.{1:03d}".format(name, number)
+        if renamed:
+            ids[unique] = id_data
+        return unique
+
+    def _allCollections(self):
+        return [context.scene.collection] + list(self.collections)
+
+    def _users(self, id_data):
+        if isinstance(id_data, Object):
+            return len(id_data.users_collection)
+        if isinstance(id_data, Collection):
+            return sum(id_data in c.children._objects
+                       for c in self._allCollections())
+        if isinstance(id_data, Action):
+            return sum(obj.animation_data is not None
+                       and obj.animation_data.action is id_data
+                       for obj in self.objects)
+        return sum(obj.data is id_data for obj in self.objects)
+
+    def batch_remove(self, ids):
+        for id_data in ids:
+            getattr(self, id_data._data_attr).remove(id_data)
+
+
+#########
+# Scene #
+#########
+
+class LayerObjects(bpy_struct):
+    def __init__(self):
+        self.active = None
+
+
+class ViewLayer(bpy_struct):
+    def __init__(self):
+        self.objects = LayerObjects()
+
+    def update(self):
+        pass
+
+
+class Scene(ID):
+    _data_attr = None
+
+    def __init__(self, name="Scene"):
+        ID.__init__(self, name)
+        self.collection = Collection.__new__(Collection)
+        ID.__init__(self.collection, "Scene Collection")
+        self.collection.objects = CollectionObjects()
+        self.collection.children = CollectionChildren()
+        self.frame_start = 1
+        self.frame_end = 250
+        self.frame_current = 1
+        self.camera = None
+        self.cursor = _types.SimpleNamespace(
+            location=mathutils.Vector((0, 0, 0)))
+
+    def frame_set(self, frame, subframe=0.0):
+        self.frame_current = frame
+
+
+class Context(bpy_struct):
+    def __init__(self):
+        self.scene = Scene()
+        self.view_layer = ViewLayer()
+        # No windows, like in background mode
+        self.window_manager = _types.SimpleNamespace(windows=[])
+
+    @property
+    def blend_data(self):
+        return data
+
+    @property
+    def active_object(self):
+        return self.view_layer.objects.active
+
+    @property
+    def object(self):
+        return self.view_layer.objects.active
+
+    @property
+    def collection(self):
+        return self.scene.collection
+
+    @property
+    def selected_objects(self):
+        return [obj for obj in data.objects if obj._select]
+
+
+#############################
+# Registration Placeholders #
+#############################
+
+class _Registrable():
+    @classmethod
+    def append(cls, function):
+        pass
+
+    @classmethod
+    def remove(cls, function):
+        pass
+
+
+types = _types.ModuleType('bpy.types')
+for _cls in (bpy_struct, bpy_prop_array, ID, Object, Mesh, MetaBall,
+             Collection, Action, FCurve, Keyframe, AnimData, Scene, ViewLayer,
+             Context, BlendData):
+    setattr(types, _cls.__name__, _cls)
+for _name in ('Operator', 'Panel', 'Menu', 'PropertyGroup', 'UIList',
+              'VIEW3D_MT_object'):
+    setattr(types, _name, type(_name, (_Registrable, bpy_struct), {}))
+
+utils = _types.ModuleType('bpy.utils')
+utils.register_class = lambda cls: None
+utils.unregister_class = lambda cls: None
+
+path = _types.ModuleType('bpy.path')
+path.abspath = lambda filepath, **kwargs: (
+    filepath[2:] if filepath.startswith("//") else filepath)
+
+app = _types.ModuleType('bpy.app')
+app.version = (4, 2, 0)
+app.version_string = "4.2.0 (stand-in)"
+app.binary_path = ""
+app.background = True
+app.handlers = _types.ModuleType('bpy.app.handlers')
+app.handlers.persistent = lambda function: function
+for _name in ('undo_pre', 'undo_post', 'redo_pre', 'redo_post', 'load_pre',
+              'load_post', 'render_init', 'render_complete', 'render_cancel',
+              'frame_change_post', 'depsgraph_update_post'):
+    setattr(app.handlers, _name, [])
+app.timers = _types.ModuleType('bpy.app.timers')
+_timers = set()
+app.timers.register = lambda function, **kwargs: _timers.add(function)
+app.timers.unregister = lambda function: _timers.discard(function)
+app.timers.is_registered = lambda function: function in _timers
+
+ops = _types.ModuleType('bpy.ops')  # Operators aren't modeled
+
+
+def _undo_push(**kwargs):
+    raise RuntimeError("No undo stack, like in background mode")
+
+
+ops.ed = _types.SimpleNamespace(undo_push=_undo_push)
+
+sys.modules.update({'bpy.props': props, 'bpy.types': types,
+                    'bpy.utils': utils, 'bpy.path': path, 'bpy.app': app,
+                    'bpy.app.handlers': app.handlers,
+                    'bpy.app.timers': app.timers, 'bpy.ops': ops})
+
+data = None
+context = None
+
+
+def reset():
+    """Empties the file, leaving a scene with no objects"""
+    global data, context
+    data = BlendData()
+    context = Context()
+
+
+reset()
@@ -0,0 +1,143 @@
+# ### mathutils Stand-in ###
+#
+# A minimal stand-in for Blender's mathutils module, used with the bpy
+# stand-in in this directory, see bpy.py. Only Vector and Euler are modeled.
+
+import math
+import sys
+import types as _types
+
+
+class Vector():
+    """Sequence of floats, with mathutils.Vector's arithmetic"""
+    def __init__(self, seq=(0.0, 0.0, 0.0)):
+        self._values = [float(v) for v in seq]
+
+    def __len__(self):
+        return len(self._values)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(self._values[index])
+        return self._values[index]
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            self._values[index] = [float(v) for v in value]
+        else:
+            self._values[index] = float(value)
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __array__(self, dtype=None, copy=None):
+        import numpy as np
+        return np.array(self._values, dtype=dtype)
+
+    def _other(self, other):
+        if len(other) != len(self):
+            raise ValueError("Vectors must have the same size")
+        return other
+
+    def __add__(self, other):
+        return self.__class__(
+            a + b for a, b in zip(self._values, self._other(other)))
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return self.__class__(
+            a - b for a, b in zip(self._values, self._other(other)))
+
+    def __rsub__(self, other):
+        return self.__class__(
+            b - a for a, b in zip(self._values, self._other(other)))
+
+    def __mul__(self, other):
+        try:
+            factor = float(other)
+        except TypeError:  # Element-wise, as in Blender 2.8 and later
+            return self.__class__(
+                a * b for a, b in zip(self._values, self._other(other)))
+        return self.__class__(a * factor for a in self._values)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        return self.__class__(a / float(other) for a in self._values)
+
+    def __neg__(self):
+        return self.__class__(-a for a in self._values)
+
+    def __eq__(self, other):
+        try:
+            return len(other) == len(self) and all(
+                a == b for a, b in zip(self._values, other))
+        except TypeError:
+            return False
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    @property
+    def length(self):
+        return math.sqrt(sum(a * a for a in self._values))
+
+    def dot(self, other):
+        return sum(a * b for a, b in zip(self._values, self._other(other)))
+
+    def normalized(self):
+        length = self.length
+        return self.copy() if length == 0 else self / length
+
+    def copy(self):
+        return self.__class__(self._values)
+
+    def to_tuple(self, precision=-1):
+        if precision == -1:
+            return tuple(self._values)
+        return tuple(round(a, precision) for a in self._values)
+
+    def _axis(index):
+        def getter(self):
+            return self._values[index]
+
+        def setter(self, value):
+            self._values[index] = float(value)
+        return property(getter, setter)
+
+    x = _axis(0)
+    y = _axis(1)
+    z = _axis(2)
+    w = _axis(3)
+    del _axis
+
+    def __repr__(self):
+        return "{0}(({1}))".format(self.__class__.__name__, ", ".join(
+            "{0:.4f}".format(a) for a in self._values))
+
+
+class Euler(Vector):
+    """Rotation in radians about X, Y and Z"""
+    def __init__(self, angles=(0.0, 0.0, 0.0), order='XYZ'):
+        Vector.__init__(self, angles)
+        self.order = order
+
+    def copy(self):
+        return Euler(self._values, self.order)
+
+
+# Only imported by Mitosis for voxelizing domain meshes, which isn't modeled
+bvhtree = _types.ModuleType('mathutils.bvhtree')
+
+
+class BVHTree():
+    @classmethod
+    def FromPolygons(cls, *args, **kwargs):
+        raise NotImplementedError("BVHTree isn't modeled by the stand-in")
+
+
+bvhtree.BVHTree = BVHTree
+sys.modules['mathutils.bvhtree'] = bvhtree